@@ -0,0 +1,193 @@
+import atexit
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from config import Config
+
+def hash_bytes(data):
+    """SHA-256 hex digest of raw bytes (e.g. an uploaded recording)."""
+    return hashlib.sha256(data).hexdigest()
+
+def hash_file(path, chunk_size=1024 * 1024):
+    """SHA-256 hex digest of a file's contents, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def make_key(*parts):
+    """Cache key from an ordered tuple of strings (text, question, model version, ...)."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(str(part).encode('utf-8'))
+        digest.update(b'\0')  # Separator so ('ab', 'c') != ('a', 'bc')
+    return digest.hexdigest()
+
+class AnalysisCache:
+    """
+    Size-bounded, SQLite-backed LRU cache shared by all worker processes.
+
+    Entries are grouped by namespace ('transcript', 'nlp', 'gemini') and
+    stored as JSON. Hit and miss counters are kept in the same database so
+    they cover every process using the cache. So that a lookup is a plain
+    read, each process buffers its counters and last-access times in memory
+    and writes them in one transaction every flush_interval seconds. The
+    entry count is maintained by triggers instead of being counted on
+    every insert.
+    """
+    def __init__(self, path, max_entries, flush_interval=10.0):
+        self.path = path
+        self.max_entries = max_entries
+        self.flush_interval = flush_interval
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._reset_pending()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._init_schema()
+        atexit.register(self.flush)
+
+    def _reset_pending(self):
+        self._counts = {}  # namespace -> [hits, misses]
+        self._touched = {}  # (namespace, key) -> last access time
+        self._flushed = time.monotonic()
+        self._pending_pid = os.getpid()
+
+    def _connection(self):
+        # sqlite3 connections cannot be shared across threads or forked processes
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _init_schema(self):
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute('''CREATE TABLE IF NOT EXISTS cache_entry (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                last_access REAL NOT NULL,
+                PRIMARY KEY (namespace, key))''')
+            conn.execute('CREATE INDEX IF NOT EXISTS ix_cache_entry_last_access ON cache_entry (last_access)')
+            conn.execute('''CREATE TABLE IF NOT EXISTS cache_stats (
+                namespace TEXT PRIMARY KEY,
+                hits INTEGER NOT NULL DEFAULT 0,
+                misses INTEGER NOT NULL DEFAULT 0)''')
+            # Entry count kept up to date by triggers, so inserts need no COUNT(*)
+            conn.execute('''CREATE TABLE IF NOT EXISTS cache_size (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                entries INTEGER NOT NULL)''')
+            conn.execute('''CREATE TRIGGER IF NOT EXISTS cache_entry_inserted AFTER INSERT ON cache_entry
+                BEGIN UPDATE cache_size SET entries = entries + 1 WHERE id = 1; END''')
+            conn.execute('''CREATE TRIGGER IF NOT EXISTS cache_entry_deleted AFTER DELETE ON cache_entry
+                BEGIN UPDATE cache_size SET entries = entries - 1 WHERE id = 1; END''')
+            # Caches created before the count existed start from their current size
+            conn.execute('INSERT OR IGNORE INTO cache_size (id, entries) SELECT 1, COUNT(*) FROM cache_entry')
+            conn.execute('COMMIT')
+        except sqlite3.Error:
+            conn.execute('ROLLBACK')
+            raise
+
+    def _record(self, namespace, key, hit):
+        """Buffer a hit or miss (and the access time of a hit); flush when due."""
+        with self._lock:
+            if self._pending_pid != os.getpid():
+                self._reset_pending()  # Counters inherited through fork belong to the parent
+            counts = self._counts.setdefault(namespace, [0, 0])
+            counts[0 if hit else 1] += 1
+            if hit:
+                self._touched[(namespace, key)] = time.time()
+            due = time.monotonic() - self._flushed >= self.flush_interval
+        if due:
+            self.flush()
+
+    def flush(self):
+        """Write buffered hit/miss counters and last-access times in one transaction."""
+        with self._lock:
+            if self._pending_pid != os.getpid():
+                self._reset_pending()
+                return
+            counts, touched = self._counts, self._touched
+            self._counts, self._touched = {}, {}
+            self._flushed = time.monotonic()
+        if not counts and not touched:
+            return
+        try:
+            conn = self._connection()
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                conn.executemany('UPDATE cache_entry SET last_access = MAX(last_access, ?) '
+                                 'WHERE namespace = ? AND key = ?',
+                                 [(accessed, namespace, key) for (namespace, key), accessed in touched.items()])
+                conn.executemany('INSERT INTO cache_stats (namespace, hits, misses) VALUES (?, ?, ?) '
+                                 'ON CONFLICT (namespace) DO UPDATE SET hits = hits + excluded.hits, '
+                                 'misses = misses + excluded.misses',
+                                 [(namespace, hits, misses) for namespace, (hits, misses) in counts.items()])
+                conn.execute('COMMIT')
+            except sqlite3.Error:
+                conn.execute('ROLLBACK')
+                raise
+        except sqlite3.Error as e:
+            # Losing a few counters is fine; failing the caller is not
+            print(f"Warning: cache stats flush failed: {str(e)}")
+
+    def get(self, namespace, key):
+        """Return the cached value, or None on a miss."""
+        try:
+            row = self._connection().execute('SELECT value FROM cache_entry WHERE namespace = ? AND key = ?',
+                                             (namespace, key)).fetchone()
+        except sqlite3.Error as e:
+            # A broken cache must never fail an analysis
+            print(f"Warning: cache lookup failed: {str(e)}")
+            return None
+        self._record(namespace, key, hit=row is not None)
+        return json.loads(row[0]) if row is not None else None
+
+    def set(self, namespace, key, value):
+        """Store a JSON-serializable value, evicting least recently used entries."""
+        try:
+            conn = self._connection()
+            # An upsert keeps the row (a REPLACE would delete and re-insert it), so the count stays exact
+            conn.execute('INSERT INTO cache_entry (namespace, key, value, last_access) VALUES (?, ?, ?, ?) '
+                         'ON CONFLICT (namespace, key) DO UPDATE SET value = excluded.value, '
+                         'last_access = excluded.last_access',
+                         (namespace, key, json.dumps(value), time.time()))
+            excess = conn.execute('SELECT entries FROM cache_size WHERE id = 1').fetchone()[0] - self.max_entries
+            if excess > 0:
+                # Recent hits must count before choosing what to evict
+                self.flush()
+                conn.execute('DELETE FROM cache_entry WHERE rowid IN ('
+                             'SELECT rowid FROM cache_entry ORDER BY last_access LIMIT ?)', (excess,))
+        except sqlite3.Error as e:
+            print(f"Warning: cache write failed: {str(e)}")
+
+    def stats(self):
+        """Entry count plus hit/miss counters per namespace."""
+        self.flush()
+        conn = self._connection()
+        entries = dict(conn.execute('SELECT namespace, COUNT(*) FROM cache_entry GROUP BY namespace').fetchall())
+        stats = {
+            namespace: {'entries': entries.get(namespace, 0), 'hits': hits, 'misses': misses}
+            for namespace, hits, misses in conn.execute('SELECT namespace, hits, misses FROM cache_stats')
+        }
+        return {'max_entries': self.max_entries, 'namespaces': stats}
+
+    def clear(self):
+        with self._lock:
+            self._reset_pending()
+        conn = self._connection()
+        conn.execute('DELETE FROM cache_entry')
+        conn.execute('DELETE FROM cache_stats')
+
+cache = (AnalysisCache(Config.CACHE_PATH, Config.CACHE_MAX_ENTRIES, Config.CACHE_FLUSH_INTERVAL)
+         if Config.CACHE_ENABLED else None)
@@ -0,0 +1,198 @@
+"""
+ASGI serving mode.
+
+All existing Flask routes are served unchanged through a WSGI adapter.
+The native async routes under /api/inline analyze a recording within the
+request: transcription and NLP scoring run on a small CPU executor, and
+the Gemini call is awaited, so a request waiting on Gemini holds no
+thread and one process can keep hundreds of analyses in flight.
+
+Usage: uvicorn asgi:app --host 0.0.0.0 --port 5000
+"""
+import asyncio
+import contextlib
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from asgiref.wsgi import WsgiToAsgi
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse as StarletteJSONResponse
+from starlette.routing import Mount, Route
+from app import app as flask_app, resolve_question_context
+from config import Config
+from json_provider import dumps_bytes
+from model_registry import registry
+from analysis_cache import hash_bytes
+from speech_analyzer import analyze_speech, transcribe_audio
+from gemini_analyzer import analyze_with_gemini_async, create_async_client
+from pipeline import fallback_gemini_analysis, process_response, store_analysis
+
+# Whisper and spaCy are CPU-bound; keep them off the event loop
+cpu_executor = ThreadPoolExecutor(max_workers=Config.ASGI_CPU_THREADS, thread_name_prefix='asgi-cpu')
+
+class JSONResponse(StarletteJSONResponse):
+    """JSON response encoded with orjson when it is installed."""
+    def render(self, content):
+        return dumps_bytes(content)
+
+class InlineState:
+    """Per-process state of the async routes, created on the serving event loop."""
+    gemini = None
+    in_flight = 0
+
+state = InlineState()
+
+class BodyTooLarge(Exception):
+    """The request body is larger than MAX_CONTENT_LENGTH."""
+
+def limit_body(request, max_length):
+    """
+    The request with a receive channel that raises BodyTooLarge once more
+    than max_length body bytes have arrived.
+
+    Needed for chunked uploads, which have no content-length to check and
+    would otherwise be read in full by request.form().
+    """
+    received = 0
+
+    async def receive():
+        nonlocal received
+        message = await request.receive()
+        if message['type'] == 'http.request':
+            received += len(message.get('body', b''))
+            if received > max_length:
+                raise BodyTooLarge()
+        return message
+
+    return Request(request.scope, receive)
+
+async def analyze_inline(request):
+    """
+    Analyze a recording within the request and return the result.
+    Expects the same multipart form as /api/analyze and returns the
+    payload that /api/jobs/<job_id> reports for a completed job.
+    """
+    content_length = int(request.headers.get('content-length', 0))
+    if content_length > Config.MAX_CONTENT_LENGTH:
+        return JSONResponse({'error': 'File too large'}, status_code=413)
+
+    try:
+        form = await limit_body(request, Config.MAX_CONTENT_LENGTH).form()
+    except BodyTooLarge:
+        return JSONResponse({'error': 'File too large'}, status_code=413)
+    audio_file = form.get('audio')
+    question_id = form.get('question_id')
+    question_text = form.get('question_text')
+    user_id = form.get('user_id')
+
+    if audio_file is None or isinstance(audio_file, str):
+        return JSONResponse({'error': 'No audio file provided'}, status_code=400)
+    if not question_id:
+        return JSONResponse({'error': 'Missing question_id'}, status_code=400)
+    if not audio_file.filename.lower().endswith(tuple(f'.{ext}' for ext in Config.ALLOWED_EXTENSIONS)):
+        return JSONResponse({'error': 'Invalid file type. Allowed types: ' + ', '.join(Config.ALLOWED_EXTENSIONS)},
+                            status_code=400)
+
+    audio_data = await audio_file.read()
+    question_context = await run_in_threadpool(_in_app_context, resolve_question_context,
+                                               question_id, question_text)
+    if question_context is None:
+        return JSONResponse({'error': 'Question not found'}, status_code=404)
+
+    state.in_flight += 1
+    try:
+        if Config.ASGI_ANALYSIS_MODE == 'thread':
+            # Baseline: the synchronous pipeline, one thread per request
+            result = await run_in_threadpool(_in_app_context, process_response,
+                                             audio_data, question_id, question_context, user_id)
+        else:
+            result = await process_response_async(audio_data, question_id, question_context, user_id)
+    except Exception as e:
+        print(f"Error in inline analysis: {str(e)}")
+        return JSONResponse({'error': f'Error processing response: {str(e)}'}, status_code=500)
+    finally:
+        state.in_flight -= 1
+
+    return JSONResponse(result)
+
+async def process_response_async(audio_data, question_id, question_context, user_id=None):
+    """
+    Async counterpart of pipeline.process_response.
+
+    Returns:
+        Dictionary with response_id, transcript and combined analysis
+    """
+    loop = asyncio.get_running_loop()
+    transcription = await loop.run_in_executor(cpu_executor, transcribe_audio, audio_data)
+    transcript = transcription['text']
+
+    nlp_future = loop.run_in_executor(cpu_executor, analyze_speech, transcript, transcription['timing'])
+    deadline = time.monotonic() + Config.GEMINI_TIMEOUT
+    gemini_task = asyncio.ensure_future(asyncio.wait_for(
+        analyze_with_gemini_async(state.gemini, transcript, question_context, deadline=deadline),
+        Config.GEMINI_TIMEOUT))
+
+    try:
+        nlp_analysis = await asyncio.wait_for(nlp_future, Config.NLP_TIMEOUT)
+    except asyncio.TimeoutError:
+        gemini_task.cancel()
+        raise TimeoutError(f"NLP analysis did not finish within {Config.NLP_TIMEOUT} seconds")
+
+    try:
+        gemini_analysis = await gemini_task
+    except asyncio.TimeoutError:
+        print(f"Warning: Gemini analysis timed out after {Config.GEMINI_TIMEOUT} seconds")
+        gemini_analysis = fallback_gemini_analysis(nlp_analysis)
+    except Exception as e:
+        print(f"Warning: Gemini analysis failed: {str(e)}")
+        gemini_analysis = fallback_gemini_analysis(nlp_analysis)
+
+    audio_path = f"sha256:{hash_bytes(audio_data)}"
+    return await run_in_threadpool(_in_app_context, store_analysis, transcript, audio_path,
+                                   question_id, nlp_analysis, gemini_analysis, user_id)
+
+async def inline_metrics(request):
+    """In-flight inline analyses and async Gemini client metrics for this process."""
+    return JSONResponse({
+        'mode': Config.ASGI_ANALYSIS_MODE,
+        'in_flight': state.in_flight,
+        'gemini': state.gemini.metrics.snapshot() if state.gemini else None
+    })
+
+def _in_app_context(func, *args):
+    with flask_app.app_context():
+        return func(*args)
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    state.gemini = create_async_client()
+    if Config.WARMUP_ON_START:
+        try:
+            await run_in_threadpool(registry.warm_up)
+        except Exception as e:
+            print(f"Warning: model warm-up failed: {str(e)}")
+    print(f"ASGI server ready in '{Config.ASGI_ANALYSIS_MODE}' mode (pid {os.getpid()})")
+    yield
+    await state.gemini.aclose()
+
+# Flask-CORS only covers the Flask routes, so the async routes get their own
+inline_app = Starlette(
+    routes=[
+        Route('/analyze', analyze_inline, methods=['POST']),
+        Route('/metrics', inline_metrics, methods=['GET'])
+    ],
+    middleware=[Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['GET', 'POST', 'OPTIONS'],
+                           allow_headers=['Content-Type', 'Authorization'])]
+)
+
+app = Starlette(
+    routes=[
+        Mount('/api/inline', app=inline_app),
+        Mount('/', app=WsgiToAsgi(flask_app))
+    ],
+    lifespan=lifespan
+)
@@ -0,0 +1,150 @@
+from audio_io import SAMPLE_RATE
+
+class TranscriptionBackend:
+    """
+    Interface for speech-to-text engines used by transcribe_audio.
+    
+    Backends receive 16 kHz mono float32 arrays and return plain text.
+    Subclasses must implement load() and transcribe(); transcribe_batch()
+    falls back to one call per recording, and transcribe_words() to no
+    word timings.
+    """
+    name = None
+    
+    def __init__(self, model_size):
+        self.model_size = model_size
+        self.model = None
+    
+    def load(self):
+        raise NotImplementedError
+    
+    def transcribe(self, audio):
+        raise NotImplementedError
+    
+    def transcribe_batch(self, audios, batch_size):
+        return [self.transcribe(audio) for audio in audios]
+    
+    def transcribe_words(self, audio):
+        """
+        Transcribe with word-level timestamps.
+        
+        Returns:
+            Dictionary with 'text' and 'words', a list of
+            {'word', 'start', 'end'} entries in seconds
+        """
+        return {'text': self.transcribe(audio), 'words': []}
+
+class WhisperBackend(TranscriptionBackend):
+    """Reference openai-whisper implementation (PyTorch, fp32 on CPU)."""
+    name = 'whisper'
+    
+    def load(self):
+        import whisper
+        self.model = whisper.load_model(self.model_size)
+        return self
+    
+    def transcribe(self, audio):
+        return self.model.transcribe(audio)['text']
+    
+    def transcribe_words(self, audio):
+        result = self.model.transcribe(audio, word_timestamps=True)
+        words = [
+            {'word': word['word'], 'start': word['start'], 'end': word['end']}
+            for segment in result['segments'] for word in segment.get('words', [])
+        ]
+        return {'text': result['text'], 'words': words}
+    
+    def transcribe_batch(self, audios, batch_size):
+        """
+        Transcribe several recordings with batched Whisper decoding.
+        
+        Each recording is split into 30-second windows; the log-mel
+        spectrograms of all windows are stacked so the encoder and decoder
+        run once per batch instead of once per window.
+        """
+        import torch
+        import whisper
+        from whisper.audio import N_SAMPLES
+        
+        options = whisper.DecodingOptions(language='en', fp16=False, without_timestamps=True)
+        
+        windows = []
+        owners = []
+        for index, audio in enumerate(audios):
+            for start in range(0, max(len(audio), 1), N_SAMPLES):
+                window = audio[start:start + N_SAMPLES]
+                # Skip sub-second tails, on which Whisper tends to hallucinate
+                if start > 0 and len(window) < SAMPLE_RATE:
+                    continue
+                windows.append(window)
+                owners.append(index)
+        
+        texts = [[] for _ in audios]
+        for offset in range(0, len(windows), batch_size):
+            mel = torch.stack([
+                whisper.log_mel_spectrogram(whisper.pad_or_trim(window), n_mels=self.model.dims.n_mels)
+                for window in windows[offset:offset + batch_size]
+            ]).to(self.model.device)
+            results = whisper.decode(self.model, mel, options)
+            for owner, result in zip(owners[offset:offset + batch_size], results):
+                texts[owner].append(result.text.strip())
+        
+        return [' '.join(parts) for parts in texts]
+
+class FasterWhisperBackend(TranscriptionBackend):
+    """
+    CTranslate2 Whisper (faster-whisper) with int8 weights on CPU.
+    
+    Several times faster than the reference implementation on CPU with
+    a small accuracy cost; the compute type is set by ASR_COMPUTE_TYPE.
+    """
+    name = 'faster-whisper'
+    
+    def __init__(self, model_size, compute_type='int8', cpu_threads=0):
+        super().__init__(model_size)
+        self.compute_type = compute_type
+        self.cpu_threads = cpu_threads
+    
+    def load(self):
+        try:
+            from faster_whisper import WhisperModel
+        except ImportError as e:
+            raise ImportError("ASR_BACKEND=faster-whisper requires the faster-whisper package "
+                              "(pip install faster-whisper)") from e
+        self.model = WhisperModel(self.model_size, device='cpu', compute_type=self.compute_type,
+                                  cpu_threads=self.cpu_threads)
+        return self
+    
+    def transcribe(self, audio):
+        segments, _ = self.model.transcribe(audio, language='en', beam_size=5)
+        # Segments are generated lazily; joining them runs the decoding
+        return ''.join(segment.text for segment in segments)
+    
+    def transcribe_words(self, audio):
+        segments, _ = self.model.transcribe(audio, language='en', beam_size=5, word_timestamps=True)
+        segments = list(segments)
+        words = [
+            {'word': word.word, 'start': word.start, 'end': word.end}
+            for segment in segments for word in (segment.words or [])
+        ]
+        return {'text': ''.join(segment.text for segment in segments), 'words': words}
+
+BACKENDS = {
+    WhisperBackend.name: WhisperBackend,
+    FasterWhisperBackend.name: FasterWhisperBackend
+}
+
+def create_backend(name, model_size, **options):
+    """
+    Instantiate and load a transcription backend by name.
+    
+    Args:
+        name: One of BACKENDS ('whisper', 'faster-whisper')
+        model_size: Whisper model size, e.g. 'tiny', 'base', 'small'
+        options: Backend-specific keyword arguments
+    """
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown ASR backend '{name}'. Available: {', '.join(BACKENDS)}")
+    if name == FasterWhisperBackend.name:
+        return BACKENDS[name](model_size, **options).load()
+    return BACKENDS[name](model_size).load()
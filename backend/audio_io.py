@@ -0,0 +1,82 @@
+import os
+import subprocess
+import tempfile
+import numpy as np
+
+# All transcription backends expect 16 kHz mono float32 audio
+SAMPLE_RATE = 16000
+
+def _ffmpeg_decode(source, sample_rate, input_bytes=None):
+    # stdin carries the audio when decoding from memory, otherwise keep ffmpeg off it
+    stdin_flags = [] if input_bytes is not None else ['-nostdin']
+    cmd = ['ffmpeg', *stdin_flags, '-threads', '0', '-i', source,
+           '-f', 's16le', '-ac', '1', '-acodec', 'pcm_s16le', '-ar', str(sample_rate), '-']
+    try:
+        out = subprocess.run(cmd, input=input_bytes, capture_output=True, check=True).stdout
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"Failed to decode audio: {e.stderr.decode(errors='replace')}") from e
+    
+    return np.frombuffer(out, np.int16).astype(np.float32) / 32768.0
+
+def load_audio(audio_path, sample_rate=SAMPLE_RATE):
+    """
+    Decode an audio file of any format ffmpeg understands.
+    
+    Args:
+        audio_path: Path to the audio file
+        sample_rate: Target sample rate in Hz
+        
+    Returns:
+        float32 mono array with samples in [-1, 1]
+    """
+    return _ffmpeg_decode(audio_path, sample_rate)
+
+def _needs_seekable_input(data):
+    """
+    Whether ffmpeg must be able to seek in this recording to decode it.
+
+    MP4/M4A (ISO BMFF) files describe their samples in the 'moov' box.
+    Browser and phone recorders usually write it after the audio ('mdat'),
+    which ffmpeg cannot reach through a pipe. Other formats stream.
+    """
+    if data[4:8] != b'ftyp':
+        return False
+    offset = 0
+    while offset + 8 <= len(data):
+        size = int.from_bytes(data[offset:offset + 4], 'big')
+        box = data[offset + 4:offset + 8]
+        if box == b'moov':
+            return False
+        if box == b'mdat':
+            return True
+        if size == 1:  # 64-bit size follows the box type
+            size = int.from_bytes(data[offset + 8:offset + 16], 'big')
+        if size < 8:
+            break
+        offset += size
+    return True
+
+def decode_audio_bytes(data, sample_rate=SAMPLE_RATE):
+    """
+    Decode an in-memory recording by piping it through ffmpeg.
+    
+    Avoids writing the upload to disk only for ffmpeg to read it back,
+    except for MP4/M4A files whose index comes after the audio, which
+    are spooled to a temporary file because ffmpeg has to seek in them.
+    
+    Args:
+        data: Encoded audio bytes (webm, wav, mp3, m4a, ...)
+        sample_rate: Target sample rate in Hz
+        
+    Returns:
+        float32 mono array with samples in [-1, 1]
+    """
+    if not _needs_seekable_input(data):
+        return _ffmpeg_decode('pipe:0', sample_rate, input_bytes=data)
+    
+    with tempfile.NamedTemporaryFile(suffix='.m4a', delete=False) as f:
+        f.write(data)
+    try:
+        return _ffmpeg_decode(f.name, sample_rate)
+    finally:
+        os.remove(f.name)
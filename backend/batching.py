@@ -0,0 +1,81 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+class MicroBatcher:
+    """
+    Collect concurrent calls into batches for a batch-oriented function.
+
+    Callers submit single items from any thread. A background thread waits
+    up to max_wait seconds after the first pending item for more to arrive,
+    then calls process_batch with up to max_batch_size items and hands each
+    caller its own result. An exception instance in the returned list is
+    raised to that item's caller only. If process_batch raises, or returns
+    a different number of results than it was given items, every caller
+    in the batch gets the error.
+    """
+    def __init__(self, process_batch, max_batch_size, max_wait, name='batcher'):
+        self.process_batch = process_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.name = name
+        self._queue = queue.Queue()
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _ensure_thread(self):
+        # Threads do not survive fork, so each worker process starts its own
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._queue = queue.Queue()
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._pid = os.getpid()
+                self._thread.start()
+
+    def submit(self, item):
+        """Queue an item and return a Future for its result."""
+        if self._pid != os.getpid():
+            self._ensure_thread()
+        future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def __call__(self, item):
+        """Submit an item and block until its result is ready."""
+        return self.submit(item).result()
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            items = [item for item, _ in batch]
+            try:
+                results = list(self.process_batch(items))
+                if len(results) != len(items):
+                    raise RuntimeError(f"{self.name}: batch function returned {len(results)} results "
+                                       f"for {len(items)} items")
+            except Exception as e:
+                # Every caller must be woken up, or it blocks on its future forever
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), result in zip(batch, results):
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
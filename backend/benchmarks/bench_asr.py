@@ -0,0 +1,114 @@
+"""
+Compare ASR backends on latency, memory and word error rate.
+
+Expects a fixture directory of audio files, each with a reference
+transcript next to it (answer1.wav + answer1.txt). Every backend/model
+combination runs in its own subprocess so that peak RSS is measured in
+isolation.
+
+Usage: python benchmarks/bench_asr.py FIXTURE_DIR
+           [--configs whisper:base,faster-whisper:base,faster-whisper:small]
+"""
+import argparse
+import json
+import os
+import re
+import resource
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+AUDIO_EXTENSIONS = ('.wav', '.webm', '.mp3', '.m4a', '.flac', '.ogg')
+
+def normalize(text):
+    return re.sub(r"[^a-z0-9' ]+", ' ', text.lower()).split()
+
+def word_errors(reference, hypothesis):
+    """Word-level Levenshtein distance between two token lists."""
+    previous = list(range(len(hypothesis) + 1))
+    for i, ref_word in enumerate(reference, 1):
+        current = [i]
+        for j, hyp_word in enumerate(hypothesis, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1,
+                               previous[j - 1] + (ref_word != hyp_word)))
+        previous = current
+    return previous[-1]
+
+def load_fixtures(fixture_dir):
+    fixtures = []
+    for name in sorted(os.listdir(fixture_dir)):
+        if not name.lower().endswith(AUDIO_EXTENSIONS):
+            continue
+        reference_path = os.path.join(fixture_dir, os.path.splitext(name)[0] + '.txt')
+        if os.path.exists(reference_path):
+            with open(reference_path) as f:
+                fixtures.append((os.path.join(fixture_dir, name), f.read()))
+    return fixtures
+
+def run_config(fixture_dir, backend_name, model_size):
+    """Measure one backend in the current process and print a JSON summary."""
+    from asr_backends import create_backend
+    from audio_io import SAMPLE_RATE, load_audio
+
+    fixtures = load_fixtures(fixture_dir)
+    audios = [(load_audio(path), reference) for path, reference in fixtures]
+
+    started = time.perf_counter()
+    options = {'compute_type': 'int8'} if backend_name == 'faster-whisper' else {}
+    backend = create_backend(backend_name, model_size, **options)
+    load_seconds = time.perf_counter() - started
+
+    backend.transcribe(audios[0][0])  # Warm-up
+
+    errors = words = 0
+    audio_seconds = transcribe_seconds = 0.0
+    for audio, reference in audios:
+        started = time.perf_counter()
+        hypothesis = backend.transcribe(audio)
+        transcribe_seconds += time.perf_counter() - started
+        audio_seconds += len(audio) / SAMPLE_RATE
+        reference_words = normalize(reference)
+        errors += word_errors(reference_words, normalize(hypothesis))
+        words += len(reference_words)
+
+    print(json.dumps({
+        'config': f"{backend_name}:{model_size}",
+        'load_s': load_seconds,
+        'latency_s': transcribe_seconds / len(audios),
+        'rtf': transcribe_seconds / audio_seconds,
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'wer': errors / max(1, words)
+    }))
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark ASR backends.')
+    parser.add_argument('fixture_dir', help='directory of audio files with .txt references')
+    parser.add_argument('--configs', default='whisper:base,faster-whisper:base',
+                        help='comma-separated backend:model_size pairs')
+    parser.add_argument('--run', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        backend_name, model_size = args.run.split(':')
+        run_config(args.fixture_dir, backend_name, model_size)
+        return
+
+    if not load_fixtures(args.fixture_dir):
+        sys.exit(f"No audio files with reference transcripts found in {args.fixture_dir}")
+
+    print(f"{'config':<24} {'load s':>7} {'latency s':>10} {'RTF':>6} {'peak RSS MB':>12} {'WER':>6}")
+    for config in args.configs.split(','):
+        output = subprocess.run([sys.executable, __file__, args.fixture_dir, '--run', config],
+                                cwd=BACKEND_DIR, capture_output=True, text=True)
+        if output.returncode != 0:
+            print(f"{config:<24} failed: {output.stderr.strip().splitlines()[-1]}")
+            continue
+        row = json.loads(output.stdout.strip().splitlines()[-1])
+        print(f"{row['config']:<24} {row['load_s']:7.2f} {row['latency_s']:10.2f} {row['rtf']:6.3f} "
+              f"{row['peak_rss_mb']:12.0f} {row['wer']:6.3f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""
+Load-test the Gemini client against the local fake server.
+
+Many threads send prompts at once, some of them duplicates, while the
+fake server enforces a per-second quota and injects errors. Reports
+throughput, failures and the client's queue-wait/latency metrics.
+
+Usage: python benchmarks/bench_gemini_client.py [--requests 200] [--threads 32]
+           [--duplicates 0.2] [--quota-per-second 10] [--error-rate 0.05]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_gemini import start_server
+from gemini_client import GeminiClient, GeminiError
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--threads', type=int, default=32)
+    parser.add_argument('--duplicates', type=float, default=0.2, help='Fraction of prompts repeating an earlier one')
+    parser.add_argument('--latency', type=float, default=0.3)
+    parser.add_argument('--quota-per-second', type=int, default=10)
+    parser.add_argument('--error-rate', type=float, default=0.05)
+    parser.add_argument('--rate', type=float, default=8, help='Client token-bucket rate per second')
+    parser.add_argument('--burst', type=int, default=8)
+    parser.add_argument('--concurrency', type=int, default=8)
+    args = parser.parse_args()
+
+    server, state = start_server(latency=args.latency, quota_per_second=args.quota_per_second,
+                                 error_rate=args.error_rate)
+    client = GeminiClient(
+        api_key='fake',
+        model='fake-model',
+        base_url=f"http://127.0.0.1:{server.server_address[1]}",
+        rate_per_second=args.rate,
+        burst=args.burst,
+        max_concurrency=args.concurrency,
+        request_timeout=5,
+        max_retries=4,
+        backoff_base=0.25,
+        backoff_max=4
+    )
+
+    prompts = []
+    for index in range(args.requests):
+        if prompts and random.random() < args.duplicates:
+            prompts.append(random.choice(prompts))
+        else:
+            prompts.append(f"prompt {index}")
+
+    def send(prompt):
+        try:
+            client.generate(prompt)
+            return True
+        except GeminiError:
+            return False
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        results = list(pool.map(send, prompts))
+    elapsed = time.perf_counter() - started
+    server.shutdown()
+
+    print(f"{args.requests} requests in {elapsed:.2f}s ({args.requests / elapsed:.1f} req/s)")
+    print(f"Failed after retries: {results.count(False)}")
+    print(f"Server saw: {state.counts}")
+    for name, value in client.metrics.snapshot().items():
+        print(f"  {name}: {value:.3f}" if isinstance(value, float) else f"  {name}: {value}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""
+Measure grammar-check throughput against LanguageTool pool size.
+
+Starts a pool of each size with the spoken-transcript profile from
+Config, sends the sample transcripts from as many client threads as the
+largest pool has servers (as concurrent analyses would), and reports
+checks per second and the speed-up over a single server. Throughput
+should grow roughly linearly with pool size up to the number of CPU
+cores.
+
+Usage: python benchmarks/bench_language_tool.py [--sizes 1,2,4] [--checks 200]
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_speech_analyzer import SAMPLE_TRANSCRIPTS
+from config import Config
+from language_tool_pool import LanguageToolPool
+
+def run_size(size, texts, clients):
+    started = time.perf_counter()
+    pool = LanguageToolPool(size, language=Config.LANGUAGE_TOOL_LANGUAGE, timeout=Config.LANGUAGE_TOOL_TIMEOUT,
+                            disabled_rules=Config.LANGUAGE_TOOL_DISABLED_RULES,
+                            disabled_categories=Config.LANGUAGE_TOOL_DISABLED_CATEGORIES,
+                            health_interval=3600)
+    start_seconds = time.perf_counter() - started
+    try:
+        for text in SAMPLE_TRANSCRIPTS:  # Warm-up every server's rule caches
+            pool.check(text)
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=clients) as executor:
+            matches = sum(len(result) for result in executor.map(pool.check, texts))
+        return start_seconds, time.perf_counter() - started, matches
+    finally:
+        pool.close()
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the LanguageTool server pool.')
+    parser.add_argument('--sizes', default='1,2,4', help='comma-separated pool sizes')
+    parser.add_argument('--checks', type=int, default=200, help='transcripts checked per pool size')
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(',')]
+    texts = [SAMPLE_TRANSCRIPTS[i % len(SAMPLE_TRANSCRIPTS)] for i in range(args.checks)]
+    clients = max(sizes)
+
+    print(f"{'servers':>7} {'start s':>8} {'checks/s':>9} {'speed-up':>9} {'matches':>8}")
+    baseline = None
+    for size in sizes:
+        start_seconds, seconds, matches = run_size(size, texts, clients)
+        rate = len(texts) / seconds
+        baseline = baseline or rate
+        print(f"{size:7d} {start_seconds:8.1f} {rate:9.1f} {rate / baseline:8.2f}x {matches:8d}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""
+Compare the token trie in lexicon.py with the substring scans it replaced.
+
+The old code ran str.count once per filler and an 'in' test once per
+basic pattern, so its cost grew with transcript length times lexicon
+size. The trie makes one pass over the tokens whatever the lexicon size.
+Transcripts are synthetic and tokenized with a regex outside the timed
+region, as the analyzer reuses the tokens of its spaCy Doc; lexicons
+are padded with made-up phrases to show the scaling.
+
+Usage: python benchmarks/bench_lexicon.py [--words 100 300 1000] [--padding 0 500 5000]
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lexicon import BASIC_PATTERNS, FILLER_WORDS, TokenTrie
+
+VOCABULARY = ('i', 'think', 'that', 'people', 'should', 'travel', 'more', 'because', 'it', 'is',
+              'important', 'to', 'learn', 'about', 'other', 'cultures', 'and', 'also', 'so', 'you',
+              'know', 'like', 'um', 'well', 'am', 'want', 'sort', 'of', 'really', 'believe')
+
+def synthetic_transcript(words, seed=0):
+    rng = random.Random(seed)
+    sentences = []
+    while words > 0:
+        length = min(words, rng.randint(6, 18))
+        sentences.append(' '.join(rng.choice(VOCABULARY) for _ in range(length)) + '.')
+        words -= length
+    return ' '.join(sentences)
+
+def padded(phrases, count, seed=1):
+    rng = random.Random(seed)
+    extra = [' '.join(f"x{rng.randrange(10 ** 6)}" for _ in range(rng.randint(1, 3))) for _ in range(count)]
+    return tuple(phrases) + tuple(extra)
+
+def substring_scan(text, filler_words, patterns):
+    lower = text.lower()
+    filler_count = sum(lower.count(filler) for filler in filler_words)
+    pattern_count = sum(1 for pattern in patterns if pattern in lower)
+    return filler_count, pattern_count
+
+def tokenize(text):
+    return re.findall(r"\w+|[^\w\s]", text.lower())
+
+def trie_scan(tokens, filler_trie, pattern_trie):
+    filler_count = len(filler_trie.find_longest(tokens))
+    pattern_count = len({phrase for _, _, phrase in pattern_trie.find_all(tokens)})
+    return filler_count, pattern_count
+
+def time_call(fn, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark filler and pattern matching.')
+    parser.add_argument('--words', type=int, nargs='+', default=[100, 300, 1000])
+    parser.add_argument('--padding', type=int, nargs='+', default=[0, 500, 5000],
+                        help='made-up phrases added to each lexicon')
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'words':>6} {'lexicon':>8} {'substring (us)':>15} {'trie (us)':>10}")
+    for padding in args.padding:
+        filler_words = padded(FILLER_WORDS, padding)
+        patterns = padded(BASIC_PATTERNS, padding, seed=2)
+        filler_trie = TokenTrie(filler_words)
+        pattern_trie = TokenTrie(patterns)
+        for words in args.words:
+            text = synthetic_transcript(words)
+            tokens = tokenize(text)
+            old = time_call(lambda: substring_scan(text, filler_words, patterns), args.repeat)
+            new = time_call(lambda: trie_scan(tokens, filler_trie, pattern_trie), args.repeat)
+            size = len(filler_words) + len(patterns)
+            print(f"{words:>6} {size:>8} {old * 1e6:>15.1f} {new * 1e6:>10.1f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""
+Measure per-request latency of /api/questions.
+
+Compares the current app against a copy that also runs the old
+per-request setup hook (db.create_all() plus a question count before
+every request). Both use a fresh SQLite database in a temp directory
+and the Flask test client, so only server-side work is timed.
+
+Usage: python benchmarks/bench_questions.py [--requests 500]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from app import create_app
+from models import db, Question
+
+def legacy_setup_hook():
+    """The setup the app used to run before every request."""
+    db.create_all()
+    Question.query.count()
+
+def measure(app, requests):
+    client = app.test_client()
+    client.get('/api/questions')  # First request pays for connection setup
+    latencies = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        response = client.get('/api/questions')
+        latencies.append(time.perf_counter() - started)
+        assert response.status_code == 200
+    latencies.sort()
+    return statistics.median(latencies), latencies[int(len(latencies) * 0.95) - 1]
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        uri = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+
+        before = create_app({'SQLALCHEMY_DATABASE_URI': uri})
+        before.before_request(legacy_setup_hook)
+        after = create_app({'SQLALCHEMY_DATABASE_URI': uri})
+
+        print(f"{args.requests} requests to /api/questions")
+        for label, app in (('per-request setup (before)', before), ('startup setup (after)', after)):
+            median, p95 = measure(app, args.requests)
+            print(f"{label:>28}: p50 {median * 1000:.2f}ms, p95 {p95 * 1000:.2f}ms")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""
+Compare the scalar and vectorized scoring model paths.
+
+Scores synthetic feature vectors one at a time (the request path) and
+as a NumPy feature table (re-scoring and calibration), checks that both
+give bit-identical NLP and combined scores, and reports the time per
+pass.
+
+Usage: python benchmarks/bench_scoring_model.py [--responses 10000] [--model 1]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from scoring_model import feature_table, get_scoring_model
+
+def synthetic_features(count, seed=0):
+    rng = np.random.default_rng(seed)
+    columns = {
+        'word_count': rng.integers(0, 400, count),
+        'sentence_count': rng.integers(0, 30, count),
+        'speech_rate': rng.uniform(50, 250, count),
+        'filler_ratio': rng.uniform(0, 0.1, count),
+        'fk_grade': rng.uniform(0, 20, count),
+        'avg_sentence_length': rng.uniform(0, 30, count),
+        'sentence_length_std': rng.uniform(0, 15, count),
+        'lexical_diversity': rng.uniform(0, 1, count),
+        'avg_word_length': rng.uniform(2, 9, count),
+        'avg_syllables': rng.uniform(1, 4, count),
+        'avg_word_rank': rng.uniform(0, 60000, count),
+        'common_word_ratio': rng.uniform(0, 0.5, count),
+        'char_count': rng.integers(0, 3000, count),
+        'whitespace_word_count': rng.integers(0, 400, count),
+        'error_density': rng.uniform(0, 5, count),
+        'basic_pattern_count': rng.integers(0, 3, count),
+    }
+    return [{name: values[i].item() for name, values in columns.items()} for i in range(count)]
+
+def synthetic_gemini(count, seed=1):
+    rng = np.random.default_rng(seed)
+    names = ('fluency_score', 'vocabulary_score', 'grammar_score', 'coherence_score')
+    # Gemini answers in half bands
+    return [{name: float(rng.integers(0, 19)) / 2 for name in names} for _ in range(count)]
+
+def identical(scalar_rows, arrays):
+    for name, values in arrays.items():
+        expected = np.array([row[name] for row in scalar_rows], dtype=np.float64)
+        if not np.array_equal(expected.view(np.int64), values.view(np.int64)):
+            return False
+    return True
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the scoring model.')
+    parser.add_argument('--responses', type=int, default=10000)
+    parser.add_argument('--model', help='scoring model version (default SCORING_MODEL)')
+    args = parser.parse_args()
+
+    model = get_scoring_model(args.model)
+    features = synthetic_features(args.responses)
+    gemini = synthetic_gemini(args.responses)
+
+    started = time.perf_counter()
+    scalar_nlp = [model.nlp_scores(row) for row in features]
+    scalar_combined = [model.combine(nlp, g) for nlp, g in zip(scalar_nlp, gemini)]
+    scalar_seconds = time.perf_counter() - started
+
+    table = feature_table(features)
+    gemini_table = feature_table(gemini)
+    started = time.perf_counter()
+    vector_nlp = model.nlp_scores_batch(table)
+    vector_combined = model.combine_batch(vector_nlp, gemini_table)
+    vector_seconds = time.perf_counter() - started
+
+    print(f"scoring model:         {model.version}")
+    print(f"responses:             {args.responses}")
+    print(f"scalar:                {scalar_seconds * 1000:8.1f} ms")
+    print(f"vectorized:            {vector_seconds * 1000:8.1f} ms")
+    print(f"bit-identical NLP:     {identical(scalar_nlp, vector_nlp)}")
+    print(f"bit-identical combined: {identical(scalar_combined, vector_combined)}")
+
+if __name__ == '__main__':
+    main()
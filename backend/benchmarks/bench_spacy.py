@@ -0,0 +1,89 @@
+"""
+Compare the full spaCy pipeline with the trimmed one the analyzer loads.
+
+Each pipeline runs in its own subprocess so that load time and peak RSS
+are measured in isolation. Reports the time per document when parsing
+one text at a time (the request path) and with nlp.pipe (the batch
+path used by analyze_speech_batch), plus the average number of sentences
+found, since the trimmed pipeline takes sentence boundaries from
+'senter' instead of the parser.
+
+Usage: python benchmarks/bench_spacy.py [--docs 300] [--n-process 1]
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from bench_speech_analyzer import SAMPLE_TRANSCRIPTS
+
+VARIANTS = ('full', 'trimmed')
+
+def load(variant):
+    if variant == 'full':
+        import spacy
+        from config import Config
+        return spacy.load(Config.SPACY_MODEL)
+    from speech_analyzer import _load_spacy
+    return _load_spacy()
+
+def run_variant(variant, docs, n_process):
+    texts = [SAMPLE_TRANSCRIPTS[i % len(SAMPLE_TRANSCRIPTS)] for i in range(docs)]
+    started = time.perf_counter()
+    nlp = load(variant)
+    load_seconds = time.perf_counter() - started
+    rss_loaded = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    nlp(texts[0])  # Warm-up
+
+    started = time.perf_counter()
+    sentences = sum(len(list(nlp(text).sents)) for text in texts)
+    single_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for _ in nlp.pipe(texts, n_process=n_process, batch_size=64):
+        pass
+    pipe_seconds = time.perf_counter() - started
+
+    print(json.dumps({
+        'variant': variant,
+        'pipes': ','.join(nlp.pipe_names),
+        'load_s': load_seconds,
+        'single_ms': single_seconds / docs * 1000,
+        'pipe_ms': pipe_seconds / docs * 1000,
+        'sentences': sentences / docs,
+        'rss_loaded_mb': rss_loaded,
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    }))
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the spaCy pipeline.')
+    parser.add_argument('--docs', type=int, default=300, help='documents parsed per pass')
+    parser.add_argument('--n-process', type=int, default=1, help='processes for nlp.pipe')
+    parser.add_argument('--run', choices=VARIANTS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        run_variant(args.run, args.docs, args.n_process)
+        return
+
+    print(f"{'variant':<8} {'load s':>7} {'nlp() ms/doc':>13} {'pipe ms/doc':>12} {'sents/doc':>10} "
+          f"{'RSS loaded MB':>14} {'peak RSS MB':>12}  pipes")
+    for variant in VARIANTS:
+        output = subprocess.run([sys.executable, __file__, '--run', variant, '--docs', str(args.docs),
+                                 '--n-process', str(args.n_process)],
+                                cwd=BACKEND_DIR, capture_output=True, text=True)
+        if output.returncode != 0:
+            print(f"{variant:<8} failed: {output.stderr.strip().splitlines()[-1]}")
+            continue
+        row = json.loads(output.stdout.strip().splitlines()[-1])
+        print(f"{row['variant']:<8} {row['load_s']:7.2f} {row['single_ms']:13.2f} {row['pipe_ms']:12.2f} "
+              f"{row['sentences']:10.2f} {row['rss_loaded_mb']:14.0f} {row['peak_rss_mb']:12.0f}  {row['pipes']}")
+
+if __name__ == '__main__':
+    main()
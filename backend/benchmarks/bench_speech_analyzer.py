@@ -0,0 +1,74 @@
+"""
+Benchmark the NLP analysis stage (analyze_speech).
+
+Reports the wall time per transcript and how many LanguageTool checks each
+analysis performs, next to the cost of a single LanguageTool check, so the
+saving from the single-pass AnalysisContext is visible. The analysis is
+called without the on-disk analysis cache (_analyze_transcript), since
+repeated transcripts would otherwise only measure a cache lookup.
+
+Usage: python benchmarks/bench_speech_analyzer.py [--repeat N]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from speech_analyzer import _analyze_transcript, get_language_tool
+
+SAMPLE_TRANSCRIPTS = [
+    "I grew up in a small coastal town in the south of the country. What I like most about it is the "
+    "relaxed pace of life and the fact that everyone knows each other. In the summer the beaches are "
+    "crowded with tourists, but in the winter it becomes very quiet and peaceful, which I really enjoy.",
+    "Well, I think social media has both positive and negative effects on society. On the one hand it "
+    "allows people to stay connected with friends and family who live far away. On the other hand, it "
+    "can spread misinformation very quickly and some people become addicted to it, which affects "
+    "their mental health and their relationships.",
+    "One of the most memorable trips I have taken was a journey to the mountains with my university "
+    "friends. We hiked for three days, slept in small huts and cooked our own meals. It was exhausting "
+    "but the views were breathtaking and it taught me a lot about teamwork and perseverance.",
+]
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark analyze_speech.')
+    parser.add_argument('--repeat', type=int, default=5, help='passes over the sample transcripts')
+    args = parser.parse_args()
+
+    # Count LanguageTool round trips made by the analysis
+    tool = get_language_tool()
+    original_check = tool.check
+    calls = {'count': 0}
+
+    def counting_check(text):
+        calls['count'] += 1
+        return original_check(text)
+
+    # Warm up spaCy and the LanguageTool server before timing
+    _analyze_transcript(SAMPLE_TRANSCRIPTS[0])
+
+    started = time.perf_counter()
+    for _ in range(args.repeat):
+        for transcript in SAMPLE_TRANSCRIPTS:
+            original_check(transcript)
+    check_time = (time.perf_counter() - started) / (args.repeat * len(SAMPLE_TRANSCRIPTS))
+
+    tool.check = counting_check
+    try:
+        started = time.perf_counter()
+        for _ in range(args.repeat):
+            for transcript in SAMPLE_TRANSCRIPTS:
+                _analyze_transcript(transcript)
+        elapsed = time.perf_counter() - started
+    finally:
+        tool.check = original_check
+
+    analyses = args.repeat * len(SAMPLE_TRANSCRIPTS)
+    print(f"analyses:                  {analyses}")
+    print(f"analyze_speech per call:   {elapsed / analyses * 1000:.1f} ms")
+    print(f"LanguageTool checks/call:  {calls['count'] / analyses:.2f}")
+    print(f"single LanguageTool check: {check_time * 1000:.1f} ms")
+
+if __name__ == '__main__':
+    main()
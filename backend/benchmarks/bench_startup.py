@@ -0,0 +1,32 @@
+"""
+Measure cold-start cost of the backend.
+
+Imports the app in a fresh interpreter and reports the import time, then
+warms up every registered model and reports each load time.
+
+Usage: python benchmarks/bench_startup.py
+"""
+import os
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCRIPT = """
+import time
+started = time.perf_counter()
+import app
+print(f"import app (wall):        {time.perf_counter() - started:.2f}s")
+print(f"import app (IMPORT_SECONDS): {app.IMPORT_SECONDS:.2f}s")
+for name, seconds in app.registry.warm_up().items():
+    print(f"load {name}: {seconds:.2f}s")
+"""
+
+def main():
+    started = time.perf_counter()
+    subprocess.run([sys.executable, '-c', SCRIPT], cwd=BACKEND_DIR, check=True)
+    print(f"total (interpreter + import + warm-up): {time.perf_counter() - started:.2f}s")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""
+Measure the overhead of word-timestamp timing metrics.
+
+Times word_timing_metrics and to_original_time on synthetic answers of
+typical length. Given an audio file, also compares transcription with and
+without word timestamps so the metrics cost can be put in proportion.
+
+Usage: python benchmarks/bench_timing_metrics.py [AUDIO_FILE] [--words 300]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from timing_metrics import to_original_time, word_timing_metrics
+
+def synthetic_words(count, seed=0):
+    rng = np.random.default_rng(seed)
+    durations = rng.uniform(0.15, 0.6, count)
+    gaps = rng.exponential(0.2, count)
+    starts = np.cumsum(durations + gaps) - durations
+    return starts, starts + durations
+
+def time_call(fn, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark timing metrics.')
+    parser.add_argument('audio_file', nargs='?', help='optional recording to transcribe')
+    parser.add_argument('--words', type=int, default=300, help='words per synthetic answer')
+    parser.add_argument('--repeat', type=int, default=2000)
+    args = parser.parse_args()
+
+    starts, ends = synthetic_words(args.words)
+    segments = [[0.0, ends[-1] / 2], [ends[-1] / 2 + 1.5, ends[-1] + 1.5]]
+
+    metrics_time = time_call(lambda: word_timing_metrics(starts, ends), args.repeat)
+    mapping_time = time_call(lambda: (to_original_time(starts, segments),
+                                      to_original_time(ends, segments, side='left')), args.repeat)
+    print(f"word_timing_metrics ({args.words} words): {metrics_time * 1e6:8.1f} us")
+    print(f"to_original_time    ({args.words} words): {mapping_time * 1e6:8.1f} us")
+
+    if args.audio_file:
+        from audio_io import load_audio
+        from speech_analyzer import get_asr_backend
+
+        audio = load_audio(args.audio_file)
+        backend = get_asr_backend()
+        backend.transcribe(audio)  # Warm-up
+
+        plain = time_call(lambda: backend.transcribe(audio), 1)
+        with_words = time_call(lambda: backend.transcribe_words(audio), 1)
+        print(f"transcribe:                   {plain:8.2f} s")
+        print(f"transcribe_words:             {with_words:8.2f} s")
+        print(f"metrics share of transcription: {(metrics_time + mapping_time) / with_words:.6%}")
+
+if __name__ == '__main__':
+    main()
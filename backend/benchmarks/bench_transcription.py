@@ -0,0 +1,57 @@
+"""
+Compare one-at-a-time and batched transcription throughput.
+
+Loads every audio file in a directory, transcribes them sequentially with the
+configured ASR backend and then with transcribe_batch at several batch sizes,
+and reports throughput in audio-seconds per wall-second.
+
+Usage: python benchmarks/bench_transcription.py AUDIO_DIR [--batch-sizes 2,4,8]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audio_io import SAMPLE_RATE, load_audio
+from config import Config
+import speech_analyzer
+
+AUDIO_EXTENSIONS = ('.wav', '.webm', '.mp3', '.m4a', '.flac', '.ogg')
+
+def report(label, audio_seconds, elapsed):
+    print(f"{label:<22} {elapsed:8.2f}s wall  {audio_seconds / elapsed:6.2f} audio-s/wall-s")
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark batched transcription.')
+    parser.add_argument('audio_dir', help='directory with audio fixtures')
+    parser.add_argument('--batch-sizes', default='2,4,8', help='comma-separated batch sizes')
+    args = parser.parse_args()
+
+    paths = sorted(os.path.join(args.audio_dir, name) for name in os.listdir(args.audio_dir)
+                   if name.lower().endswith(AUDIO_EXTENSIONS))
+    if not paths:
+        sys.exit(f"No audio files found in {args.audio_dir}")
+
+    audios = [load_audio(path) for path in paths]
+    audio_seconds = sum(len(audio) for audio in audios) / SAMPLE_RATE
+    print(f"{len(audios)} files, {audio_seconds:.1f}s of audio")
+
+    backend = speech_analyzer.get_asr_backend()
+    backend.transcribe(audios[0])  # Warm-up
+
+    started = time.perf_counter()
+    for audio in audios:
+        backend.transcribe(audio)
+    report('sequential', audio_seconds, time.perf_counter() - started)
+
+    for batch_size in (int(size) for size in args.batch_sizes.split(',')):
+        Config.TRANSCRIBE_BATCH_SIZE = batch_size
+        started = time.perf_counter()
+        for offset in range(0, len(audios), batch_size):
+            speech_analyzer.transcribe_batch(audios[offset:offset + batch_size])
+        report(f'batched (size {batch_size})', audio_seconds, time.perf_counter() - started)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+"""
+Local stand-in for the Gemini generateContent endpoint.
+
+Replies with a fixed IELTS analysis (or an array of them for batched
+prompts) after a configurable delay, and can inject quota errors (429)
+and server errors (503) so the client's rate limiting and retries can be
+exercised without an API key or quota.
+
+Usage: python benchmarks/fake_gemini.py [--port 8765] [--latency 0.5]
+           [--quota-per-second 5] [--error-rate 0.05]
+       GEMINI_API_BASE=http://127.0.0.1:8765 python worker.py
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PATH_PATTERN = re.compile(r'^/v1beta/models/[^/:]+:generateContent$')
+# Batched prompts ask for "a JSON array with exactly N objects"
+BATCH_PATTERN = re.compile(r'JSON array with exactly (\d+) objects')
+
+ANALYSIS = {
+    'fluency_score': 6.5,
+    'vocabulary_score': 6.0,
+    'grammar_score': 6.0,
+    'coherence_score': 6.5,
+    'overall_score': 6.5,
+    'feedback': {
+        'strengths': ['Answers the question directly'],
+        'weaknesses': ['Limited range of linking words'],
+        'suggestions': ['Extend answers with a reason and an example']
+    }
+}
+
+class FakeGemini:
+    """Shared state of the fake server: latency, error injection and a per-second quota."""
+    def __init__(self, latency, jitter, quota_per_second, error_rate):
+        self.latency = latency
+        self.jitter = jitter
+        self.quota_per_second = quota_per_second
+        self.error_rate = error_rate
+        self.lock = threading.Lock()
+        self.window = int(time.time())
+        self.window_count = 0
+        self.counts = {'ok': 0, 'quota': 0, 'error': 0}
+
+    def admit(self):
+        """Return the HTTP status to answer with for a new request."""
+        with self.lock:
+            now = int(time.time())
+            if now != self.window:
+                self.window, self.window_count = now, 0
+            self.window_count += 1
+            if self.quota_per_second and self.window_count > self.quota_per_second:
+                self.counts['quota'] += 1
+                return 429
+            if random.random() < self.error_rate:
+                self.counts['error'] += 1
+                return 503
+            self.counts['ok'] += 1
+            return 200
+
+def make_handler(state):
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            if not PATH_PATTERN.match(self.path.split('?')[0]):
+                self._reply(404, {'error': {'message': 'not found'}})
+                return
+            length = int(self.headers.get('Content-Length', 0))
+            body = json.loads(self.rfile.read(length) or b'{}')
+            prompt = ''.join(part.get('text', '') for content in body.get('contents', [])
+                             for part in content.get('parts', []))
+
+            status = state.admit()
+            if status != 200:
+                self._reply(status, {'error': {'code': status}}, headers={'Retry-After': '1'} if status == 429 else None)
+                return
+
+            time.sleep(max(0.0, state.latency + random.uniform(-state.jitter, state.jitter)))
+            batch = BATCH_PATTERN.search(prompt)
+            if batch:
+                reply = [dict(ANALYSIS, index=index) for index in range(1, int(batch.group(1)) + 1)]
+            else:
+                reply = ANALYSIS
+            text = '```json\n' + json.dumps(reply) + '\n```'
+            self._reply(200, {'candidates': [{'content': {'parts': [{'text': text}], 'role': 'model'}}]})
+
+        def _reply(self, status, body, headers=None):
+            data = json.dumps(body).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+def start_server(port=0, latency=0.5, jitter=0.1, quota_per_second=0, error_rate=0.0):
+    """
+    Start the fake server on a background thread.
+
+    Returns:
+        Tuple of (server, state); server.server_address holds the bound port
+    """
+    state = FakeGemini(latency, jitter, quota_per_second, error_rate)
+    server = ThreadingHTTPServer(('127.0.0.1', port), make_handler(state))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.5, help='Seconds per successful reply')
+    parser.add_argument('--jitter', type=float, default=0.1)
+    parser.add_argument('--quota-per-second', type=int, default=0, help='Requests above this per second get 429 (0 = unlimited)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests answered with 503')
+    args = parser.parse_args()
+
+    server, state = start_server(args.port, args.latency, args.jitter, args.quota_per_second, args.error_rate)
+    print(f"Fake Gemini listening on http://127.0.0.1:{server.server_address[1]}")
+    try:
+        while True:
+            time.sleep(10)
+            print(f"Requests so far: {state.counts}")
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == '__main__':
+    main()
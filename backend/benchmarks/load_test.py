@@ -0,0 +1,118 @@
+"""
+Load-test inline analysis in the ASGI server against a fake Gemini.
+
+Starts benchmarks/fake_gemini.py in-process, then runs uvicorn once per
+analysis mode ('thread': synchronous pipeline per request, 'async':
+awaited Gemini call) and fires waves of concurrent requests at
+/api/inline/analyze. The same recording is sent every time, so after
+the first request transcription and NLP come from the analysis cache;
+each request uses a distinct question text, so every one still waits
+on a Gemini call. Reports throughput and latency per concurrency level.
+
+Usage: python benchmarks/load_test.py AUDIO_FILE [--concurrency 10,50,200]
+           [--gemini-latency 1.0] [--modes thread,async]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_gemini import start_server
+
+def start_app(mode, port, gemini_base):
+    env = dict(os.environ,
+               ASGI_ANALYSIS_MODE=mode,
+               GEMINI_API_BASE=gemini_base,
+               GEMINI_API_KEY=os.environ.get('GEMINI_API_KEY', 'fake'),
+               # Let the server, not the client-side limits, be what is measured
+               GEMINI_RATE_PER_SECOND='100000',
+               GEMINI_BURST='100000',
+               GEMINI_MAX_CONCURRENCY='1000',
+               GEMINI_BATCH_SIZE='1')
+    return subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'asgi:app', '--port', str(port), '--log-level', 'warning'],
+        cwd=BACKEND_DIR, env=env
+    )
+
+async def wait_until_ready(client, url, timeout=600):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get(f"{url}/api/test")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(1)
+    raise RuntimeError(f"Server at {url} did not start within {timeout}s")
+
+async def analyze(client, url, audio, filename, index):
+    started = time.perf_counter()
+    response = await client.post(
+        f"{url}/api/inline/analyze",
+        files={'audio': (filename, audio)},
+        # Unknown question ID so the distinct question text is used as context
+        data={'question_id': '0', 'question_text': f"Describe your hometown. (load test {index})"}
+    )
+    return response.status_code == 200, time.perf_counter() - started
+
+async def run_wave(client, url, audio, filename, concurrency, offset):
+    started = time.perf_counter()
+    results = await asyncio.gather(*(analyze(client, url, audio, filename, offset + index)
+                                     for index in range(concurrency)))
+    wall = time.perf_counter() - started
+    latencies = sorted(latency for ok, latency in results if ok)
+    failures = sum(1 for ok, _ in results if not ok)
+    p95 = latencies[int(len(latencies) * 0.95) - 1] if latencies else float('nan')
+    median = statistics.median(latencies) if latencies else float('nan')
+    return wall, failures, median, p95
+
+async def benchmark_mode(mode, port, gemini_base, audio, filename, levels):
+    process = start_app(mode, port, gemini_base)
+    url = f"http://127.0.0.1:{port}"
+    try:
+        timeout = httpx.Timeout(600)
+        limits = httpx.Limits(max_connections=max(levels) + 10)
+        async with httpx.AsyncClient(timeout=timeout, limits=limits) as client:
+            await wait_until_ready(client, url)
+            # First request fills the transcript and NLP caches
+            await analyze(client, url, audio, filename, -1)
+            offset = 0
+            for concurrency in levels:
+                wall, failures, median, p95 = await run_wave(client, url, audio, filename, concurrency, offset)
+                offset += concurrency
+                print(f"{mode:>6} | {concurrency:>11} | {concurrency / wall:>7.1f} | {median:>7.2f}s | {p95:>7.2f}s | {failures}")
+    finally:
+        process.terminate()
+        process.wait()
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('audio', help='Recording to submit with every request')
+    parser.add_argument('--concurrency', default='10,50,200', help='Comma-separated numbers of simultaneous requests')
+    parser.add_argument('--modes', default='thread,async')
+    parser.add_argument('--gemini-latency', type=float, default=1.0, help='Seconds the fake Gemini takes per reply')
+    parser.add_argument('--port', type=int, default=8100)
+    args = parser.parse_args()
+
+    levels = [int(level) for level in args.concurrency.split(',')]
+    with open(args.audio, 'rb') as f:
+        audio = f.read()
+    filename = os.path.basename(args.audio)
+
+    server, _ = start_server(latency=args.gemini_latency, jitter=0.0)
+    gemini_base = f"http://127.0.0.1:{server.server_address[1]}"
+    print(f"Fake Gemini at {gemini_base}, {args.gemini_latency:.1f}s per reply")
+    print("  mode | concurrency |   req/s |     p50 |     p95 | failures")
+    for mode in args.modes.split(','):
+        asyncio.run(benchmark_mode(mode, args.port, gemini_base, audio, filename, levels))
+    server.shutdown()
+
+if __name__ == '__main__':
+    main()
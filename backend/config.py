@@ -4,24 +4,160 @@ from dotenv import load_dotenv
 # Load environment variables from .env file
 load_dotenv()
 
+def _database_url():
+    url = os.environ.get('DATABASE_URL', 'sqlite:///ielts_speaking.db')
+    # Hosted PostgreSQL often hands out postgres:// URLs, which SQLAlchemy no longer accepts
+    if url.startswith('postgres://'):
+        url = 'postgresql://' + url[len('postgres://'):]
+    return url
+
+def _engine_options(url):
+    if url.startswith('sqlite'):
+        # Give concurrent workers time to acquire the SQLite write lock
+        # (WAL mode is switched on per connection in models.py)
+        return {'connect_args': {'timeout': 30}}
+    # Pool limits apply per process: size them for WORKER_THREADS (workers) or
+    # the server's threads (web), times the number of processes, below max_connections
+    return {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 5)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 10)),
+        'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', 30)),  # seconds to wait for a free connection
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800)),  # seconds, below server idle timeouts
+        'pool_pre_ping': True
+    }
+
 class Config:
     """Flask application configuration."""
-    # Database configuration
-    SQLALCHEMY_DATABASE_URI = 'sqlite:///ielts_speaking.db'
+    # Database configuration: SQLite for a single node, or DATABASE_URL=postgresql://...
+    SQLALCHEMY_DATABASE_URI = _database_url()
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SQLALCHEMY_ENGINE_OPTIONS = _engine_options(SQLALCHEMY_DATABASE_URI)
+    # Create tables and apply migrations at startup; disable to run 'flask db-upgrade' during deploys instead
+    DB_AUTO_MIGRATE = os.environ.get('DB_AUTO_MIGRATE', 'true').lower() == 'true'
     
     # Secret key for session management
     SECRET_KEY = os.environ.get('SECRET_KEY', 'dev-key-change-in-production')
+    # Token for operational endpoints (X-Admin-Token header); unset allows them from localhost only
+    ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
     
     # File upload configuration
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
     UPLOAD_FOLDER = 'uploads'
+    # Uploads up to this size are decoded from memory; larger ones are spooled to UPLOAD_FOLDER
+    AUDIO_SPOOL_THRESHOLD = int(os.environ.get('AUDIO_SPOOL_THRESHOLD', 4 * 1024 * 1024))
     
     # API Keys
     GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY')
     if not GEMINI_API_KEY:
         raise ValueError("GEMINI_API_KEY environment variable is not set")
     
+    # Model settings
+    WHISPER_MODEL = os.environ.get('WHISPER_MODEL', 'base')  # model size, shared by all ASR backends
+    ASR_BACKEND = os.environ.get('ASR_BACKEND', 'whisper')  # 'whisper' or 'faster-whisper'
+    ASR_COMPUTE_TYPE = os.environ.get('ASR_COMPUTE_TYPE', 'int8')  # faster-whisper only
+    ASR_CPU_THREADS = int(os.environ.get('ASR_CPU_THREADS', 0))  # faster-whisper only, 0 = default
+    SPACY_MODEL = os.environ.get('SPACY_MODEL', 'en_core_web_sm')
+    # Components the analyzer never reads; sentences come from 'senter' instead of the parser
+    SPACY_EXCLUDE = [name for name in os.environ.get(
+        'SPACY_EXCLUDE', 'tok2vec,tagger,parser,attribute_ruler,lemmatizer,ner').split(',') if name]
+    SPACY_N_PROCESS = int(os.environ.get('SPACY_N_PROCESS', 1))  # processes for analyze_speech_batch
+    GEMINI_MODEL = os.environ.get('GEMINI_MODEL', 'gemini-2.0-flash')  # change the model name matching your api key
+    WARMUP_ON_START = os.environ.get('WARMUP_ON_START', 'true').lower() == 'true'
+    
+    # Batched transcription: recordings arriving within the wait window share
+    # one Whisper pass (set TRANSCRIBE_BATCH_SIZE=1 to transcribe one at a time)
+    TRANSCRIBE_BATCH_SIZE = int(os.environ.get('TRANSCRIBE_BATCH_SIZE', 1))
+    TRANSCRIBE_BATCH_WAIT_MS = int(os.environ.get('TRANSCRIBE_BATCH_WAIT_MS', 200))
+    
+    # Voice activity detection: silence is trimmed before transcription
+    VAD_ENABLED = os.environ.get('VAD_ENABLED', 'true').lower() == 'true'
+    VAD_MARGIN_DB = float(os.environ.get('VAD_MARGIN_DB', 12))  # speech threshold above the noise floor
+    VAD_MIN_DB = float(os.environ.get('VAD_MIN_DB', -55))  # frames quieter than this are never speech
+    VAD_MIN_SPEECH_MS = int(os.environ.get('VAD_MIN_SPEECH_MS', 240))
+    VAD_MIN_SILENCE_MS = int(os.environ.get('VAD_MIN_SILENCE_MS', 300))
+    VAD_PAD_MS = int(os.environ.get('VAD_PAD_MS', 150))
+    VAD_LONG_PAUSE_SECONDS = float(os.environ.get('VAD_LONG_PAUSE_SECONDS', 1.0))
+    
+    # Word timestamps give real speech-rate and pause metrics (not available with batched transcription)
+    WORD_TIMESTAMPS = os.environ.get('WORD_TIMESTAMPS', 'true').lower() == 'true'
+    TIMING_PAUSE_SECONDS = float(os.environ.get('TIMING_PAUSE_SECONDS', 0.25))  # shortest gap between words counted as a pause
+    
+    # Streaming uploads are transcribed in windows of this many seconds while recording
+    STREAM_WINDOW_SECONDS = int(os.environ.get('STREAM_WINDOW_SECONDS', 30))
+    STREAM_TTL = int(os.environ.get('STREAM_TTL', 3600))  # seconds without a chunk before a stream is removed
+    
+    # Question sampling
+    QUESTION_INDEX_TTL = int(os.environ.get('QUESTION_INDEX_TTL', 60))  # seconds between checks for new questions
+    QUESTION_EXCLUDE_RECENT = int(os.environ.get('QUESTION_EXCLUDE_RECENT', 50))  # recent answers a user won't be asked again
+    MAX_QUESTIONS_PER_REQUEST = 100
+    MAX_HISTORY_PAGE_SIZE = 100
+    
+    # Weight of the newest attempt in the rolling progress averages (0-1)
+    PROGRESS_ROLLING_ALPHA = float(os.environ.get('PROGRESS_ROLLING_ALPHA', 0.3))
+    
     # Audio settings
     ALLOWED_EXTENSIONS = {'webm', 'wav', 'mp3', 'm4a'}
+    
+    # Analysis cache settings
+    CACHE_ENABLED = os.environ.get('CACHE_ENABLED', 'true').lower() == 'true'
+    CACHE_PATH = os.environ.get('CACHE_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'analysis_cache.db'))
+    CACHE_MAX_ENTRIES = int(os.environ.get('CACHE_MAX_ENTRIES', 50000))
+    CACHE_FLUSH_INTERVAL = float(os.environ.get('CACHE_FLUSH_INTERVAL', 10))  # seconds between hit/miss and LRU writes
+    # Bump whenever the NLP features or result format change so stale results are not reused
+    NLP_SCORING_VERSION = '5'
+    # Version of the feature-to-band mapping in scoring_model.py
+    SCORING_MODEL = os.environ.get('SCORING_MODEL', '1')
+    
+    # LanguageTool server pool
+    LANGUAGE_TOOL_POOL_SIZE = int(os.environ.get('LANGUAGE_TOOL_POOL_SIZE', 2))  # Java server processes
+    LANGUAGE_TOOL_LANGUAGE = os.environ.get('LANGUAGE_TOOL_LANGUAGE', 'en-US')
+    LANGUAGE_TOOL_TIMEOUT = float(os.environ.get('LANGUAGE_TOOL_TIMEOUT', 10))  # seconds per check
+    LANGUAGE_TOOL_HEALTH_INTERVAL = float(os.environ.get('LANGUAGE_TOOL_HEALTH_INTERVAL', 30))  # seconds
+    # Spoken-transcript profile: ASR output has no meaningful casing, punctuation
+    # or typography, and its words are spelled correctly by construction, so
+    # these rules only add noise (and spell checking is the slowest rule)
+    LANGUAGE_TOOL_DISABLED_RULES = [name for name in os.environ.get(
+        'LANGUAGE_TOOL_DISABLED_RULES',
+        'MORFOLOGIK_RULE_EN_US,UPPERCASE_SENTENCE_START,PUNCTUATION_PARAGRAPH_END,COMMA_PARENTHESIS_WHITESPACE,'
+        'WHITESPACE_RULE,SENTENCE_WHITESPACE,DOUBLE_PUNCTUATION,EN_QUOTES,DASH_RULE,EN_UNPAIRED_BRACKETS'
+    ).split(',') if name]
+    LANGUAGE_TOOL_DISABLED_CATEGORIES = [name for name in os.environ.get(
+        'LANGUAGE_TOOL_DISABLED_CATEGORIES', 'CASING,TYPOGRAPHY').split(',') if name]
+    
+    # Bulk re-scoring (flask rescore)
+    RESCORE_CHUNK_SIZE = int(os.environ.get('RESCORE_CHUNK_SIZE', 500))  # responses per pool task
+    RESCORE_PROCESSES = int(os.environ.get('RESCORE_PROCESSES', 0))  # 0 = one per CPU
+    RESCORE_CHECKPOINT_PATH = os.environ.get('RESCORE_CHECKPOINT_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'rescore_checkpoint.json'))
+    
+    # Job queue settings
+    WORKER_COUNT = int(os.environ.get('WORKER_COUNT', 2))
+    WORKER_THREADS = int(os.environ.get('WORKER_THREADS', 1))  # jobs in flight per worker process
+    JOB_POLL_INTERVAL = float(os.environ.get('JOB_POLL_INTERVAL', 0.5))  # seconds
+    JOB_STALE_AFTER = int(os.environ.get('JOB_STALE_AFTER', 600))  # seconds before a running job is requeued
+    JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', 3))  # tries per job, after errors or worker crashes
+    
+    # Analysis stage settings
+    ANALYSIS_THREADS = int(os.environ.get('ANALYSIS_THREADS', 4))  # NLP scoring threads
+    GEMINI_THREADS = int(os.environ.get('GEMINI_THREADS', 4))  # threads waiting on Gemini
+    NLP_TIMEOUT = float(os.environ.get('NLP_TIMEOUT', 120))  # seconds
+    GEMINI_TIMEOUT = float(os.environ.get('GEMINI_TIMEOUT', 30))  # seconds, including retries
+    
+    # ASGI serving mode (uvicorn asgi:app): threads for Whisper/spaCy work, and
+    # 'async' (await Gemini) or 'thread' (synchronous pipeline per request, for comparison)
+    ASGI_CPU_THREADS = int(os.environ.get('ASGI_CPU_THREADS', 2))
+    ASGI_ANALYSIS_MODE = os.environ.get('ASGI_ANALYSIS_MODE', 'async')
+    
+    # Gemini client settings (limits apply per worker process)
+    GEMINI_API_BASE = os.environ.get('GEMINI_API_BASE', 'https://generativelanguage.googleapis.com')  # point at benchmarks/fake_gemini.py for testing
+    GEMINI_RATE_PER_SECOND = float(os.environ.get('GEMINI_RATE_PER_SECOND', 2))
+    GEMINI_BURST = int(os.environ.get('GEMINI_BURST', 5))
+    GEMINI_MAX_CONCURRENCY = int(os.environ.get('GEMINI_MAX_CONCURRENCY', 4))
+    GEMINI_REQUEST_TIMEOUT = float(os.environ.get('GEMINI_REQUEST_TIMEOUT', 15))  # seconds per HTTP request
+    GEMINI_MAX_RETRIES = int(os.environ.get('GEMINI_MAX_RETRIES', 3))
+    GEMINI_BACKOFF_BASE = float(os.environ.get('GEMINI_BACKOFF_BASE', 0.5))  # seconds
+    GEMINI_BACKOFF_MAX = float(os.environ.get('GEMINI_BACKOFF_MAX', 8))  # seconds
+    # Batched scoring: responses analyzed by the same worker process within the
+    # wait window share one prompt (needs WORKER_THREADS > 1; 1 = one call per response)
+    GEMINI_BATCH_SIZE = int(os.environ.get('GEMINI_BATCH_SIZE', 1))
+    GEMINI_BATCH_WAIT_MS = int(os.environ.get('GEMINI_BATCH_WAIT_MS', 500))
 
@@ -1,179 +1,408 @@
-import google.generativeai as genai
+import asyncio
 import json
+import math
 import os
+import time
+from concurrent.futures import TimeoutError
 from config import Config
+from model_registry import registry
+from analysis_cache import cache, make_key
+from batching import MicroBatcher
+from gemini_client import AsyncGeminiClient, GeminiClient, GeminiError
+from schemas import Feedback
 
-# Configure the Gemini API
-api_key = os.environ.get('GEMINI_API_KEY') or Config.GEMINI_API_KEY
-if not api_key:
-    raise ValueError("GEMINI_API_KEY environment variable or Config.GEMINI_API_KEY is not set")
+def _client_options():
+    api_key = os.environ.get('GEMINI_API_KEY') or Config.GEMINI_API_KEY
+    if not api_key:
+        raise ValueError("GEMINI_API_KEY environment variable or Config.GEMINI_API_KEY is not set")
 
-genai.configure(api_key=api_key)
+    return {
+        'api_key': api_key,
+        'model': Config.GEMINI_MODEL,
+        'base_url': Config.GEMINI_API_BASE,
+        'rate_per_second': Config.GEMINI_RATE_PER_SECOND,
+        'burst': Config.GEMINI_BURST,
+        'max_concurrency': Config.GEMINI_MAX_CONCURRENCY,
+        'request_timeout': Config.GEMINI_REQUEST_TIMEOUT,
+        'max_retries': Config.GEMINI_MAX_RETRIES,
+        'backoff_base': Config.GEMINI_BACKOFF_BASE,
+        'backoff_max': Config.GEMINI_BACKOFF_MAX
+    }
 
-# Set up the model
-try:
-    model = genai.GenerativeModel('gemini-2.0-flash') #change the model name matching your api key
-except Exception as e:
-    print(f"Error initializing Gemini model: {e}")
-    model = None
+def _load_gemini():
+    """Create the shared, rate-limited Gemini client on first use."""
+    return GeminiClient(**_client_options())
 
-def analyze_with_gemini(transcript, question):
+def create_async_client():
+    """Create an AsyncGeminiClient; call this on the event loop that will use it."""
+    return AsyncGeminiClient(**_client_options())
+
+registry.register('gemini', _load_gemini)
+
+# Prompt sections shared by the single and batched prompts
+ASSESSMENT_CRITERIA = """
+    Provide a detailed analysis of the response based on the IELTS speaking assessment criteria:
+    1. Fluency and Coherence
+    2. Lexical Resource (Vocabulary)
+    3. Grammatical Range and Accuracy
+    4. Pronunciation (though we can't assess this from text)
+
+    For each criterion, provide:
+    - A score on the IELTS band scale (0-9, with 0.5 increments)
+    - Specific strengths (2-3 points)
+    - Specific weaknesses (2-3 points)
+    - Concrete suggestions for improvement (2-3 points)
+"""
+
+ANALYSIS_SCHEMA = """{
+        "fluency_score": float,
+        "vocabulary_score": float,
+        "grammar_score": float,
+        "coherence_score": float,
+        "overall_score": float,
+        "feedback": {
+            "strengths": [
+                "Specific strength point 1",
+                "Specific strength point 2",
+                "Specific strength point 3"
+            ],
+            "weaknesses": [
+                "Specific weakness point 1",
+                "Specific weakness point 2",
+                "Specific weakness point 3"
+            ],
+            "suggestions": [
+                "Specific suggestion point 1",
+                "Specific suggestion point 2",
+                "Specific suggestion point 3"
+            ]
+        }
+    }"""
+
+FEEDBACK_GUIDELINES = """
+    Guidelines for feedback:
+    1. Strengths should highlight specific examples from the response
+    2. Weaknesses should be specific and actionable
+    3. Suggestions should be practical and implementable
+    4. Each point should be concise and clear
+    5. Avoid generic statements
+    6. Focus on the most important points in each category
+"""
+
+def build_prompt(transcript, question):
+    """Examiner prompt for a single response."""
+    return f"""
+    You are an expert IELTS speaking examiner. Analyze the following response to an IELTS speaking question.
+
+    IELTS Question: {question}
+
+    Response: {transcript}
+    {ASSESSMENT_CRITERIA}
+    Format your response as a JSON object with the following structure:
+    {ANALYSIS_SCHEMA}
+    {FEEDBACK_GUIDELINES}
+    Only return the JSON object, nothing else.
+    """
+
+def build_batch_prompt(items):
+    """
+    Examiner prompt scoring several responses in one call.
+
+    The instructions and schema are sent once for the whole batch instead
+    of once per response.
+
+    Args:
+        items: List of (transcript, question) pairs
+    """
+    responses = '\n'.join(
+        f"""
+    Response {index}
+    IELTS Question: {question}
+    Response: {transcript}
+    """
+        for index, (transcript, question) in enumerate(items, start=1)
+    )
+    return f"""
+    You are an expert IELTS speaking examiner. Analyze each of the following {len(items)} responses to IELTS speaking questions independently.
+    {responses}
+    {ASSESSMENT_CRITERIA}
+    Format your response as a JSON array with exactly {len(items)} objects, one per response and in the same order.
+    Each object has an "index" field with the response number plus the following structure:
+    {ANALYSIS_SCHEMA}
+    {FEEDBACK_GUIDELINES}
+    Only return the JSON array, nothing else.
+    """
+
+def no_speech_analysis():
+    """Default analysis for an empty or very short transcript."""
+    return {
+        'fluency_score': 0.0,
+        'vocabulary_score': 0.0,
+        'grammar_score': 0.0,
+        'coherence_score': 0.0,
+        'overall_score': 0.0,
+        'feedback': {
+            'strengths': [],
+            'weaknesses': ['No speech detected in the recording'],
+            'suggestions': ['Please speak clearly into the microphone when recording']
+        }
+    }
+
+def _is_too_short(transcript):
+    return not transcript or len(transcript.strip()) < 10  # Less than 10 characters
+
+# Bump when the shape of cached analyses changes so old entries are not reused
+GEMINI_RESULT_VERSION = '2'
+
+def _cache_key(transcript, question):
+    return make_key(transcript, question, Config.GEMINI_MODEL, GEMINI_RESULT_VERSION) if cache else None
+
+def cached_gemini_analysis(transcript, question):
+    """Analysis of this answer from the cache, or None; never calls the API."""
+    if _is_too_short(transcript):
+        return no_speech_analysis()
+    cache_key = _cache_key(transcript, question)
+    return cache.get('gemini', cache_key) if cache_key else None
+
+def extract_json(response_text):
+    """
+    Parse the JSON in a Gemini reply, stripping a Markdown code fence if present.
+
+    Raises:
+        GeminiError: if the reply is not valid JSON
+    """
+    if "```json" in response_text:
+        json_start = response_text.find("```json") + 7
+        json_end = response_text.find("```", json_start)
+        response_text = response_text[json_start:json_end].strip()
+    elif "```" in response_text:
+        json_start = response_text.find("```") + 3
+        json_end = response_text.find("```", json_start)
+        response_text = response_text[json_start:json_end].strip()
+
+    try:
+        return json.loads(response_text)
+    except ValueError as e:
+        raise GeminiError(f"Error parsing Gemini response: {e}")
+
+SCORE_FIELDS = ('fluency_score', 'vocabulary_score', 'grammar_score', 'coherence_score', 'overall_score')
+
+def _band_score(field, value):
+    """
+    A score from the reply as a float on the 0-9 band scale.
+
+    Raises:
+        GeminiError: if the value is not a finite number (or numeric string)
+    """
+    try:
+        score = float(value) if not isinstance(value, bool) else math.nan
+    except (TypeError, ValueError):
+        score = math.nan
+    if not math.isfinite(score):
+        raise GeminiError(f"{field} is not a number: {value!r}")
+    return min(9.0, max(0.0, score))
+
+def normalize_analysis(analysis):
+    """
+    Fill in missing fields of a parsed analysis and validate its scores and feedback.
+
+    Raises:
+        GeminiError: if the analysis is not an object or a score is not numeric
+    """
+    if not isinstance(analysis, dict):
+        raise GeminiError(f"Expected a JSON object, got {type(analysis).__name__}")
+
+    # Ensure all required fields are present
+    required_fields = [*SCORE_FIELDS, 'feedback']
+    for field in required_fields:
+        if field not in analysis:
+            if field == 'coherence_score':
+                analysis['coherence_score'] = analysis.get('fluency_score', 0.0)
+            else:
+                # Default values for missing fields
+                analysis[field] = 0.0  # Default to 0.0 for missing fields
+
+    # Band scores must be numbers for the scoring model; the reply may hold
+    # null, strings or out-of-range values
+    for field in SCORE_FIELDS:
+        analysis[field] = _band_score(field, analysis[field])
+
+    if 'feedback' not in analysis or not isinstance(analysis['feedback'], dict):
+        analysis['feedback'] = {
+            'strengths': [],
+            'weaknesses': ['Unable to perform detailed analysis'],
+            'suggestions': ['Please provide a more detailed response']
+        }
+
+    analysis['feedback'] = Feedback.from_value(analysis['feedback']).to_dict()
+    return analysis
+
+def analyze_with_gemini(transcript, question, deadline=None):
     """
     Analyze speech transcript using Gemini AI for deeper insights.
-    
+
     Args:
         transcript: Transcribed text from audio
         question: The IELTS question that was asked
-        
+        deadline: time.monotonic() value after which the client stops retrying
+
     Returns:
         Dictionary with analysis results
-    """
-    if not model:
-        raise Exception("Gemini model not initialized. Please check your API key and model configuration.")
 
+    Raises:
+        GeminiError: if the API call fails or the reply cannot be parsed,
+            so callers can fall back to the NLP scores
+    """
     # Check for empty or very short transcript
-    if not transcript or len(transcript.strip()) < 10:  # Less than 10 characters
-        return {
-            'fluency_score': 0.0,
-            'vocabulary_score': 0.0,
-            'grammar_score': 0.0,
-            'coherence_score': 0.0,
-            'overall_score': 0.0,
-            'feedback': json.dumps({
-                'strengths': [],
-                'weaknesses': ['No speech detected in the recording'],
-                'suggestions': ['Please speak clearly into the microphone when recording']
-            })
-        }
+    if _is_too_short(transcript):
+        return no_speech_analysis()
 
-    try:
-        # Create prompt for Gemini
-        prompt = f"""
-        You are an expert IELTS speaking examiner. Analyze the following response to an IELTS speaking question.
-        
-        IELTS Question: {question}
-        
-        Response: {transcript}
-        
-        Provide a detailed analysis of the response based on the IELTS speaking assessment criteria:
-        1. Fluency and Coherence
-        2. Lexical Resource (Vocabulary)
-        3. Grammatical Range and Accuracy
-        4. Pronunciation (though we can't assess this from text)
-        
-        For each criterion, provide:
-        - A score on the IELTS band scale (0-9, with 0.5 increments)
-        - Specific strengths (2-3 points)
-        - Specific weaknesses (2-3 points)
-        - Concrete suggestions for improvement (2-3 points)
-        
-        Format your response as a JSON object with the following structure:
-        {{
-            "fluency_score": float,
-            "vocabulary_score": float,
-            "grammar_score": float,
-            "coherence_score": float,
-            "overall_score": float,
-            "feedback": {{
-                "strengths": [
-                    "Specific strength point 1",
-                    "Specific strength point 2",
-                    "Specific strength point 3"
-                ],
-                "weaknesses": [
-                    "Specific weakness point 1",
-                    "Specific weakness point 2",
-                    "Specific weakness point 3"
-                ],
-                "suggestions": [
-                    "Specific suggestion point 1",
-                    "Specific suggestion point 2",
-                    "Specific suggestion point 3"
-                ]
-            }}
-        }}
-        
-        Guidelines for feedback:
-        1. Strengths should highlight specific examples from the response
-        2. Weaknesses should be specific and actionable
-        3. Suggestions should be practical and implementable
-        4. Each point should be concise and clear
-        5. Avoid generic statements
-        6. Focus on the most important points in each category
-        
-        Only return the JSON object, nothing else.
-        """
-        
-        # Get response from Gemini
-        response = model.generate_content(prompt)
-        
-        # Parse the JSON response
+    # Re-submitted answers reuse the previous analysis instead of a paid API call
+    cache_key = _cache_key(transcript, question)
+    if cache_key:
+        cached = cache.get('gemini', cache_key)
+        if cached is not None:
+            return cached
+
+    client = registry.get('gemini')
+
+    # Rate limiting, retries and timeouts are handled by the client;
+    # GeminiError propagates once it gives up
+    response_text = client.generate(build_prompt(transcript, question), deadline=deadline)
+    analysis = normalize_analysis(extract_json(response_text))
+
+    # Only successful analyses are cached
+    if cache_key:
+        cache.set('gemini', cache_key, analysis)
+
+    return analysis
+
+async def analyze_with_gemini_async(client, transcript, question, deadline=None):
+    """
+    Awaitable version of analyze_with_gemini for the ASGI server.
+
+    Args:
+        client: AsyncGeminiClient created by create_async_client
+        transcript: Transcribed text from audio
+        question: The IELTS question that was asked
+        deadline: time.monotonic() value after which the client stops retrying
+
+    Raises:
+        GeminiError: if the API call fails or the reply cannot be parsed
+    """
+    if _is_too_short(transcript):
+        return no_speech_analysis()
+
+    # SQLite cache calls can wait on the database write lock (stats flushes,
+    # inserts), so they run in the loop's default executor, not on the loop
+    loop = asyncio.get_running_loop()
+    cache_key = _cache_key(transcript, question)
+    if cache_key:
+        cached = await loop.run_in_executor(None, cache.get, 'gemini', cache_key)
+        if cached is not None:
+            return cached
+
+    response_text = await client.generate(build_prompt(transcript, question), deadline=deadline)
+    analysis = normalize_analysis(extract_json(response_text))
+
+    if cache_key:
+        await loop.run_in_executor(None, cache.set, 'gemini', cache_key, analysis)
+
+    return analysis
+
+def analyze_with_gemini_batch(items):
+    """
+    Score several responses with one Gemini call.
+
+    Short transcripts and cached responses are answered locally; the rest
+    are packed into one prompt whose reply is a JSON array. If the call
+    fails or its reply cannot be matched to the items, every item in it
+    gets the GeminiError, so each caller uses its own fallback.
+
+    Args:
+        items: List of (transcript, question, deadline) tuples; deadline is
+            a time.monotonic() value or None
+
+    Returns:
+        List with one analysis per item, in order. An item that could not
+        be scored holds the GeminiError instead.
+    """
+    results = [None] * len(items)
+    pending = []
+    for position, (transcript, question, _) in enumerate(items):
+        if _is_too_short(transcript):
+            results[position] = no_speech_analysis()
+            continue
+        cache_key = _cache_key(transcript, question)
+        cached = cache.get('gemini', cache_key) if cache_key else None
+        if cached is not None:
+            results[position] = cached
+        else:
+            pending.append((position, cache_key))
+
+    if len(pending) > 1:
+        batch = [items[position][:2] for position, _ in pending]
+        # The shared call is worth retrying while any of its callers still waits
+        deadlines = [items[position][2] for position, _ in pending]
+        deadline = None if None in deadlines else max(deadlines)
         try:
-            # Extract JSON from the response
-            response_text = response.text
-            
-            if "```json" in response_text:
-                json_start = response_text.find("```json") + 7
-                json_end = response_text.find("```", json_start)
-                response_text = response_text[json_start:json_end].strip()
-            elif "```" in response_text:
-                json_start = response_text.find("```") + 3
-                json_end = response_text.find("```", json_start)
-                response_text = response_text[json_start:json_end].strip()
-            
-            analysis = json.loads(response_text)
-            
-            # Ensure all required fields are present
-            required_fields = ['fluency_score', 'vocabulary_score', 'grammar_score', 'coherence_score', 
-                              'overall_score', 'feedback']
-            for field in required_fields:
-                if field not in analysis:
-                    if field == 'coherence_score':
-                        analysis['coherence_score'] = analysis.get('fluency_score', 0.0)
-                    else:
-                        # Default values for missing fields
-                        analysis[field] = 0.0  # Default to 0.0 for missing fields
-            
-            if 'feedback' not in analysis or not isinstance(analysis['feedback'], dict):
-                analysis['feedback'] = {
-                    'strengths': [],
-                    'weaknesses': ['Unable to perform detailed analysis'],
-                    'suggestions': ['Please provide a more detailed response']
-                }
-            
-            analysis['feedback'] = json.dumps(analysis['feedback'])
-            
-            return analysis
-            
-        except Exception as e:
-            # If JSON parsing fails, return a default analysis
-            print(f"Error parsing Gemini response: {e}")
-            return {
-                'fluency_score': 0.0,
-                'vocabulary_score': 0.0,
-                'grammar_score': 0.0,
-                'coherence_score': 0.0,
-                'overall_score': 0.0,
-                'feedback': json.dumps({
-                    'strengths': [],
-                    'weaknesses': ['Unable to perform detailed analysis'],
-                    'suggestions': ['Please provide a more detailed response']
-                })
-            }
-    
-    except Exception as e:
-        # If Gemini API call fails, return a default analysis
-        print(f"Error calling Gemini API: {e}")
-        return {
-            'fluency_score': 0.0,
-            'vocabulary_score': 0.0,
-            'grammar_score': 0.0,
-            'coherence_score': 0.0,
-            'overall_score': 0.0,
-            'feedback': json.dumps({
-                'strengths': [],
-                'weaknesses': ['Unable to perform detailed analysis'],
-                'suggestions': ['Please provide a more detailed response']
-            })
-        }
+            response_text = registry.get('gemini').generate(build_batch_prompt(batch), deadline=deadline)
+            analyses = extract_json(response_text)
+            if not isinstance(analyses, list) or len(analyses) != len(batch):
+                raise GeminiError(f"Expected {len(batch)} analyses in the batch reply")
+            # Prefer the echoed index over list order when the model provides it
+            by_index = {a.get('index'): a for a in analyses if isinstance(a, dict)}
+            if set(by_index) == set(range(1, len(batch) + 1)):
+                analyses = [by_index[index] for index in range(1, len(batch) + 1)]
+            for (position, cache_key), analysis in zip(pending, analyses):
+                try:
+                    analysis = normalize_analysis(analysis)
+                except GeminiError as e:
+                    # One malformed item fails only its own caller
+                    print(f"Warning: invalid analysis in the batch reply: {str(e)}")
+                    results[position] = e
+                    continue
+                analysis.pop('index', None)
+                results[position] = analysis
+                if cache_key:
+                    cache.set('gemini', cache_key, analysis)
+        except GeminiError as e:
+            # Re-scoring one by one here would hold the batcher thread, and every
+            # batch queued behind it, for several Gemini timeouts; each caller
+            # falls back on its own instead
+            print(f"Warning: batched Gemini analysis of {len(batch)} responses failed: {str(e)}")
+            for position, _ in pending:
+                results[position] = e
+    elif pending:
+        position, _ = pending[0]
+        try:
+            results[position] = analyze_with_gemini(*items[position])
+        except GeminiError as e:
+            results[position] = e
+    return results
+
+gemini_batcher = MicroBatcher(
+    analyze_with_gemini_batch,
+    max_batch_size=Config.GEMINI_BATCH_SIZE,
+    max_wait=Config.GEMINI_BATCH_WAIT_MS / 1000,
+    name='gemini-batcher'
+)
+
+def score_with_gemini(transcript, question, deadline=None):
+    """
+    Analyze one response, sharing a batched call with concurrent ones.
+
+    With GEMINI_BATCH_SIZE > 1, responses analyzed by other threads within
+    GEMINI_BATCH_WAIT_MS are scored in the same prompt.
 
+    Args:
+        deadline: time.monotonic() value after which the answer is no
+            longer needed; retries stop and GeminiError is raised
+    """
+    if Config.GEMINI_BATCH_SIZE > 1:
+        future = gemini_batcher.submit((transcript, question, deadline))
+        try:
+            return future.result(timeout=None if deadline is None else max(0.0, deadline - time.monotonic()))
+        except TimeoutError:
+            raise GeminiError("Deadline reached while waiting for the batched Gemini call")
+    return analyze_with_gemini(transcript, question, deadline=deadline)
@@ -0,0 +1,390 @@
+import asyncio
+import contextlib
+import hashlib
+import random
+import threading
+import time
+from concurrent.futures import Future
+import httpx
+
+# HTTP statuses worth retrying: quota exhaustion and transient server errors
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+class GeminiError(Exception):
+    """Raised when Gemini cannot produce a response."""
+
+class RetryableGeminiError(GeminiError):
+    """A failure that may succeed on retry (quota, timeout, 5xx)."""
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class TokenBucket:
+    """
+    Thread-safe token bucket limiting the request rate.
+
+    Tokens refill continuously at 'rate' per second up to 'capacity';
+    each request takes one token, waiting if none is available.
+    """
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def try_take(self):
+        """Take a token if one is available; otherwise return the seconds to wait."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    def acquire(self, deadline=None):
+        """
+        Take one token, sleeping until it is available.
+
+        Returns:
+            False, without waiting, if the token would only be available
+            after the time.monotonic() deadline
+        """
+        while (wait := self.try_take()) > 0:
+            if deadline is not None and time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
+        return True
+
+    async def acquire_async(self, deadline=None):
+        """Take one token without blocking the event loop; see acquire."""
+        while (wait := self.try_take()) > 0:
+            if deadline is not None and time.monotonic() + wait > deadline:
+                return False
+            await asyncio.sleep(wait)
+        return True
+
+class GeminiMetrics:
+    """Counters for Gemini calls made by this process."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.successes = 0
+        self.failures = 0
+        self.retries = 0
+        self.coalesced = 0
+        self.queue_wait_total = 0.0
+        self.queue_wait_max = 0.0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+        self.calls = 0
+
+    def record(self, name, value=1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + value)
+
+    def record_call(self, queue_wait, latency):
+        with self._lock:
+            self.calls += 1
+            self.queue_wait_total += queue_wait
+            self.queue_wait_max = max(self.queue_wait_max, queue_wait)
+            self.latency_total += latency
+            self.latency_max = max(self.latency_max, latency)
+
+    def snapshot(self):
+        with self._lock:
+            calls = max(1, self.calls)
+            return {
+                'requests': self.requests,
+                'successes': self.successes,
+                'failures': self.failures,
+                'retries': self.retries,
+                'coalesced': self.coalesced,
+                'calls': self.calls,
+                'queue_wait_avg_s': self.queue_wait_total / calls,
+                'queue_wait_max_s': self.queue_wait_max,
+                'latency_avg_s': self.latency_total / calls,
+                'latency_max_s': self.latency_max
+            }
+
+def _request_payload(prompt):
+    return {'contents': [{'parts': [{'text': prompt}]}]}
+
+def _parse_response(response):
+    """Return the text of a generateContent reply or raise the matching error."""
+    if response.status_code in RETRYABLE_STATUS:
+        retry_after = response.headers.get('retry-after')
+        raise RetryableGeminiError(
+            f"HTTP {response.status_code}",
+            retry_after=float(retry_after) if retry_after and retry_after.isdigit() else None
+        )
+    if response.status_code != 200:
+        raise GeminiError(f"HTTP {response.status_code}: {response.text[:200]}")
+
+    try:
+        parts = response.json()['candidates'][0]['content']['parts']
+    except (ValueError, KeyError, IndexError) as e:
+        raise GeminiError(f"Unexpected response format: {e}")
+    return ''.join(part.get('text', '') for part in parts)
+
+def _remaining(deadline):
+    """Seconds left before a time.monotonic() deadline, or None for no deadline."""
+    return None if deadline is None else deadline - time.monotonic()
+
+def _deadline_error(attempts, error):
+    if error is None:
+        return GeminiError("Deadline reached before the Gemini request could be sent")
+    return GeminiError(f"Deadline reached after {attempts} attempts: {error}")
+
+def _backoff_delay(attempt, error, base, maximum):
+    # Full jitter spreads retries from many workers hitting the same quota
+    delay = random.uniform(0, min(maximum, base * 2 ** attempt))
+    if error.retry_after:
+        delay = max(delay, error.retry_after)
+    return delay
+
+@contextlib.contextmanager
+def _transport_errors():
+    """Turn httpx timeouts and connection failures into retryable errors."""
+    try:
+        yield
+    except httpx.TimeoutException as e:
+        raise RetryableGeminiError(f"timeout: {e}")
+    except httpx.TransportError as e:
+        raise RetryableGeminiError(f"connection error: {e}")
+
+class _RetryPolicy:
+    """
+    Rate limit, timeouts, retries and deadline shared by both clients.
+
+    The clients only differ in how they wait (threads or the event loop);
+    every decision about whether and when to try again is made here.
+    """
+    def __init__(self, model, base_url, rate_per_second, burst, request_timeout, max_retries,
+                 backoff_base, backoff_max):
+        self.model = model
+        self.url = f"{base_url.rstrip('/')}/v1beta/models/{model}:generateContent"
+        self.request_timeout = request_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.metrics = GeminiMetrics()
+        self._bucket = TokenBucket(rate_per_second, burst)
+        self._inflight = {}
+
+    @staticmethod
+    def _wait_timeout(deadline):
+        """How long to wait for a concurrency slot: until the deadline, or forever."""
+        remaining = _remaining(deadline)
+        return None if remaining is None else max(0.0, remaining)
+
+    def _request_timeout(self, attempt, error, deadline):
+        """
+        Timeout for the next HTTP request: the last request before a
+        deadline only gets the time that is left.
+
+        Raises:
+            GeminiError: if the deadline has already passed
+        """
+        remaining = _remaining(deadline)
+        if remaining is None:
+            return self.request_timeout
+        if remaining <= 0:
+            raise _deadline_error(attempt, error)
+        return min(self.request_timeout, remaining)
+
+    def _retry_delay(self, attempt, error, deadline):
+        """
+        Seconds to wait before retrying after a retryable error.
+
+        Raises:
+            GeminiError: if the retries are used up or the retry could not
+                start before the deadline
+        """
+        if attempt == self.max_retries:
+            raise GeminiError(f"Gemini request failed after {self.max_retries + 1} attempts: {error}")
+        delay = _backoff_delay(attempt, error, self.backoff_base, self.backoff_max)
+        remaining = _remaining(deadline)
+        if remaining is not None and delay >= remaining:
+            raise _deadline_error(attempt + 1, error)
+        self.metrics.record('retries')
+        print(f"Gemini call failed ({error}), retrying in {delay:.2f}s")
+        return delay
+
+class GeminiClient(_RetryPolicy):
+    """
+    Gemini REST client shared by all threads of a process.
+
+    Adds what a single model.generate_content call lacks under load:
+    - a token-bucket rate limit and a cap on concurrent requests
+    - a hard timeout per HTTP request
+    - retries with exponential backoff and full jitter on quota/5xx errors
+    - coalescing of identical prompts that are already in flight
+    - an optional deadline per call, after which no further attempt is made
+    The base URL is configurable so tests can point it at a fake server.
+    """
+    def __init__(self, api_key, model, base_url, rate_per_second, burst, max_concurrency,
+                 request_timeout, max_retries, backoff_base, backoff_max):
+        super().__init__(model, base_url, rate_per_second, burst, request_timeout, max_retries,
+                         backoff_base, backoff_max)
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._inflight_lock = threading.Lock()
+        self._http = httpx.Client(
+            headers={'x-goog-api-key': api_key},
+            timeout=request_timeout,
+            limits=httpx.Limits(max_connections=max_concurrency)
+        )
+
+    def generate(self, prompt, deadline=None):
+        """
+        Send a prompt and return the response text.
+
+        Args:
+            prompt: Prompt text
+            deadline: time.monotonic() value after which the caller no
+                longer needs the answer; requests are cut short and no
+                retry is started past it
+
+        Raises:
+            GeminiError: if no response could be obtained after retries
+                or before the deadline
+        """
+        self.metrics.record('requests')
+        key = hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+
+        with self._inflight_lock:
+            pending = self._inflight.get(key)
+            if pending is None:
+                future = Future()
+                self._inflight[key] = future
+        if pending is not None:
+            # Same prompt already being sent (e.g. a double submit): share its result
+            self.metrics.record('coalesced')
+            try:
+                return pending.result(timeout=_remaining(deadline))
+            except TimeoutError:
+                raise _deadline_error(0, None)
+
+        try:
+            text = self._generate_with_retries(prompt, deadline)
+            future.set_result(text)
+            self.metrics.record('successes')
+            return text
+        except Exception as e:
+            future.set_exception(e)
+            self.metrics.record('failures')
+            raise
+        finally:
+            with self._inflight_lock:
+                del self._inflight[key]
+
+    def _generate_with_retries(self, prompt, deadline=None):
+        error = None
+        for attempt in range(self.max_retries + 1):
+            queued = time.monotonic()
+            # Waiting for a slot or a token stops at the deadline too
+            if not self._slots.acquire(timeout=self._wait_timeout(deadline)):
+                raise _deadline_error(attempt, error)
+            try:
+                if not self._bucket.acquire(deadline):
+                    raise _deadline_error(attempt, error)
+                timeout = self._request_timeout(attempt, error, deadline)
+                started = time.monotonic()
+                try:
+                    return self._call(prompt, timeout)
+                except RetryableGeminiError as e:
+                    error = e
+                finally:
+                    self.metrics.record_call(started - queued, time.monotonic() - started)
+            finally:
+                self._slots.release()
+            time.sleep(self._retry_delay(attempt, error, deadline))
+
+    def _call(self, prompt, timeout):
+        with _transport_errors():
+            response = self._http.post(self.url, json=_request_payload(prompt), timeout=timeout)
+        return _parse_response(response)
+
+class AsyncGeminiClient(_RetryPolicy):
+    """
+    asyncio counterpart of GeminiClient for the ASGI server.
+
+    Same rate limit, concurrency cap, timeouts, retries and coalescing,
+    but waiting never holds a thread, so one process can keep hundreds
+    of requests in flight. Must be created and used on a single event loop.
+    """
+    def __init__(self, api_key, model, base_url, rate_per_second, burst, max_concurrency,
+                 request_timeout, max_retries, backoff_base, backoff_max):
+        super().__init__(model, base_url, rate_per_second, burst, request_timeout, max_retries,
+                         backoff_base, backoff_max)
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self._http = httpx.AsyncClient(
+            headers={'x-goog-api-key': api_key},
+            timeout=request_timeout,
+            limits=httpx.Limits(max_connections=max_concurrency)
+        )
+
+    async def generate(self, prompt, deadline=None):
+        """
+        Send a prompt and return the response text.
+
+        Args:
+            prompt: Prompt text
+            deadline: time.monotonic() value after which no retry is started
+
+        Raises:
+            GeminiError: if no response could be obtained after retries
+                or before the deadline
+        """
+        self.metrics.record('requests')
+        key = hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.metrics.record('coalesced')
+            # shield: one waiter being cancelled must not cancel the shared call
+            return await asyncio.shield(pending)
+
+        task = asyncio.ensure_future(self._generate_with_retries(prompt, deadline))
+        self._inflight[key] = task
+        task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        try:
+            text = await asyncio.shield(task)
+        except GeminiError:
+            self.metrics.record('failures')
+            raise
+        self.metrics.record('successes')
+        return text
+
+    async def _generate_with_retries(self, prompt, deadline=None):
+        error = None
+        for attempt in range(self.max_retries + 1):
+            queued = time.monotonic()
+            try:
+                await asyncio.wait_for(self._slots.acquire(), self._wait_timeout(deadline))
+            except asyncio.TimeoutError:
+                raise _deadline_error(attempt, error)
+            try:
+                if not await self._bucket.acquire_async(deadline):
+                    raise _deadline_error(attempt, error)
+                timeout = self._request_timeout(attempt, error, deadline)
+                started = time.monotonic()
+                try:
+                    return await self._call(prompt, timeout)
+                except RetryableGeminiError as e:
+                    error = e
+                finally:
+                    self.metrics.record_call(started - queued, time.monotonic() - started)
+            finally:
+                self._slots.release()
+            await asyncio.sleep(self._retry_delay(attempt, error, deadline))
+
+    async def _call(self, prompt, timeout):
+        with _transport_errors():
+            response = await self._http.post(self.url, json=_request_payload(prompt), timeout=timeout)
+        return _parse_response(response)
+
+    async def aclose(self):
+        await self._http.aclose()
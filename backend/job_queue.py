@@ -0,0 +1,228 @@
+import os
+import signal
+import socket
+import threading
+from datetime import datetime, timedelta
+from multiprocessing import Process
+from models import db, Job
+from model_registry import registry
+from pipeline import process_response, remove_upload
+from streaming import expire_abandoned_streams, transcribe_stream_windows, process_stream
+
+def enqueue_job(question_id, question_text, audio_path=None, audio_data=None, user_id=None):
+    """
+    Persist a new analysis job so that a worker can pick it up.
+
+    Args:
+        question_id: ID of the question that was answered
+        question_text: Question text used as context for the analysis
+        audio_path: Path to the saved upload, for uploads spooled to disk
+        audio_data: Upload bytes, for uploads kept in memory
+        user_id: ID of the user who answered, if known
+
+    Returns:
+        The created Job
+    """
+    job = Job(
+        question_id=question_id,
+        question_text=question_text,
+        audio_path=audio_path,
+        audio_data=audio_data,
+        user_id=user_id,
+        status=Job.PENDING
+    )
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+def claim_next_job(worker_id):
+    """
+    Atomically move the oldest pending job to the running state.
+
+    The conditional UPDATE guarantees that only one worker wins a job even
+    when several workers poll the same database concurrently.
+
+    Returns:
+        The claimed Job, or None if the queue is empty
+    """
+    while True:
+        candidate = (db.session.query(Job.id)
+                     .filter(Job.status == Job.PENDING)
+                     .order_by(Job.created_at)
+                     .first())
+        if candidate is None:
+            db.session.rollback()
+            return None
+
+        claimed = (Job.query
+                   .filter(Job.id == candidate.id, Job.status == Job.PENDING)
+                   .update({
+                       'status': Job.RUNNING,
+                       'worker_id': worker_id,
+                       'started_at': datetime.utcnow(),
+                       'attempts': Job.attempts + 1
+                   }, synchronize_session=False))
+        db.session.commit()
+        if claimed:
+            return db.session.get(Job, candidate.id)
+        # Another worker claimed it first; try the next one
+
+def requeue_stale_jobs(stale_after, max_attempts, worker_id=None):
+    """
+    Return jobs left running by a crashed worker to the queue.
+
+    Jobs that already used up max_attempts are marked as failed instead.
+    When worker_id is given, all running jobs of that worker are requeued
+    regardless of their age.
+    """
+    stale = Job.query.filter(Job.status == Job.RUNNING)
+    if worker_id:
+        stale = stale.filter(Job.worker_id == worker_id)
+    else:
+        cutoff = datetime.utcnow() - timedelta(seconds=stale_after)
+        stale = stale.filter(Job.started_at < cutoff)
+    for job in stale.all():
+        if (job.attempts or 0) >= max_attempts:
+            job.status = Job.FAILED
+            job.error = 'Job exceeded the maximum number of attempts'
+            job.finished_at = datetime.utcnow()
+            if job.kind == Job.ANALYZE:
+                remove_upload(job.audio_path)
+                job.audio_data = None
+        else:
+            job.status = Job.PENDING
+            job.worker_id = None
+    db.session.commit()
+
+def run_job(job, max_attempts=1):
+    """
+    Process a claimed job and record its outcome.
+
+    A job that raises is returned to the queue until it has been tried
+    max_attempts times (counting attempts cut short by a worker crash),
+    so transient errors such as a failed decode or a locked database are
+    retried; after that it is marked as failed.
+    """
+    print(f"Processing {job.kind} job {job.id}")
+    try:
+        if job.kind == Job.STREAM_WINDOW:
+            transcribe_stream_windows(job.stream_id)
+        else:
+            if job.stream_id:
+                payload = process_stream(job)
+            else:
+                audio = job.audio_data if job.audio_data is not None else job.audio_path
+                payload = process_response(audio, job.question_id, job.question_text, user_id=job.user_id)
+            job.response_id = payload['response_id']
+            job.result = payload
+        job.status = Job.COMPLETED
+        job.error = None  # From an earlier, failed attempt
+    except Exception as e:
+        db.session.rollback()
+        job.error = f'Error processing audio: {str(e)}'
+        if (job.attempts or 0) < max_attempts:
+            print(f"Error processing job {job.id} (attempt {job.attempts} of {max_attempts}), requeueing: {str(e)}")
+            job.status = Job.PENDING
+            job.worker_id = None
+            db.session.commit()
+            return
+        print(f"Error processing job {job.id}: {str(e)}")
+        job.status = Job.FAILED
+
+    # Streamed audio is still growing until its final analysis job has run
+    if job.kind == Job.ANALYZE:
+        remove_upload(job.audio_path)
+        job.audio_data = None
+
+    job.finished_at = datetime.utcnow()
+    db.session.commit()
+
+def run_worker(app, worker_id=None):
+    """
+    Drain the job queue until the process receives SIGTERM or SIGINT.
+
+    Runs WORKER_THREADS polling threads so that several jobs can be in
+    flight in one process, which lets them share batched transcription.
+
+    Args:
+        app: Flask application providing configuration and database access
+        worker_id: Identifier recorded on claimed jobs
+    """
+    worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+    stop_event = threading.Event()
+
+    def request_stop(signum, frame):
+        stop_event.set()
+
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+
+    if app.config['WARMUP_ON_START']:
+        # Load models before claiming work so the first job is not slowed down
+        try:
+            registry.warm_up()
+        except Exception as e:
+            print(f"Warning: model warm-up failed: {str(e)}")
+
+    with app.app_context():
+        # Connections inherited from a forked parent must not be shared
+        db.engine.dispose(close=False)
+
+    threads = [
+        threading.Thread(target=_drain_queue, args=(app, worker_id, stop_event),
+                         name=f"job-thread-{index}")
+        for index in range(app.config['WORKER_THREADS'])
+    ]
+    print(f"Worker {worker_id} started with {len(threads)} thread(s)")
+    for thread in threads:
+        thread.start()
+    # Wake up periodically so signal handlers run in the main thread
+    while any(thread.is_alive() for thread in threads):
+        for thread in threads:
+            thread.join(timeout=1)
+    if registry.is_loaded('gemini'):
+        print(f"Worker {worker_id} Gemini metrics: {registry.get('gemini').metrics.snapshot()}")
+    print(f"Worker {worker_id} stopped")
+
+def _drain_queue(app, worker_id, stop_event):
+    poll_interval = app.config['JOB_POLL_INTERVAL']
+    with app.app_context():
+        while not stop_event.is_set():
+            job = claim_next_job(worker_id)
+            if job is None:
+                stop_event.wait(poll_interval)
+                continue
+            run_job(job, app.config['JOB_MAX_ATTEMPTS'])
+
+def worker_name(pid, index):
+    """Identifier recorded on jobs claimed by a pooled worker process."""
+    return f"{socket.gethostname()}:{pid}:{index}"
+
+def _worker_main(index):
+    # Import inside the child so every process builds its own app, engine and models
+    from app import app
+    run_worker(app, worker_name(os.getpid(), index))
+
+def start_worker_pool(app, count=None):
+    """
+    Start a pool of worker processes draining the job queue.
+
+    Args:
+        app: Flask application used to requeue stale jobs before starting
+        count: Number of worker processes (defaults to WORKER_COUNT)
+
+    Returns:
+        List of started Process objects
+    """
+    count = count or app.config['WORKER_COUNT']
+    with app.app_context():
+        db.create_all()
+        requeue_stale_jobs(app.config['JOB_STALE_AFTER'], app.config['JOB_MAX_ATTEMPTS'])
+        expire_abandoned_streams(app.config['STREAM_TTL'])
+
+    processes = []
+    for index in range(count):
+        process = Process(target=_worker_main, args=(index,), name=f"analysis-worker-{index}")
+        process.start()
+        processes.append(process)
+    return processes
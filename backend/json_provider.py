@@ -0,0 +1,33 @@
+import json
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def dumps_bytes(obj):
+    """Compact UTF-8 JSON for API responses, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(obj, default=DefaultJSONProvider.default,
+                            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME)
+    return json.dumps(obj, default=DefaultJSONProvider.default, ensure_ascii=False,
+                      separators=(',', ':')).encode('utf-8')
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    Flask JSON provider backed by orjson.
+
+    Dates are passed through to Flask's default handler so they are
+    formatted exactly as with the stdlib provider.
+    """
+    def dumps(self, obj, **kwargs):
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if kwargs.get('indent'):
+            option |= orjson.OPT_INDENT_2
+        if kwargs.get('sort_keys', self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=kwargs.get('default', self.default), option=option).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
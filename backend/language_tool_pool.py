@@ -0,0 +1,208 @@
+import atexit
+import http.client
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+class LanguageToolUnavailable(RuntimeError):
+    """No healthy LanguageTool server could run the check in time."""
+
+def _is_server_failure(error):
+    """
+    Whether an error from LanguageTool.check means the server itself failed.
+
+    language_tool_python wraps both connection errors and rejected input
+    (a 4xx answer that is not JSON) in LanguageToolError, so look at what
+    it was raised from: only an I/O or HTTP protocol error means the
+    server is down. JSON decode errors are ValueErrors, even where
+    requests also derives them from IOError.
+    """
+    while error is not None:
+        if isinstance(error, (OSError, http.client.HTTPException)) and not isinstance(error, ValueError):
+            return True
+        error = error.__cause__ or error.__context__
+    return False
+
+class _Server:
+    """One LanguageTool server process and the checks currently sent to it."""
+    def __init__(self, index):
+        self.index = index
+        self.tool = None
+        self.in_flight = 0
+        self.healthy = False
+        self.restarts = 0
+
+class LanguageToolPool:
+    """
+    Pool of local LanguageTool servers with least-loaded dispatch.
+
+    Each check goes to the healthy server with the fewest checks in
+    flight, so concurrent analyses no longer queue behind one Java
+    process. A check that loses its connection or takes longer than
+    `timeout` seconds marks its server unhealthy; it is restarted in the background and
+    the check is retried once on another server. A monitor thread also
+    probes idle servers every `health_interval` seconds.
+
+    Offers the check() method of language_tool_python.LanguageTool, so it
+    can be used in its place.
+    """
+    HEALTH_TEXT = 'This is a health check.'
+
+    def __init__(self, size, language='en-US', timeout=10.0, disabled_rules=(), disabled_categories=(),
+                 health_interval=30.0, factory=None):
+        self.size = size
+        self.language = language
+        self.timeout = timeout
+        self.disabled_rules = set(disabled_rules)
+        self.disabled_categories = set(disabled_categories)
+        self.health_interval = health_interval
+        self._factory = factory or self._start_server
+        self._servers = [_Server(index) for index in range(size)]
+        self._lock = threading.Lock()
+        # The calling thread waits on a future so a hung server cannot block it past the timeout
+        self._executor = ThreadPoolExecutor(max_workers=size * 4, thread_name_prefix='language-tool')
+        self._closed = threading.Event()
+
+        # Java servers take seconds to start; start them side by side
+        with ThreadPoolExecutor(max_workers=size) as starter:
+            list(starter.map(self._restart, self._servers))
+        if not any(server.healthy for server in self._servers):
+            raise LanguageToolUnavailable('No LanguageTool server could be started')
+
+        self._monitor = threading.Thread(target=self._monitor_health, name='language-tool-health', daemon=True)
+        self._monitor.start()
+
+    def _start_server(self):
+        import language_tool_python
+        return language_tool_python.LanguageTool(self.language)
+
+    def _restart(self, server):
+        """Replace a server's LanguageTool process with a fresh one."""
+        if self._closed.is_set():
+            return
+        old, server.tool = server.tool, None
+        if old is not None:
+            try:
+                old.close()
+            except Exception as e:
+                print(f"Warning: closing LanguageTool server {server.index} failed: {str(e)}")
+        try:
+            tool = self._factory()
+            tool.disabled_rules.update(self.disabled_rules)
+            tool.disabled_categories.update(self.disabled_categories)
+        except Exception as e:
+            print(f"Error starting LanguageTool server {server.index}: {str(e)}")
+            return
+        with self._lock:
+            server.tool = tool
+            server.healthy = True
+        print(f"LanguageTool server {server.index} ready")
+
+    def _mark_unhealthy(self, server, reason):
+        with self._lock:
+            if not server.healthy:
+                return  # Already being restarted
+            server.healthy = False
+            server.restarts += 1
+        print(f"Restarting LanguageTool server {server.index}: {reason}")
+        threading.Thread(target=self._restart, args=(server,), daemon=True).start()
+
+    def _acquire(self, exclude=None):
+        """Least-loaded healthy server and its tool, counted as busy until released."""
+        with self._lock:
+            candidates = [s for s in self._servers if s.healthy and s is not exclude]
+            if not candidates:
+                return None, None
+            server = min(candidates, key=lambda s: s.in_flight)
+            server.in_flight += 1
+            return server, server.tool
+
+    def _release(self, server):
+        with self._lock:
+            server.in_flight -= 1
+
+    def _check_on(self, server, tool, text):
+        future = self._executor.submit(tool.check, text)
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            reason = f"check took longer than {self.timeout:g}s"
+            self._mark_unhealthy(server, reason)
+            raise LanguageToolUnavailable(reason)
+        except Exception as e:
+            # Errors caused by the text itself would fail on every server; leave them to the caller
+            if not _is_server_failure(e):
+                raise
+            self._mark_unhealthy(server, str(e))
+            raise LanguageToolUnavailable(str(e)) from e
+        finally:
+            self._release(server)
+
+    def check(self, text):
+        """
+        Grammar matches for text, as LanguageTool.check returns them.
+
+        An attempt that times out or loses its connection is retried once
+        on another server, so a call can take up to twice the timeout.
+        Other errors (such as LanguageTool rejecting the text) are raised
+        as they are, without restarting the server.
+
+        Raises:
+            LanguageToolUnavailable: if no healthy server answered in time
+        """
+        failed = None
+        for _ in range(2):  # One retry on another server
+            server, tool = self._acquire(exclude=failed)
+            if server is None:
+                break
+            try:
+                return self._check_on(server, tool, text)
+            except LanguageToolUnavailable as e:
+                print(f"Warning: LanguageTool check on server {server.index} failed: {str(e)}")
+                failed = server
+        raise LanguageToolUnavailable('No healthy LanguageTool server could check the text')
+
+    def _monitor_health(self):
+        while not self._closed.wait(self.health_interval):
+            for server in self._servers:
+                with self._lock:
+                    # Busy servers are answering checks, which is health check enough
+                    if not server.healthy or server.in_flight:
+                        continue
+                    server.in_flight += 1
+                    tool = server.tool
+                try:
+                    self._check_on(server, tool, self.HEALTH_TEXT)
+                except Exception:
+                    pass  # Restart already scheduled
+
+    def stats(self):
+        """Health, load and restart count of every server."""
+        with self._lock:
+            return [{'index': s.index, 'healthy': s.healthy, 'in_flight': s.in_flight, 'restarts': s.restarts}
+                    for s in self._servers]
+
+    def close(self):
+        """Stop the monitor and every server process."""
+        self._closed.set()
+        for server in self._servers:
+            with self._lock:
+                tool, server.tool, server.healthy = server.tool, None, False
+            if tool is not None:
+                try:
+                    tool.close()
+                except Exception:
+                    pass
+        self._executor.shutdown(wait=False)
+
+def create_pool(config):
+    """Build the pool from Config settings and stop it when the process exits."""
+    pool = LanguageToolPool(
+        config.LANGUAGE_TOOL_POOL_SIZE,
+        language=config.LANGUAGE_TOOL_LANGUAGE,
+        timeout=config.LANGUAGE_TOOL_TIMEOUT,
+        disabled_rules=config.LANGUAGE_TOOL_DISABLED_RULES,
+        disabled_categories=config.LANGUAGE_TOOL_DISABLED_CATEGORIES,
+        health_interval=config.LANGUAGE_TOOL_HEALTH_INTERVAL
+    )
+    atexit.register(pool.close)
+    return pool
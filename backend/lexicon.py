@@ -0,0 +1,109 @@
+"""
+Word lists used by the NLP scoring, compiled once at import.
+
+Phrases are matched against lowercased spaCy tokens, so multi-word
+entries must be written the way spaCy tokenizes them.
+"""
+
+FILLER_WORDS = (
+    'um', 'uh', 'er', 'ah', 'like', 'you know', 'sort of', 'kind of', 'well', 'basically', 'actually',
+    'i mean', 'you see', 'right', 'okay', 'so', 'just', 'really', 'literally', 'honestly', 'frankly',
+    'absolutely', 'definitely', 'certainly', 'obviously', 'clearly', 'apparently',
+    'supposedly', 'allegedly', 'reportedly', 'presumably', 'evidently', 'seemingly', 'ostensibly'
+)
+
+# Simple first-person constructions that suggest a limited grammatical range
+BASIC_PATTERNS = (
+    'i am', 'i like', 'i want', 'i have', 'i can', 'i will', 'i think', 'i know', 'i feel',
+    'i need', 'i should', 'i would', 'i could', 'i must', 'i would like',
+    'i want to', 'i have to', 'i need to', 'i like to', 'i want to be', 'i am going to',
+    'i believe', 'i understand', 'i agree', 'i disagree', 'i hope', 'i wish', 'i prefer',
+    'i enjoy', 'i love', 'i hate', 'i dislike', 'i might', 'i may', 'i got to',
+    'i got ta'  # spaCy splits "gotta" into "got" + "ta"
+)
+
+COMMON_WORDS = frozenset({
+    'the', 'be', 'to', 'of', 'and', 'a', 'in', 'that', 'have', 'i', 'it', 'for', 'not', 'on', 'with',
+    'he', 'as', 'you', 'do', 'at', 'this', 'but', 'his', 'by', 'from', 'they', 'we', 'say', 'her', 'she',
+    'or', 'an', 'will', 'my', 'one', 'all', 'would', 'there', 'their', 'what', 'so', 'up', 'out', 'if',
+    'about', 'who', 'get', 'which', 'go', 'me', 'when', 'make', 'can', 'like', 'time', 'no', 'just',
+    'him', 'know', 'take', 'people', 'into', 'year', 'your', 'good', 'some', 'could', 'them', 'see',
+    'other', 'than', 'then', 'now', 'look', 'only', 'come', 'its', 'over', 'think', 'also', 'back',
+    'after', 'use', 'two', 'how', 'our', 'work', 'first', 'well', 'way', 'even', 'new', 'want', 'because',
+    'any', 'these', 'give', 'day', 'most', 'us', 'very', 'many', 'much', 'more', 'such',
+    'little', 'nor', 'too', 'should'
+})
+
+_END = None  # Trie key marking the end of a phrase; tokens are never None
+
+class TokenTrie:
+    """
+    Trie over the tokens of a fixed set of phrases.
+
+    Matches only whole tokens, so 'so' does not match inside 'also'.
+    Matching walks at most max_length tokens from each position, so a
+    pass is linear in the number of tokens and does not depend on how
+    many phrases the trie holds.
+    """
+    def __init__(self, phrases):
+        self.phrases = tuple(dict.fromkeys(phrases))  # Drop duplicates, keep order
+        self.max_length = 0
+        self._root = {}
+        for phrase in self.phrases:
+            words = phrase.split()
+            node = self._root
+            for word in words:
+                node = node.setdefault(word, {})
+            node[_END] = phrase
+            self.max_length = max(self.max_length, len(words))
+
+    def _matches_at(self, tokens, start):
+        """List of (end, phrase) for every phrase starting at tokens[start], shortest first."""
+        node = self._root.get(tokens[start])
+        if node is None:  # Most tokens start no phrase
+            return ()
+        matches = []
+        end = start + 1
+        while True:
+            if _END in node:
+                matches.append((end, node[_END]))
+            if end == len(tokens):
+                return matches
+            node = node.get(tokens[end])
+            if node is None:
+                return matches
+            end += 1
+
+    def find_all(self, tokens):
+        """
+        Every occurrence of every phrase, including nested and overlapping ones.
+
+        Returns:
+            List of (start, end, phrase) token spans
+        """
+        return [(start, end, phrase)
+                for start in range(len(tokens))
+                for end, phrase in self._matches_at(tokens, start)]
+
+    def find_longest(self, tokens):
+        """
+        Non-overlapping occurrences, preferring the longest phrase at the
+        leftmost position (so 'you know' is one match, not two).
+
+        Returns:
+            List of (start, end, phrase) token spans
+        """
+        matches = []
+        start = 0
+        while start < len(tokens):
+            found = self._matches_at(tokens, start)
+            if found:
+                end, phrase = found[-1]
+                matches.append((start, end, phrase))
+                start = end
+            else:
+                start += 1
+        return matches
+
+fillers = TokenTrie(FILLER_WORDS)
+basic_patterns = TokenTrie(BASIC_PATTERNS)
@@ -0,0 +1,98 @@
+from sqlalchemy import inspect, text
+from models import db
+
+# (version, description, function taking a Connection), applied in order
+MIGRATIONS = []
+
+def migration(version, description):
+    """Register a schema migration; versions must increase by one."""
+    def register(func):
+        assert version == len(MIGRATIONS) + 1, f"migration {version} registered out of order"
+        MIGRATIONS.append((version, description, func))
+        return func
+    return register
+
+def add_column(conn, table, column, ddl):
+    """ALTER TABLE ... ADD COLUMN unless the column already exists (e.g. created by create_all)."""
+    columns = {c['name'] for c in inspect(conn).get_columns(table)}
+    if column not in columns:
+        conn.execute(text(f'ALTER TABLE {table} ADD COLUMN {column} {ddl}'))
+
+def create_index(conn, name, table, columns):
+    """CREATE INDEX unless an index with this name already exists."""
+    existing = {index['name'] for index in inspect(conn).get_indexes(table)}
+    if name not in existing:
+        conn.execute(text(f'CREATE INDEX {name} ON {table} ({", ".join(columns)})'))
+
+@migration(1, 'Question part, user IDs on responses, jobs and streams')
+def _add_part_and_user_ids(conn):
+    add_column(conn, 'question', 'part', 'INTEGER NOT NULL DEFAULT 1')
+    add_column(conn, 'response', 'user_id', 'VARCHAR(100)')
+    create_index(conn, 'ix_response_user_id', 'response', ['user_id'])
+    add_column(conn, 'job', 'user_id', 'VARCHAR(100)')
+    add_column(conn, 'stream_session', 'user_id', 'VARCHAR(100)')
+
+@migration(2, 'Indexes on foreign keys, timestamps and queue lookups')
+def _add_indexes(conn):
+    create_index(conn, 'ix_question_topic', 'question', ['topic'])
+    create_index(conn, 'ix_response_question_id', 'response', ['question_id'])
+    create_index(conn, 'ix_response_created_at', 'response', ['created_at'])
+    create_index(conn, 'ix_response_user_id_created_at', 'response', ['user_id', 'created_at'])
+    # Superseded by the composite index above
+    conn.execute(text('DROP INDEX IF EXISTS ix_response_user_id'))
+    create_index(conn, 'ix_result_response_id', 'result', ['response_id'])
+    create_index(conn, 'ix_result_created_at', 'result', ['created_at'])
+    create_index(conn, 'ix_job_status_created_at', 'job', ['status', 'created_at'])
+    create_index(conn, 'ix_job_stream_id', 'job', ['stream_id'])
+
+@migration(3, 'Per-criterion totals and rolling averages on user progress')
+def _add_progress_criteria(conn):
+    for criterion in ('fluency', 'vocabulary', 'grammar', 'coherence'):
+        add_column(conn, 'user_progress', f'{criterion}_total', 'FLOAT NOT NULL DEFAULT 0')
+    for criterion in ('overall', 'fluency', 'vocabulary', 'grammar', 'coherence'):
+        add_column(conn, 'user_progress', f'{criterion}_rolling', 'FLOAT NOT NULL DEFAULT 0')
+
+@migration(4, 'JSON feedback, sub-analyses and job results')
+def _use_json_columns(conn):
+    add_column(conn, 'result', 'nlp_analysis', 'JSON')
+    add_column(conn, 'result', 'gemini_analysis', 'JSON')
+    # SQLite keeps JSON as text, so the existing JSON strings already decode;
+    # PostgreSQL needs the column type changed (and rejects non-JSON text)
+    if conn.dialect.name == 'postgresql':
+        for table, column in (('result', 'feedback'), ('job', 'result')):
+            conn.execute(text(f'ALTER TABLE {table} ALTER COLUMN {column} TYPE JSON USING {column}::json'))
+
+@migration(5, 'Question update timestamps for the sampling index')
+def _add_question_updated_at(conn):
+    add_column(conn, 'question', 'updated_at', 'TIMESTAMP')
+    conn.execute(text('UPDATE question SET updated_at = created_at WHERE updated_at IS NULL'))
+
+def current_version(conn):
+    conn.execute(text('CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL)'))
+    version = conn.execute(text('SELECT MAX(version) FROM schema_version')).scalar()
+    return version or 0
+
+def upgrade():
+    """
+    Apply pending migrations, each in its own transaction.
+
+    Tables that do not exist yet are created by db.create_all() with the
+    current columns, so migrations only patch databases created by an
+    older version and are written to be no-ops otherwise.
+    Must be called inside an application context, after db.create_all().
+
+    Returns:
+        The schema version after the upgrade
+    """
+    with db.engine.begin() as conn:
+        version = current_version(conn)
+
+    for target, description, func in MIGRATIONS:
+        if target <= version:
+            continue
+        with db.engine.begin() as conn:
+            func(conn)
+            conn.execute(text('INSERT INTO schema_version (version) VALUES (:version)'), {'version': target})
+        print(f"Applied migration {target}: {description}")
+        version = target
+    return version
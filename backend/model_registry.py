@@ -0,0 +1,67 @@
+import threading
+import time
+
+class ModelRegistry:
+    """
+    Registry of heavy resources that are loaded lazily on first use.
+
+    Each resource is registered with a loader function and is only loaded
+    when first requested. Loading is thread-safe: concurrent callers wait
+    for a single load instead of loading the model twice.
+    """
+    def __init__(self):
+        self._loaders = {}
+        self._models = {}
+        self._load_seconds = {}
+        self._locks = {}
+        self._registry_lock = threading.Lock()
+
+    def register(self, name, loader):
+        """Register a zero-argument loader under the given name."""
+        with self._registry_lock:
+            self._loaders[name] = loader
+            self._locks[name] = threading.Lock()
+
+    def get(self, name):
+        """Return the named resource, loading it on first use."""
+        model = self._models.get(name)
+        if model is not None:
+            return model
+
+        if name not in self._loaders:
+            raise KeyError(f"No model registered under '{name}'")
+
+        with self._locks[name]:
+            # Another thread may have finished loading while we waited
+            if name not in self._models:
+                print(f"Loading model '{name}'...")
+                started = time.perf_counter()
+                self._models[name] = self._loaders[name]()
+                self._load_seconds[name] = time.perf_counter() - started
+                print(f"Loaded model '{name}' in {self._load_seconds[name]:.2f}s")
+        return self._models[name]
+
+    def is_loaded(self, name):
+        return name in self._models
+
+    def warm_up(self, names=None):
+        """
+        Load the given resources (all registered ones by default).
+
+        Returns:
+            Dictionary mapping each name to its load time in seconds
+        """
+        for name in names or list(self._loaders):
+            self.get(name)
+        return {name: self._load_seconds.get(name) for name in names or list(self._loaders)}
+
+    def status(self):
+        """Load state and load time of every registered resource."""
+        return {
+            name: {
+                'loaded': name in self._models,
+                'load_seconds': self._load_seconds.get(name)
+            } for name in self._loaders
+        }
+
+registry = ModelRegistry()
@@ -1,56 +1,189 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import deferred
 from datetime import datetime
+import sqlite3
+import uuid
 
 db = SQLAlchemy()
 
+@event.listens_for(Engine, 'connect')
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Use WAL so readers are not blocked while a worker writes results."""
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute('PRAGMA synchronous=NORMAL')
+        cursor.close()
+
 class Question(db.Model):
     """Model for IELTS speaking questions."""
     id = db.Column(db.Integer, primary_key=True)
     text = db.Column(db.Text, nullable=False)
-    topic = db.Column(db.String(100), nullable=False)
+    part = db.Column(db.Integer, nullable=False, default=1)  # IELTS speaking part (1-3)
+    topic = db.Column(db.String(100), nullable=False, index=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Part of the question index signature, so edits to topic or part are noticed
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     responses = db.relationship('Response', backref='question', lazy=True)
 
     def to_dict(self):
         return {
             'id': self.id,
             'text': self.text,
+            'part': self.part,
             'topic': self.topic,
             'created_at': self.created_at.isoformat()
         }
 
 class Response(db.Model):
     """Model for user responses to IELTS questions."""
+    # A user's answers, newest first
+    __table_args__ = (db.Index('ix_response_user_id_created_at', 'user_id', 'created_at'),)
+
     id = db.Column(db.Integer, primary_key=True)
-    question_id = db.Column(db.Integer, db.ForeignKey('question.id'), nullable=False)
+    question_id = db.Column(db.Integer, db.ForeignKey('question.id'), nullable=False, index=True)
+    user_id = db.Column(db.String(100))  # Anonymous browser ID, if sent
     audio_path = db.Column(db.String(255), nullable=False)
     transcript = db.Column(db.Text)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     result = db.relationship('Result', backref='response', uselist=False)
 
 class Result(db.Model):
     """Model for analysis results of user responses."""
     id = db.Column(db.Integer, primary_key=True)
-    response_id = db.Column(db.Integer, db.ForeignKey('response.id'), nullable=False)
+    response_id = db.Column(db.Integer, db.ForeignKey('response.id'), nullable=False, index=True)
     fluency_score = db.Column(db.Float, nullable=False)
     vocabulary_score = db.Column(db.Float, nullable=False)
     grammar_score = db.Column(db.Float, nullable=False)
     coherence_score = db.Column(db.Float, nullable=False)
     overall_score = db.Column(db.Float, nullable=False)
-    feedback = db.Column(db.Text, nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # {'strengths': [...], 'weaknesses': [...], 'suggestions': [...]}, see schemas.Feedback
+    feedback = db.Column(db.JSON, nullable=False)
+    # Sub-analyses the combined scores were computed from
+    nlp_analysis = db.Column(db.JSON)
+    gemini_analysis = db.Column(db.JSON)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
 
 class UserProgress(db.Model):
-    """User progress tracking over time."""
+    """
+    User progress tracking over time.
+    Maintained incrementally by progress.record_result; never re-aggregated per request.
+    """
+    CRITERIA = ('fluency', 'vocabulary', 'grammar', 'coherence')
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.String(100), nullable=False, unique=True)
     test_count = db.Column(db.Integer, default=0)
     total_score = db.Column(db.Float, default=0.0)
     average_score = db.Column(db.Float, default=0.0)
     latest_score = db.Column(db.Float, default=0.0)
+    # Per-criterion sums, for lifetime averages
+    fluency_total = db.Column(db.Float, nullable=False, default=0.0)
+    vocabulary_total = db.Column(db.Float, nullable=False, default=0.0)
+    grammar_total = db.Column(db.Float, nullable=False, default=0.0)
+    coherence_total = db.Column(db.Float, nullable=False, default=0.0)
+    # Exponential moving averages weighted towards recent attempts
+    overall_rolling = db.Column(db.Float, nullable=False, default=0.0)
+    fluency_rolling = db.Column(db.Float, nullable=False, default=0.0)
+    vocabulary_rolling = db.Column(db.Float, nullable=False, default=0.0)
+    grammar_rolling = db.Column(db.Float, nullable=False, default=0.0)
+    coherence_rolling = db.Column(db.Float, nullable=False, default=0.0)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self):
+        count = self.test_count or 0
+        return {
+            'user_id': self.user_id,
+            'test_count': count,
+            'average_score': self.average_score or 0.0,
+            'latest_score': self.latest_score or 0.0,
+            'rolling_score': self.overall_rolling,
+            'criteria': {
+                name: {
+                    'average': getattr(self, f'{name}_total') / count if count else 0.0,
+                    'rolling': getattr(self, f'{name}_rolling')
+                } for name in self.CRITERIA
+            },
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
     
     def __repr__(self):
         return f'<UserProgress for user {self.user_id}, avg: {self.average_score}>'
 
+
+class Job(db.Model):
+    """Model for queued analysis jobs drained by the worker pool."""
+    PENDING = 'pending'
+    RUNNING = 'running'
+    COMPLETED = 'completed'
+    FAILED = 'failed'
+
+    # Job kinds
+    ANALYZE = 'analyze'  # Transcribe (if needed), score and store a full answer
+    STREAM_WINDOW = 'stream_window'  # Transcribe completed windows of a recording in progress
+
+    # Oldest pending job first (claim_next_job)
+    __table_args__ = (db.Index('ix_job_status_created_at', 'status', 'created_at'),)
+
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    kind = db.Column(db.String(20), nullable=False, default=ANALYZE)
+    status = db.Column(db.String(20), nullable=False, default=PENDING)
+    stream_id = db.Column(db.String(36), db.ForeignKey('stream_session.id'), index=True)
+    question_id = db.Column(db.Integer, nullable=False)
+    question_text = db.Column(db.Text, nullable=False)
+    user_id = db.Column(db.String(100))
+    # Small uploads are kept in audio_data; larger ones are spooled to audio_path.
+    # Deferred so that status polls and queue scans never load the recording
+    audio_path = db.Column(db.String(255))
+    audio_data = deferred(db.Column(db.LargeBinary))
+    response_id = db.Column(db.Integer, db.ForeignKey('response.id'))
+    result = db.Column(db.JSON)
+    error = db.Column(db.Text)
+    worker_id = db.Column(db.String(100))
+    attempts = db.Column(db.Integer, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'response_id': self.response_id,
+            'result': self.result,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+class StreamSession(db.Model):
+    """Recording uploaded in chunks while the user is still speaking."""
+    RECORDING = 'recording'
+    FINISHED = 'finished'
+
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    status = db.Column(db.String(20), nullable=False, default=RECORDING)
+    question_id = db.Column(db.Integer, nullable=False)
+    question_text = db.Column(db.Text, nullable=False)
+    user_id = db.Column(db.String(100))
+    audio_path = db.Column(db.String(255), nullable=False)
+    chunk_count = db.Column(db.Integer, nullable=False, default=0)
+    # Audio before this offset has already been transcribed into 'transcript'
+    transcribed_seconds = db.Column(db.Float, nullable=False, default=0.0)
+    transcript = db.Column(db.Text, nullable=False, default='')
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'status': self.status,
+            'chunk_count': self.chunk_count,
+            'transcribed_seconds': self.transcribed_seconds,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
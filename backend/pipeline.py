@@ -0,0 +1,213 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from config import Config
+from models import db, Response, Result
+from analysis_cache import hash_bytes
+from progress import record_result
+from schemas import AnalysisResult, Feedback
+from scoring_model import get_scoring_model
+from speech_analyzer import analyze_speech, transcribe_audio
+from gemini_analyzer import score_with_gemini
+
+def process_response(audio, question_id, question_context, user_id=None):
+    """
+    Run the full analysis pipeline for one recorded answer.
+    
+    Transcribes the audio, scores it with traditional NLP and Gemini AI,
+    and stores the Response and Result rows in a single transaction.
+    Must be called inside an application context.
+    
+    Args:
+        audio: Path to the uploaded audio file, or its bytes if kept in memory
+        question_id: ID of the question that was answered
+        question_context: Text of the question, used as Gemini context
+        user_id: ID of the user who answered, if known
+        
+    Returns:
+        Dictionary with response_id, transcript and combined analysis
+    """
+    # Transcribe audio
+    print("Starting audio transcription...")
+    transcription = transcribe_audio(audio)
+    print("Transcription completed")
+    
+    # In-memory uploads are referenced by content hash, which is also their cache key
+    audio_path = f"sha256:{hash_bytes(audio)}" if isinstance(audio, bytes) else audio
+    return analyze_and_store(transcription['text'], audio_path, question_id, question_context,
+                             timing=transcription['timing'], user_id=user_id)
+
+def analyze_and_store(transcript, audio_path, question_id, question_context, timing=None, user_id=None):
+    """
+    Score a transcript and store the Response and Result rows.
+    
+    Args:
+        transcript: Transcribed text of the answer
+        audio_path: Path recorded on the Response row
+        question_id: ID of the question that was answered
+        question_context: Text of the question, used as Gemini context
+        timing: Pause statistics of the recording, if available
+        user_id: ID of the user who answered, if known
+        
+    Returns:
+        Dictionary with response_id, transcript and combined analysis
+    """
+    # Score with traditional NLP and Gemini AI in parallel
+    nlp_analysis, gemini_analysis = run_analyses(transcript, question_context, timing)
+    return store_analysis(transcript, audio_path, question_id, nlp_analysis, gemini_analysis,
+                          user_id=user_id)
+
+def store_analysis(transcript, audio_path, question_id, nlp_analysis, gemini_analysis, user_id=None):
+    """
+    Combine finished analyses and store the Response and Result rows,
+    updating the user's progress in the same transaction.
+    
+    Returns:
+        Dictionary with response_id, transcript and combined analysis
+    """
+    # Combine analyses for final result
+    combined_analysis = combine_analyses(nlp_analysis, gemini_analysis)
+    
+    # Create response and result in a single transaction
+    try:
+        response = Response(
+            question_id=question_id,
+            user_id=user_id,
+            audio_path=audio_path,
+            transcript=transcript
+        )
+        db.session.add(response)
+        db.session.flush()  # Get the response ID without committing
+        
+        result = Result(
+            response_id=response.id,
+            **combined_analysis.scores(),
+            feedback=combined_analysis.feedback.to_dict(),
+            nlp_analysis=combined_analysis.nlp_analysis,
+            gemini_analysis=combined_analysis.gemini_analysis
+        )
+        db.session.add(result)
+        if user_id:
+            record_result(user_id, combined_analysis)
+        db.session.commit()
+        print("Database records created successfully")
+    except Exception:
+        db.session.rollback()
+        raise
+    
+    return {
+        'response_id': response.id,
+        'transcript': transcript,
+        'analysis': combined_analysis.to_dict()
+    }
+
+# Shared by all jobs in the process. Each branch has its own pool so that
+# Gemini calls still finishing after their job gave up (outages, retries)
+# never hold the threads that later jobs need for NLP scoring
+nlp_executor = ThreadPoolExecutor(max_workers=Config.ANALYSIS_THREADS, thread_name_prefix='nlp')
+gemini_executor = ThreadPoolExecutor(max_workers=Config.GEMINI_THREADS, thread_name_prefix='gemini')
+
+def run_analyses(transcript, question_context, timing=None):
+    """
+    Run the NLP and Gemini analyses concurrently and join them.
+    
+    Latency is close to the slower of the two branches instead of their sum.
+    If Gemini fails or does not answer within GEMINI_TIMEOUT seconds, a
+    fallback derived from the NLP scores is used instead.
+    
+    Args:
+        transcript: Transcribed text from audio
+        question_context: Text of the question, used as Gemini context
+        timing: Pause statistics of the recording, if available
+        
+    Returns:
+        Tuple of (nlp_analysis, gemini_analysis)
+    """
+    started = time.monotonic()
+    print("Starting NLP and Gemini analysis...")
+    nlp_future = nlp_executor.submit(analyze_speech, transcript, timing)
+    # The Gemini client stops retrying once the pipeline would stop waiting
+    gemini_future = gemini_executor.submit(score_with_gemini, transcript, question_context,
+                                           deadline=started + Config.GEMINI_TIMEOUT)
+    
+    try:
+        nlp_analysis = nlp_future.result(timeout=Config.NLP_TIMEOUT)
+    except TimeoutError:
+        gemini_future.cancel()
+        raise TimeoutError(f"NLP analysis did not finish within {Config.NLP_TIMEOUT} seconds")
+    print(f"NLP analysis completed in {time.monotonic() - started:.2f}s")
+    
+    # The Gemini deadline counts from submission, not from the NLP join
+    remaining = max(0.0, Config.GEMINI_TIMEOUT - (time.monotonic() - started))
+    try:
+        gemini_analysis = gemini_future.result(timeout=remaining)
+        print(f"Gemini analysis completed in {time.monotonic() - started:.2f}s")
+    except TimeoutError:
+        gemini_future.cancel()
+        print(f"Warning: Gemini analysis timed out after {Config.GEMINI_TIMEOUT} seconds")
+        gemini_analysis = fallback_gemini_analysis(nlp_analysis)
+    except Exception as e:
+        print(f"Warning: Gemini analysis failed: {str(e)}")
+        gemini_analysis = fallback_gemini_analysis(nlp_analysis)
+    
+    return nlp_analysis, gemini_analysis
+
+FALLBACK_FEEDBACK = {
+    'strengths': ['The response addresses the question'],
+    'weaknesses': ['Unable to perform detailed analysis'],
+    'suggestions': ['Try to speak more clearly and at a moderate pace']
+}
+
+def fallback_gemini_analysis(nlp_analysis):
+    """
+    Build a Gemini-shaped analysis from the NLP scores when Gemini is unavailable.
+
+    Tagged with source 'fallback' so that stored results can tell it apart
+    from a real Gemini analysis.
+    """
+    return {
+        'fluency_score': nlp_analysis['fluency_score'],
+        'vocabulary_score': nlp_analysis['vocabulary_score'],
+        'grammar_score': nlp_analysis['grammar_score'],
+        'coherence_score': 0.0,  # Default score
+        'feedback': {category: list(items) for category, items in FALLBACK_FEEDBACK.items()},
+        'source': 'fallback'
+    }
+
+def is_fallback_gemini_analysis(gemini_analysis):
+    """Whether a stored Gemini analysis is the NLP-derived fallback rather than Gemini's."""
+    if gemini_analysis.get('source') == 'fallback':
+        return True
+    # Results stored before fallbacks were tagged
+    return gemini_analysis.get('coherence_score') == 0.0 and gemini_analysis.get('feedback') == FALLBACK_FEEDBACK
+
+def remove_upload(audio_path):
+    """Delete an uploaded audio file once it is no longer needed."""
+    try:
+        if audio_path and os.path.exists(audio_path):
+            os.remove(audio_path)
+            print(f"Cleaned up temporary file: {audio_path}")
+    except Exception as e:
+        print(f"Error cleaning up temporary file: {str(e)}")
+
+def combine_analyses(nlp_analysis, gemini_analysis):
+    """
+    Combine traditional NLP analysis with Gemini AI analysis.
+    
+    Args:
+        nlp_analysis: Results from traditional NLP analysis
+        gemini_analysis: Results from Gemini AI analysis
+        
+    Returns:
+        AnalysisResult with the combined scores and Gemini's feedback
+    """
+    # Weighted combination (giving more weight to Gemini for deeper analysis),
+    # then band caps and penalties, as defined by the scoring model
+    scores = get_scoring_model().combine(nlp_analysis, gemini_analysis)
+    
+    return AnalysisResult(
+        **scores,
+        feedback=Feedback.from_value(gemini_analysis.get('feedback')),
+        nlp_analysis=nlp_analysis,
+        gemini_analysis=gemini_analysis
+    )
@@ -0,0 +1,136 @@
+from datetime import datetime
+from sqlalchemy.dialects import postgresql, sqlite
+from config import Config
+from models import db, Response, Result, UserProgress
+
+UPSERT_DIALECTS = {'postgresql': postgresql.insert, 'sqlite': sqlite.insert}
+
+def _scores(source):
+    """Overall and per-criterion scores from a combined analysis dict or a Result."""
+    get = source.get if isinstance(source, dict) else lambda name: getattr(source, name)
+    scores = {'overall': get('overall_score')}
+    for name in UserProgress.CRITERIA:
+        scores[name] = get(f'{name}_score')
+    return scores
+
+def _rolling(previous, score, alpha):
+    return previous + alpha * (score - previous)
+
+def record_result(user_id, analysis):
+    """
+    Add one scored attempt to a user's progress.
+
+    Runs in the caller's transaction as a single INSERT ... ON CONFLICT DO
+    UPDATE whose increments are computed by the database, so concurrent
+    workers cannot lose an update and the cost does not depend on how many
+    results the user already has.
+
+    Args:
+        user_id: ID of the user who answered
+        analysis: Combined analysis with overall and per-criterion scores
+    """
+    scores = _scores(analysis)
+    alpha = Config.PROGRESS_ROLLING_ALPHA
+    now = datetime.utcnow()
+    columns = UserProgress.__table__.c
+
+    # First attempt: every average is just this attempt's score
+    first = {
+        'user_id': user_id,
+        'test_count': 1,
+        'total_score': scores['overall'],
+        'average_score': scores['overall'],
+        'latest_score': scores['overall'],
+        'overall_rolling': scores['overall'],
+        'created_at': now,
+        'updated_at': now
+    }
+    # Later attempts: column arithmetic on the stored row
+    increments = {
+        'test_count': columns.test_count + 1,
+        'total_score': columns.total_score + scores['overall'],
+        'average_score': (columns.total_score + scores['overall']) / (columns.test_count + 1),
+        'latest_score': scores['overall'],
+        'overall_rolling': _rolling(columns.overall_rolling, scores['overall'], alpha),
+        'updated_at': now
+    }
+    for name in UserProgress.CRITERIA:
+        first[f'{name}_total'] = scores[name]
+        first[f'{name}_rolling'] = scores[name]
+        increments[f'{name}_total'] = columns[f'{name}_total'] + scores[name]
+        increments[f'{name}_rolling'] = _rolling(columns[f'{name}_rolling'], scores[name], alpha)
+
+    _upsert(first, increments)
+
+def _upsert(values, set_):
+    insert = UPSERT_DIALECTS.get(db.session.get_bind().dialect.name)
+    if insert is None:
+        raise NotImplementedError('Progress tracking needs SQLite or PostgreSQL')
+    db.session.execute(insert(UserProgress).values(**values)
+                       .on_conflict_do_update(index_elements=['user_id'], set_=set_))
+
+def _totals(results, alpha):
+    """Progress columns for a user's results, oldest first."""
+    entry = {'test_count': 0, 'total_score': 0.0}
+    for result in results:
+        scores = _scores(result)
+        if entry['test_count'] == 0:
+            for name in ('overall',) + UserProgress.CRITERIA:
+                entry[f'{name}_rolling'] = scores[name]
+            for name in UserProgress.CRITERIA:
+                entry[f'{name}_total'] = 0.0
+        entry['test_count'] += 1
+        entry['total_score'] += scores['overall']
+        entry['latest_score'] = scores['overall']
+        for name in ('overall',) + UserProgress.CRITERIA:
+            entry[f'{name}_rolling'] = _rolling(entry[f'{name}_rolling'], scores[name], alpha)
+        for name in UserProgress.CRITERIA:
+            entry[f'{name}_total'] += scores[name]
+    entry['average_score'] = entry['total_score'] / entry['test_count']
+    return entry
+
+def rebuild_progress():
+    """
+    Recompute every user's progress from the stored results.
+
+    Only needed after bulk changes to scores; normal operation keeps
+    progress current through record_result. Users are rebuilt one at a
+    time, each in its own transaction that first locks the user's
+    progress row, so results recorded by workers meanwhile are never
+    lost: they are either read by the rebuild or added on top of it.
+    Must be called inside an application context.
+
+    Returns:
+        Number of users whose progress was rebuilt
+    """
+    alpha = Config.PROGRESS_ROLLING_ALPHA
+    users_with_results = (db.session.query(Response.user_id)
+                          .join(Result, Result.response_id == Response.id)
+                          .filter(Response.user_id.isnot(None))
+                          .distinct())
+    user_ids = [user_id for user_id, in users_with_results.all()]
+    db.session.commit()
+
+    for user_id in user_ids:
+        # A write first: takes the row lock (PostgreSQL) or the write lock (SQLite)
+        # before the results are read, so record_result waits for this transaction
+        (UserProgress.query.filter(UserProgress.user_id == user_id)
+         .update({'updated_at': UserProgress.updated_at}, synchronize_session=False))
+        results = (db.session.query(Result)
+                   .join(Response, Result.response_id == Response.id)
+                   .filter(Response.user_id == user_id)
+                   .order_by(Result.created_at, Result.id)
+                   .all())
+        if results:
+            now = datetime.utcnow()
+            entry = _totals(results, alpha)
+            _upsert(dict(entry, user_id=user_id, created_at=now, updated_at=now),
+                    dict(entry, updated_at=now))
+        db.session.commit()
+
+    # Users whose results are all gone; checked in the DELETE itself so a
+    # first result recorded meanwhile keeps its row
+    (UserProgress.query.filter(UserProgress.user_id.notin_(users_with_results.subquery().select()))
+     .delete(synchronize_session=False))
+    db.session.commit()
+    return len(user_ids)
@@ -0,0 +1,152 @@
+import bisect
+import itertools
+import random
+import threading
+import time
+from collections import defaultdict
+from sqlalchemy import func
+from config import Config
+from models import db, Question, Response
+
+class QuestionSampler:
+    """
+    Random question sampling from an in-memory index of question IDs.
+
+    The index holds only (id, topic, part) and is rebuilt when the
+    question table changes: after invalidate() in this process, or when
+    a periodic check of the row count, highest ID and latest update time
+    (every QUESTION_INDEX_TTL seconds) sees a change made by another
+    process. Updates that bypass the ORM must call invalidate().
+    Sampling then picks IDs directly, so its cost grows with the number
+    of questions requested rather than with the size of the bank.
+    """
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._groups = None  # (topic, part) -> list of IDs
+        self._signature = None
+        self._checked_at = 0.0
+
+    def invalidate(self):
+        """Force a rebuild on the next sample (call after adding or removing questions)."""
+        with self._lock:
+            self._groups = None
+
+    def _table_signature(self):
+        # Adding or removing questions changes the count or highest ID; editing
+        # one (topic, part) moves the latest updated_at forward
+        return db.session.query(func.count(Question.id), func.max(Question.id),
+                                func.max(Question.updated_at)).one()
+
+    def _index(self):
+        with self._lock:
+            now = time.monotonic()
+            if self._groups is not None and now - self._checked_at < self.ttl:
+                return self._groups
+            signature = tuple(self._table_signature())
+            self._checked_at = now
+            if self._groups is None or signature != self._signature:
+                groups = defaultdict(list)
+                for question_id, topic, part in db.session.query(Question.id, Question.topic, Question.part):
+                    groups[(topic, part)].append(question_id)
+                self._groups = dict(groups)
+                self._signature = signature
+                print(f"Question index rebuilt: {signature[0]} questions in {len(groups)} groups")
+            return self._groups
+
+    def sample(self, count, topic=None, part=None, stratify=None, exclude=()):
+        """
+        Pick random questions.
+
+        Args:
+            count: Number of questions to return
+            topic: Only questions with this topic
+            part: Only questions from this IELTS part
+            stratify: 'topic' or 'part' to spread the questions evenly over
+                the topics or parts that match the filters
+            exclude: Question IDs to avoid (e.g. recently answered); they are
+                only used when too few other questions match
+
+        Returns:
+            List of Question objects in random order
+        """
+        groups = self._index()
+        pools = defaultdict(list)
+        for (group_topic, group_part), ids in groups.items():
+            if topic is not None and group_topic != topic:
+                continue
+            if part is not None and group_part != part:
+                continue
+            key = {'topic': group_topic, 'part': group_part}.get(stratify)
+            pools[key].append(ids)
+
+        exclude = set(exclude)
+        picked = []
+        skipped = []
+        sizes = [sum(len(ids) for ids in pool) for pool in pools.values()]
+        for pool, quota in zip(pools.values(), _split_evenly(count, sizes)):
+            fresh, seen_excluded = _sample_pool(pool, quota, exclude)
+            picked.extend(fresh)
+            skipped.extend(seen_excluded)
+
+        if len(picked) < count:
+            # Not enough fresh questions: fill up with excluded ones
+            picked.extend(random.sample(skipped, min(count - len(picked), len(skipped))))
+
+        random.shuffle(picked)
+        questions = {q.id: q for q in Question.query.filter(Question.id.in_(picked))}
+        return [questions[qid] for qid in picked if qid in questions]
+
+def _split_evenly(count, sizes):
+    """Share count across pools as evenly as their sizes allow."""
+    quotas = [0] * len(sizes)
+    open_pools = [i for i, size in enumerate(sizes) if size > 0]
+    remaining = count
+    while remaining > 0 and open_pools:
+        share, extra = divmod(remaining, len(open_pools))
+        # Pools that get the extra question are chosen at random
+        bonus = set(random.sample(open_pools, extra))
+        for i in open_pools:
+            quotas[i] += min(share + (i in bonus), sizes[i] - quotas[i])
+        remaining = count - sum(quotas)
+        open_pools = [i for i in open_pools if quotas[i] < sizes[i]]
+    return quotas
+
+def _sample_pool(id_lists, quota, exclude):
+    """
+    Sample up to quota IDs from the union of id_lists, skipping excluded IDs.
+
+    Draws quota + len(exclude) positions so enough survive the exclusion,
+    keeping the cost proportional to the request, not the pool. If the
+    pool is that small every position is drawn, so the excluded IDs seen
+    are all the excluded IDs it holds.
+
+    Returns:
+        Tuple of (picked IDs, excluded IDs that were drawn)
+    """
+    if quota == 0:
+        return [], []
+    offsets = list(itertools.accumulate(len(ids) for ids in id_lists))
+    total = offsets[-1]
+    picked = []
+    seen_excluded = []
+    for position in random.sample(range(total), min(total, quota + len(exclude))):
+        index = bisect.bisect_right(offsets, position)
+        start = offsets[index - 1] if index else 0
+        question_id = id_lists[index][position - start]
+        if question_id in exclude:
+            seen_excluded.append(question_id)
+        elif len(picked) < quota:
+            picked.append(question_id)
+    return picked, seen_excluded
+
+def recently_answered(user_id, limit=None):
+    """IDs of the questions a user answered most recently."""
+    limit = limit or Config.QUESTION_EXCLUDE_RECENT
+    rows = (db.session.query(Response.question_id)
+            .filter(Response.user_id == user_id)
+            .order_by(Response.created_at.desc())
+            .limit(limit))
+    return {question_id for question_id, in rows}
+
+sampler = QuestionSampler(Config.QUESTION_INDEX_TTL)
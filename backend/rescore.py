@@ -0,0 +1,239 @@
+import json
+import os
+import time
+from collections import deque
+from multiprocessing import Pool
+from sqlalchemy import func
+from config import Config
+from models import db, Question, Response, Result
+from pipeline import combine_analyses, fallback_gemini_analysis, is_fallback_gemini_analysis
+from progress import rebuild_progress
+from speech_analyzer import analyze_speech_batch, get_language_tool, get_nlp, rescore_feedback
+from gemini_analyzer import cached_gemini_analysis
+from scoring_model import feature_table, get_scoring_model
+
+# Where the Gemini half of each re-scored result comes from
+GEMINI_SOURCES = ('stored', 'none')
+
+def _init_worker():
+    """Load spaCy and LanguageTool once per pool process."""
+    # Each process checks one text at a time, so one LanguageTool server is enough
+    Config.LANGUAGE_TOOL_POOL_SIZE = 1
+    get_nlp()
+    get_language_tool()
+
+def _score_chunk(items):
+    """
+    Pool task: NLP-score one chunk of transcripts.
+
+    Args:
+        items: List of (response_id, transcript, timing)
+
+    Returns:
+        List of (response_id, nlp_analysis) in the same order
+    """
+    analyses = analyze_speech_batch([transcript for _, transcript, _ in items],
+                                    [timing for _, _, timing in items],
+                                    n_process=1, use_cache=False)
+    return [(response_id, analysis) for (response_id, _, _), analysis in zip(items, analyses)]
+
+def _reusable_features(nlp_analysis):
+    """Stored features of an analysis if the current extraction would produce the same, else None."""
+    if not nlp_analysis or nlp_analysis.get('feature_version') != Config.NLP_SCORING_VERSION:
+        return None
+    return nlp_analysis.get('features')
+
+def _score_features(rows):
+    """
+    Re-score analyses from their stored features with the vectorized
+    scoring model, without parsing the transcripts again. The NLP
+    feedback is regenerated for the new scores.
+
+    Returns:
+        List of (response_id, nlp_analysis) in the same order as rows
+    """
+    if not rows:
+        return []
+    model = get_scoring_model()
+    scores = model.nlp_scores_batch(feature_table([row[4]['features'] for row in rows]))
+    scored = []
+    for i, row in enumerate(rows):
+        analysis = dict(row[4], scoring_model=model.version,
+                        **{name: float(values[i]) for name, values in scores.items()})
+        # The stored feedback was written for the old scores
+        analysis['feedback'] = rescore_feedback(analysis.get('feedback'), analysis['fluency_score'],
+                                                analysis['vocabulary_score'], analysis['grammar_score'])
+        scored.append((row[0], analysis))
+    return scored
+
+def load_checkpoint(path, gemini):
+    """Last response ID written by an interrupted run with the same settings, or 0."""
+    try:
+        with open(path) as f:
+            checkpoint = json.load(f)
+    except (OSError, ValueError):
+        return 0
+    if (checkpoint.get('scoring_version') != Config.NLP_SCORING_VERSION
+            or checkpoint.get('scoring_model') != Config.SCORING_MODEL or checkpoint.get('gemini') != gemini):
+        print(f"Ignoring checkpoint {path}: written with other settings")
+        return 0
+    return checkpoint['last_response_id']
+
+def save_checkpoint(path, gemini, last_response_id, scored):
+    """Write the checkpoint atomically, so a crash never leaves it half-written."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w') as f:
+        json.dump({'last_response_id': last_response_id, 'scored': scored,
+                   'scoring_version': Config.NLP_SCORING_VERSION, 'scoring_model': Config.SCORING_MODEL,
+                   'gemini': gemini}, f)
+    os.replace(temp_path, path)
+
+def _chunks(after_id, chunk_size):
+    """Stored answers with their result, in response ID order, one keyset page at a time."""
+    while True:
+        rows = (db.session.query(Response.id, Response.transcript, Question.text,
+                                 Result.id, Result.nlp_analysis, Result.gemini_analysis)
+                .join(Result, Result.response_id == Response.id)
+                .outerjoin(Question, Response.question_id == Question.id)
+                .filter(Response.id > after_id)
+                .order_by(Response.id)
+                .limit(chunk_size)
+                .all())
+        if not rows:
+            return
+        yield rows
+        after_id = rows[-1][0]
+
+def _gemini_for(row, nlp_analysis, gemini):
+    """
+    Stored or cached Gemini analysis for a row, else the NLP-derived
+    fallback, or None if the row must be left as it is.
+
+    A stored fallback is a copy of the old NLP scores, so it is never
+    reused: the fallback is rebuilt from the new NLP analysis instead.
+    Results stored before the Gemini analysis was kept (no
+    gemini_analysis) hold Gemini's real feedback and coherence score,
+    which a fallback would overwrite; unless the Gemini cache still has
+    their analysis, they are skipped.
+    """
+    _, transcript, question_text, _, _, stored = row
+    if gemini == 'none':
+        return fallback_gemini_analysis(nlp_analysis)
+    if stored and not is_fallback_gemini_analysis(stored):
+        return stored
+    cached = cached_gemini_analysis(transcript or '', question_text or '')
+    if cached:
+        return cached
+    return fallback_gemini_analysis(nlp_analysis) if stored else None
+
+def _write_chunk(rows, scored, gemini):
+    """
+    Combine the scores of one chunk and bulk-update its Result rows.
+
+    Returns:
+        Number of results skipped because no Gemini analysis was available
+    """
+    by_response = {row[0]: row for row in rows}
+    updates = []
+    skipped = 0
+    for response_id, nlp_analysis in scored:
+        row = by_response[response_id]
+        gemini_analysis = _gemini_for(row, nlp_analysis, gemini)
+        if gemini_analysis is None:
+            skipped += 1
+            continue
+        combined = combine_analyses(nlp_analysis, gemini_analysis)
+        updates.append({
+            'id': row[3],
+            **combined.scores(),
+            'feedback': combined.feedback.to_dict(),
+            'nlp_analysis': nlp_analysis,
+            'gemini_analysis': gemini_analysis
+        })
+    db.session.bulk_update_mappings(Result, updates)
+    db.session.commit()
+    return skipped
+
+def rescore(processes=None, chunk_size=None, gemini='stored', checkpoint_path=None, restart=False,
+            recompute_features=False):
+    """
+    Recompute every stored Result from its transcript.
+
+    Responses are read in chunks of chunk_size by response ID. Results
+    whose stored NLP features are still current (same NLP_SCORING_VERSION)
+    are re-scored from those features in this process with the vectorized
+    scoring model; the others are NLP-scored in a process pool. Both are
+    combined with the Gemini analysis stored on the
+    result (or found in the cache) unless gemini is 'none', in which case
+    the NLP-derived fallback is used as when Gemini is unavailable. A
+    stored fallback is rebuilt from the new NLP scores, never reused;
+    results without any stored or cached Gemini analysis are left
+    untouched and reported (see _gemini_for). Each
+    chunk is written with one bulk update, after which a checkpoint is
+    saved so an interrupted run resumes where it stopped. User progress
+    is rebuilt at the end. Must be called inside an application context.
+
+    Args:
+        processes: Pool size (default RESCORE_PROCESSES, 0 = one per CPU)
+        chunk_size: Responses per pool task (default RESCORE_CHUNK_SIZE)
+        gemini: 'stored' or 'none', see GEMINI_SOURCES
+        checkpoint_path: Checkpoint file (default RESCORE_CHECKPOINT_PATH)
+        restart: Ignore an existing checkpoint and start from the first response
+        recompute_features: Parse every transcript again even if its stored
+            features are current
+
+    Returns:
+        Number of results re-scored by this run
+    """
+    if gemini not in GEMINI_SOURCES:
+        raise ValueError(f"gemini must be one of {', '.join(GEMINI_SOURCES)}")
+    processes = processes or Config.RESCORE_PROCESSES or os.cpu_count()
+    chunk_size = chunk_size or Config.RESCORE_CHUNK_SIZE
+    checkpoint_path = checkpoint_path or Config.RESCORE_CHECKPOINT_PATH
+
+    after_id = 0 if restart else load_checkpoint(checkpoint_path, gemini)
+    total = (db.session.query(func.count(Result.id))
+             .join(Response, Result.response_id == Response.id)
+             .filter(Response.id > after_id).scalar())
+    print(f"Re-scoring {total} results after response {after_id} with {processes} processes")
+
+    started = time.monotonic()
+    done = 0
+    skipped = 0
+    # Keep a few chunks in flight per process so workers never wait on the database
+    window = processes * 2
+    in_flight = deque()
+
+    def finish_oldest():
+        nonlocal done, skipped
+        rows, scored, task = in_flight.popleft()
+        skipped += _write_chunk(rows, scored + (task.get() if task else []), gemini)
+        done += len(rows)
+        save_checkpoint(checkpoint_path, gemini, rows[-1][0], done)
+        elapsed = time.monotonic() - started
+        rate = done / elapsed if elapsed else 0.0
+        remaining = (total - done) / rate if rate else 0.0
+        print(f"{done}/{total} results ({rate:.1f}/s, about {remaining / 60:.0f} min left)")
+
+    with Pool(processes, initializer=_init_worker) as pool:
+        for rows in _chunks(after_id, chunk_size):
+            reusable = [] if recompute_features else [row for row in rows if _reusable_features(row[4])]
+            reused_ids = {row[0] for row in reusable}
+            items = [(row[0], row[1] or '', (row[4] or {}).get('timing'))
+                     for row in rows if row[0] not in reused_ids]
+            task = pool.apply_async(_score_chunk, (items,)) if items else None
+            in_flight.append((rows, _score_features(reusable), task))
+            if len(in_flight) >= window:
+                finish_oldest()
+        while in_flight:
+            finish_oldest()
+
+    if skipped:
+        print(f"Left {skipped} results unchanged: no Gemini analysis is stored or cached for them "
+              f"(--gemini none re-scores them with NLP only, replacing their feedback)")
+    print(f"Rebuilt progress for {rebuild_progress()} users")
+    # A finished run leaves nothing to resume
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    return done - skipped
@@ -0,0 +1,64 @@
+import json
+from dataclasses import dataclass, field
+
+@dataclass(slots=True)
+class Feedback:
+    """Examiner feedback, stored as a JSON object with one list per category."""
+    CATEGORIES = ('strengths', 'weaknesses', 'suggestions')
+
+    strengths: list = field(default_factory=list)
+    weaknesses: list = field(default_factory=list)
+    suggestions: list = field(default_factory=list)
+
+    @classmethod
+    def from_value(cls, value):
+        """
+        Build feedback from a dict, or from the JSON string older rows and
+        cache entries hold. Unknown keys are dropped and a category that is
+        not a list becomes a one-item list.
+        """
+        if isinstance(value, str):
+            try:
+                value = json.loads(value)
+            except ValueError:
+                value = None
+        if not isinstance(value, dict):
+            value = {}
+        items = {}
+        for category in cls.CATEGORIES:
+            entries = value.get(category) or []
+            items[category] = [str(e) for e in entries] if isinstance(entries, list) else [str(entries)]
+        return cls(**items)
+
+    def to_dict(self):
+        return {'strengths': self.strengths, 'weaknesses': self.weaknesses, 'suggestions': self.suggestions}
+
+@dataclass(slots=True)
+class AnalysisResult:
+    """Combined scores for one answer, with the sub-analyses they came from."""
+    fluency_score: float
+    vocabulary_score: float
+    grammar_score: float
+    coherence_score: float
+    overall_score: float
+    feedback: Feedback
+    nlp_analysis: dict
+    gemini_analysis: dict
+
+    def scores(self):
+        """Column values for a Result row."""
+        return {
+            'fluency_score': self.fluency_score,
+            'vocabulary_score': self.vocabulary_score,
+            'grammar_score': self.grammar_score,
+            'coherence_score': self.coherence_score,
+            'overall_score': self.overall_score
+        }
+
+    def to_dict(self):
+        return {
+            **self.scores(),
+            'feedback': self.feedback.to_dict(),
+            'nlp_analysis': self.nlp_analysis,
+            'gemini_analysis': self.gemini_analysis
+        }
@@ -0,0 +1,345 @@
+"""
+Declarative, versioned mapping from analysis features to IELTS bands.
+
+A ScoringModel describes the NLP criteria (fluency, vocabulary, grammar),
+the NLP overall score and how NLP and Gemini scores are combined. It is
+evaluated either one response at a time (the request path) or with NumPy
+over arrays of feature vectors (re-scoring and calibration). Both paths
+apply the same IEEE operations in the same order, so their results are
+bit-identical: sums are accumulated left to right rather than with
+np.sum, and rounding is done as round(x * n) / n, which is what np.round
+computes, rather than Python's decimal-exact round(x, ndigits).
+"""
+from dataclasses import dataclass
+import numpy as np
+from config import Config
+
+@dataclass(frozen=True)
+class Condition:
+    """feature < threshold or feature > threshold."""
+    feature: str
+    op: str  # '<' or '>'
+    threshold: float
+
+    def holds(self, features):
+        value = features[self.feature]
+        return value < self.threshold if self.op == '<' else value > self.threshold
+
+def below(feature, threshold):
+    return Condition(feature, '<', threshold)
+
+def above(feature, threshold):
+    return Condition(feature, '>', threshold)
+
+@dataclass(frozen=True)
+class Penalty:
+    """Multiply a score by factor when the condition holds."""
+    when: Condition
+    factor: float
+
+@dataclass(frozen=True)
+class Component:
+    """
+    Band estimate from one feature, clipped to 0-9:
+    offset + (feature - center) * slope, then the penalties in order.
+    """
+    feature: str
+    weight: float
+    offset: float
+    slope: float
+    center: float = 0.0
+    penalties: tuple = ()
+
+@dataclass(frozen=True)
+class Criterion:
+    """
+    Weighted sum of components. The criterion penalties only apply to
+    scores above penalty_above; any zero_if condition forces 0.
+    """
+    name: str
+    components: tuple
+    penalties: tuple = ()
+    penalty_above: float = 3.0
+    zero_if: tuple = ()
+
+@dataclass(frozen=True)
+class Cap:
+    """If the score is above `above` and any criterion is under its minimum, the score becomes `value`."""
+    above: float
+    minimums: tuple  # (criterion, minimum) pairs
+    value: float
+
+@dataclass(frozen=True)
+class Overall:
+    """
+    Weighted sum of criterion scores, then caps (only the first cap whose
+    threshold the score exceeds is considered), then penalties for any
+    criterion below a threshold: every matching one, or only the first if
+    exclusive.
+    """
+    weights: tuple  # (criterion, weight) pairs
+    below_penalties: tuple  # (threshold, factor) pairs
+    exclusive: bool = False
+    caps: tuple = ()
+
+@dataclass(frozen=True)
+class Blend:
+    """Combined criterion score; nlp_weight None takes the Gemini score as is."""
+    criterion: str
+    nlp_weight: float = None
+    gemini_weight: float = 1.0
+
+@dataclass(frozen=True)
+class ScoringModel:
+    version: str
+    criteria: tuple
+    nlp_overall: Overall
+    nlp_rounding: int  # NLP scores are rounded to 1/nlp_rounding
+    blends: tuple
+    combined_overall: Overall
+    combined_rounding: int  # Combined scores are rounded to 1/combined_rounding
+
+    # Scalar path
+
+    def criterion_score(self, name, features):
+        """Raw (unrounded) score of one NLP criterion from a feature dict."""
+        criterion = self._criterion(name)
+        features = {key: float(value) for key, value in features.items()}
+        if any(condition.holds(features) for condition in criterion.zero_if):
+            return 0.0
+        score = 0.0
+        for component in criterion.components:
+            value = component.offset + (features[component.feature] - component.center) * component.slope
+            value = min(9.0, max(0.0, value))
+            for penalty in component.penalties:
+                if penalty.when.holds(features):
+                    value = value * penalty.factor
+            score = score + value * component.weight
+        if score > criterion.penalty_above:
+            for penalty in criterion.penalties:
+                if penalty.when.holds(features):
+                    score = score * penalty.factor
+        return score
+
+    def nlp_scores(self, features):
+        """
+        NLP criterion and overall scores for one response.
+
+        Returns:
+            Dictionary with fluency_score, vocabulary_score, grammar_score
+            and overall_score, rounded to 1/nlp_rounding
+        """
+        raw = {criterion.name: self.criterion_score(criterion.name, features) for criterion in self.criteria}
+        raw['overall'] = _overall(self.nlp_overall, raw)
+        return {f'{name}_score': _round(value, self.nlp_rounding) for name, value in raw.items()}
+
+    def combine(self, nlp, gemini):
+        """
+        Combine NLP and Gemini scores for one response.
+
+        Args:
+            nlp: Mapping with the NLP <criterion>_score values
+            gemini: Mapping with the Gemini <criterion>_score values
+
+        Returns:
+            Dictionary with the combined <criterion>_score values and
+            overall_score, rounded to 1/combined_rounding
+        """
+        raw = {}
+        for blend in self.blends:
+            gemini_value = float(gemini[f'{blend.criterion}_score'])
+            if blend.nlp_weight is None:
+                raw[blend.criterion] = gemini_value
+            else:
+                nlp_value = float(nlp[f'{blend.criterion}_score'])
+                raw[blend.criterion] = nlp_value * blend.nlp_weight + gemini_value * blend.gemini_weight
+        raw['overall'] = _overall(self.combined_overall, raw)
+        return {f'{name}_score': _round(value, self.combined_rounding) for name, value in raw.items()}
+
+    # Vectorized path
+
+    def criterion_scores_batch(self, name, table):
+        """criterion_score over a feature table (feature name -> float64 array)."""
+        criterion = self._criterion(name)
+        score = np.zeros(len(next(iter(table.values()))))
+        for component in criterion.components:
+            value = component.offset + (table[component.feature] - component.center) * component.slope
+            value = np.minimum(9.0, np.maximum(0.0, value))
+            for penalty in component.penalties:
+                value = np.where(_mask(penalty.when, table), value * penalty.factor, value)
+            score = score + value * component.weight
+        gated = score > criterion.penalty_above
+        for penalty in criterion.penalties:
+            score = np.where(gated & _mask(penalty.when, table), score * penalty.factor, score)
+        for condition in criterion.zero_if:
+            score = np.where(_mask(condition, table), 0.0, score)
+        return score
+
+    def nlp_scores_batch(self, table):
+        """nlp_scores over a feature table; returns a dict of float64 arrays."""
+        raw = {criterion.name: self.criterion_scores_batch(criterion.name, table) for criterion in self.criteria}
+        raw['overall'] = _overall_batch(self.nlp_overall, raw)
+        return {f'{name}_score': _round_batch(value, self.nlp_rounding) for name, value in raw.items()}
+
+    def combine_batch(self, nlp, gemini):
+        """combine over arrays; nlp and gemini map <criterion>_score to float64 arrays."""
+        raw = {}
+        for blend in self.blends:
+            gemini_value = np.asarray(gemini[f'{blend.criterion}_score'], dtype=np.float64)
+            if blend.nlp_weight is None:
+                raw[blend.criterion] = gemini_value
+            else:
+                nlp_value = np.asarray(nlp[f'{blend.criterion}_score'], dtype=np.float64)
+                raw[blend.criterion] = nlp_value * blend.nlp_weight + gemini_value * blend.gemini_weight
+        raw['overall'] = _overall_batch(self.combined_overall, raw)
+        return {f'{name}_score': _round_batch(value, self.combined_rounding) for name, value in raw.items()}
+
+    def _criterion(self, name):
+        for criterion in self.criteria:
+            if criterion.name == name:
+                return criterion
+        raise KeyError(f"Scoring model {self.version} has no criterion {name!r}")
+
+def _round(value, per_unit):
+    return round(value * per_unit) / per_unit
+
+def _round_batch(values, per_unit):
+    return np.rint(values * per_unit) / per_unit
+
+def _overall(spec, scores):
+    overall = 0.0
+    for name, weight in spec.weights:
+        overall = overall + scores[name] * weight
+    for cap in spec.caps:
+        if overall > cap.above:
+            if any(scores[name] < minimum for name, minimum in cap.minimums):
+                overall = cap.value
+            break
+    values = [scores[name] for name, _ in spec.weights]
+    for threshold, factor in spec.below_penalties:
+        if any(value < threshold for value in values):
+            overall = overall * factor
+            if spec.exclusive:
+                break
+    return overall
+
+def _overall_batch(spec, scores):
+    overall = np.zeros(len(next(iter(scores.values()))))
+    for name, weight in spec.weights:
+        overall = overall + scores[name] * weight
+    original = overall
+    handled = np.zeros(len(overall), dtype=bool)
+    for cap in spec.caps:
+        in_tier = ~handled & (original > cap.above)
+        failing = np.zeros(len(overall), dtype=bool)
+        for name, minimum in cap.minimums:
+            failing |= scores[name] < minimum
+        overall = np.where(in_tier & failing, cap.value, overall)
+        handled |= in_tier
+    lowest = np.minimum.reduce([scores[name] for name, _ in spec.weights])
+    penalized = np.zeros(len(overall), dtype=bool)
+    for threshold, factor in spec.below_penalties:
+        applies = lowest < threshold
+        if spec.exclusive:
+            applies &= ~penalized
+            penalized |= applies
+        overall = np.where(applies, overall * factor, overall)
+    return overall
+
+def _mask(condition, table):
+    values = table[condition.feature]
+    return values < condition.threshold if condition.op == '<' else values > condition.threshold
+
+def feature_table(rows, names=None):
+    """Feature table (name -> float64 array) from a list of feature dicts."""
+    names = names or list(rows[0])
+    return {name: np.array([row[name] for row in rows], dtype=np.float64) for name in names}
+
+# Scores of the original hand-written formulas
+MODEL_1 = ScoringModel(
+    version='1',
+    criteria=(
+        Criterion(
+            'fluency',
+            components=(
+                Component('speech_rate', 0.15, offset=2.0, center=120.0, slope=1 / 40,
+                          penalties=(Penalty(below('word_count', 150), 0.5),)),
+                Component('filler_ratio', 0.45, offset=9.0, slope=-250.0),
+                Component('fk_grade', 0.2, offset=2.0, center=10.0, slope=0.2,
+                          penalties=(Penalty(below('word_count', 150), 0.5),)),
+                Component('sentence_length_std', 0.2, offset=2.0, slope=0.2,
+                          penalties=(Penalty(below('avg_sentence_length', 12), 0.5),)),
+            ),
+            penalties=(
+                Penalty(above('filler_ratio', 0.03), 0.6),
+                Penalty(below('avg_sentence_length', 15), 0.7),
+                Penalty(below('word_count', 150), 0.7),
+            ),
+            zero_if=(below('word_count', 10), below('sentence_count', 1))
+        ),
+        Criterion(
+            'vocabulary',
+            components=(
+                Component('lexical_diversity', 0.25, offset=0.0, slope=6.0,
+                          penalties=(Penalty(below('word_count', 75), 0.5),)),
+                Component('avg_word_length', 0.35, offset=2.0, center=7.0, slope=0.8,
+                          penalties=(Penalty(below('word_count', 75), 0.5),)),
+                Component('avg_syllables', 0.35, offset=2.0, center=2.5, slope=1.5),
+                Component('avg_word_rank', 0.05, offset=2.0, slope=-1 / 20000,
+                          penalties=(Penalty(above('common_word_ratio', 0.25), 0.5),)),
+            ),
+            penalties=(
+                Penalty(above('common_word_ratio', 0.2), 0.6),
+                Penalty(below('lexical_diversity', 0.6), 0.6),
+                Penalty(below('word_count', 150), 0.7),
+            ),
+            zero_if=(below('word_count', 10),)
+        ),
+        Criterion(
+            'grammar',
+            components=(
+                Component('error_density', 1.0, offset=6.0, slope=-2.5,
+                          penalties=(Penalty(below('whitespace_word_count', 75), 0.5),
+                                     Penalty(above('basic_pattern_count', 0), 0.6))),
+            ),
+            penalties=(
+                Penalty(above('error_density', 2), 0.6),
+                Penalty(above('basic_pattern_count', 1), 0.6),
+                Penalty(below('whitespace_word_count', 150), 0.7),
+            ),
+            zero_if=(below('char_count', 5), below('whitespace_word_count', 5))
+        ),
+    ),
+    nlp_overall=Overall(
+        weights=(('fluency', 0.1), ('vocabulary', 0.5), ('grammar', 0.4)),
+        below_penalties=((4.0, 0.5), (3.0, 0.3), (2.0, 0.2))
+    ),
+    nlp_rounding=10,
+    blends=(
+        Blend('fluency', nlp_weight=0.3, gemini_weight=0.7),
+        Blend('vocabulary', nlp_weight=0.2, gemini_weight=0.8),
+        Blend('grammar', nlp_weight=0.2, gemini_weight=0.8),
+        Blend('coherence'),
+    ),
+    combined_overall=Overall(
+        weights=(('fluency', 0.15), ('vocabulary', 0.4), ('grammar', 0.4), ('coherence', 0.05)),
+        caps=(
+            Cap(7.0, (('vocabulary', 7.5), ('grammar', 7.5), ('fluency', 7.0), ('coherence', 7.0)), 6.5),
+            Cap(6.0, (('vocabulary', 6.5), ('grammar', 6.5), ('fluency', 6.0), ('coherence', 6.0)), 5.5),
+            Cap(5.0, (('vocabulary', 5.5), ('grammar', 5.5), ('fluency', 5.0), ('coherence', 5.0)), 4.5),
+        ),
+        below_penalties=((3.0, 0.5), (4.0, 0.7)),
+        exclusive=True
+    ),
+    combined_rounding=2
+)
+
+SCORING_MODELS = {model.version: model for model in (MODEL_1,)}
+
+def get_scoring_model(version=None):
+    """The scoring model with this version, or the configured SCORING_MODEL."""
+    version = version or Config.SCORING_MODEL
+    try:
+        return SCORING_MODELS[version]
+    except KeyError:
+        raise ValueError(f"Unknown scoring model {version!r}; known: {', '.join(SCORING_MODELS)}")
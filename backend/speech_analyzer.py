@@ -1,43 +1,269 @@
-import whisper
-import spacy
 import numpy as np
 import json
 from textstat import flesch_kincaid_grade, syllable_count
-import language_tool_python
+from config import Config
+from model_registry import registry
+from analysis_cache import cache, hash_bytes, hash_file, make_key
+from batching import MicroBatcher
+from asr_backends import create_backend
+from audio_io import SAMPLE_RATE, decode_audio_bytes, load_audio
+from vad import trim_silence
+from timing_metrics import to_original_time, word_timing_metrics
+from lexicon import COMMON_WORDS, basic_patterns, fillers
+from scoring_model import get_scoring_model
+from language_tool_pool import create_pool
 
-whisper_model = whisper.load_model("base")
-nlp = spacy.load("en_core_web_sm")
-language_tool = language_tool_python.LanguageTool('en-US')
+# Heavy models are loaded on first use (or by an explicit warm-up) so that
+# importing this module stays cheap for the web process and for tests.
+def _load_asr_backend():
+    return create_backend(Config.ASR_BACKEND, Config.WHISPER_MODEL,
+                          compute_type=Config.ASR_COMPUTE_TYPE, cpu_threads=Config.ASR_CPU_THREADS)
 
-def transcribe_audio(audio_path):
+def _load_spacy():
+    import spacy
+    # Only tokenization, sentence boundaries and lexical attributes are used
+    nlp = spacy.load(Config.SPACY_MODEL, exclude=Config.SPACY_EXCLUDE)
+    if 'senter' in nlp.disabled:
+        nlp.enable_pipe('senter')
+    if not nlp.has_pipe('senter') and not nlp.has_pipe('parser'):
+        nlp.add_pipe('sentencizer')  # Models without a senter
+    return nlp
+
+def _load_language_tool():
+    return create_pool(Config)
+
+registry.register('asr', _load_asr_backend)
+registry.register('spacy', _load_spacy)
+registry.register('language_tool', _load_language_tool)
+
+def get_asr_backend():
+    return registry.get('asr')
+
+def get_nlp():
+    return registry.get('spacy')
+
+def get_language_tool():
+    return registry.get('language_tool')
+
+# Bump when the shape of cached transcriptions changes
+TRANSCRIPTION_FORMAT = 3
+
+def transcribe_audio(audio):
+    """
+    Transcribe a recording with the configured ASR backend.
+    
+    Args:
+        audio: Path to the audio file, or the encoded audio bytes
+        
+    Returns:
+        Dictionary with the transcribed 'text', timestamped 'words' and
+        'timing' statistics (see transcribe_samples)
+    """
+    in_memory = isinstance(audio, (bytes, bytearray))
+    
+    # Identical recordings (retries, double submits) reuse the cached transcript
+    if cache:
+        audio_hash = hash_bytes(audio) if in_memory else hash_file(audio)
+        cache_key = make_key(audio_hash, Config.ASR_BACKEND, Config.WHISPER_MODEL,
+                             Config.VAD_ENABLED, Config.WORD_TIMESTAMPS, TRANSCRIPTION_FORMAT)
+        cached = cache.get('transcript', cache_key)
+        if cached is not None:
+            return cached
+    
+    samples = decode_audio_bytes(audio) if in_memory else load_audio(audio)
+    transcription = transcribe_samples(samples)
+    
+    if cache:
+        cache.set('transcript', cache_key, transcription)
+    return transcription
+
+def transcribe_samples(audio):
     """
-    Transcribe audio file to text using Whisper AI.
+    Transcribe decoded audio with the configured ASR backend.
+    
+    Leading, trailing and long internal silences are trimmed first so the
+    ASR only processes speech, and their durations are kept as timing data.
+    With WORD_TIMESTAMPS the timing also holds speech-rate and pause
+    metrics computed from the word timestamps.
     
     Args:
-        audio_path: Path to the audio file
+        audio: float32 mono array sampled at 16 kHz
         
     Returns:
-        Transcribed text
+        Dictionary with the transcribed 'text' ("" if only noise was
+        recognised), 'words' with start/end times in the original audio,
+        and 'timing' statistics (None when neither VAD nor word timestamps
+        are available)
     """
-    result = whisper_model.transcribe(audio_path)
-    text = result["text"].strip()
+    timing = None
+    speech = audio
+    if Config.VAD_ENABLED:
+        speech, timing = trim_silence(audio)
+        if len(speech) == 0:
+            return {'text': "", 'words': [], 'timing': timing}
+    
+    words = []
+    if Config.TRANSCRIBE_BATCH_SIZE > 1:
+        # Share one encoder pass with other uploads arriving at the same time
+        text = transcription_batcher(speech).strip()
+    elif Config.WORD_TIMESTAMPS:
+        result = get_asr_backend().transcribe_words(speech)
+        text = result['text'].strip()
+        words = result['words']
+    else:
+        text = get_asr_backend().transcribe(speech).strip()
     
     # Check if the transcription is empty or just contains noise
     if not text or text.lower() in ['', ' ', '.', '..', '...', '....', '.....', '......', '.......', '........']:
-        return ""
+        return {'text': "", 'words': [], 'timing': timing}
+    
+    if words:
+        starts = np.array([word['start'] for word in words])
+        ends = np.array([word['end'] for word in words])
+        if timing:
+            # Word times refer to the trimmed audio; put the removed pauses back
+            starts = to_original_time(starts, timing['segments'])
+            ends = to_original_time(ends, timing['segments'], side='left')
+        words = [{'word': word['word'].strip(), 'start': float(start), 'end': float(end)}
+                 for word, start, end in zip(words, starts, ends)]
+        timing = {**(timing or {'duration': len(audio) / SAMPLE_RATE}),
+                  **word_timing_metrics(starts, ends)}
+    
+    return {'text': text, 'words': words, 'timing': timing}
+
+def transcribe_batch(audios):
+    """Transcribe several decoded recordings in one backend call."""
+    texts = get_asr_backend().transcribe_batch(audios, Config.TRANSCRIBE_BATCH_SIZE)
+    return [text.strip() for text in texts]
+
+transcription_batcher = MicroBatcher(
+    transcribe_batch,
+    max_batch_size=Config.TRANSCRIBE_BATCH_SIZE,
+    max_wait=Config.TRANSCRIBE_BATCH_WAIT_MS / 1000,
+    name='transcription-batcher'
+)
+
+class AnalysisContext:
+    """
+    Single-pass analysis state shared by the scoring functions.
     
-    return text
+    Parses the transcript with spaCy (unless a parsed doc is passed) and
+    derives the token lists and counts once; LanguageTool is only run the first time its matches are needed.
+    """
+    def __init__(self, transcript, timing=None, doc=None):
+        self.transcript = transcript
+        self.timing = timing
+        self.doc = doc if doc is not None else get_nlp()(transcript)
+        
+        # Tokens that are neither punctuation nor whitespace
+        self.words = [token for token in self.doc if not token.is_punct and not token.is_space]
+        self.word_texts = [token.text.lower() for token in self.words]
+        self.word_count = len(self.words)
+        self.whitespace_word_count = len(transcript.split())
+        
+        # Lowercased tokens including punctuation, so phrases never match across it
+        self.tokens = [token.lower_ for token in self.doc if not token.is_space]
+        filler_matches = fillers.find_longest(self.tokens)
+        self.filler_count = len(filler_matches)
+        self.filler_token_count = sum(end - start for start, end, _ in filler_matches)
+        self.basic_pattern_count = len({phrase for _, _, phrase in basic_patterns.find_all(self.tokens)})
+        
+        self.sentences = list(self.doc.sents)
+        self.sentence_count = len(self.sentences)
+        self.sentence_word_counts = [
+            len([token for token in sent if not token.is_punct and not token.is_space])
+            for sent in self.sentences
+        ]
+        
+        self._grammar_matches = None
+    
+    @property
+    def grammar_matches(self):
+        """LanguageTool matches for the transcript, checked at most once."""
+        if self._grammar_matches is None:
+            self._grammar_matches = get_language_tool().check(self.transcript)
+        return self._grammar_matches
 
-def analyze_speech(transcript):
+def _nlp_cache_key(transcript, timing):
+    if not cache:
+        return None
+    return make_key(transcript, json.dumps(timing, sort_keys=True), Config.SPACY_MODEL,
+                    ','.join(Config.SPACY_EXCLUDE), ','.join(Config.LANGUAGE_TOOL_DISABLED_RULES),
+                    ','.join(Config.LANGUAGE_TOOL_DISABLED_CATEGORIES), Config.NLP_SCORING_VERSION,
+                    Config.SCORING_MODEL)
+
+def analyze_speech(transcript, timing=None):
     """
     Analyze speech transcript for fluency, vocabulary, and grammar.
     
+    Results are cached by transcript, timing, spaCy pipeline, LanguageTool
+    profile, NLP scoring version and scoring model.
+    
     Args:
         transcript: Transcribed text from audio
+        timing: Pause statistics from the VAD stage, if the audio was available
         
     Returns:
         Dictionary with analysis results
     """
+    cache_key = _nlp_cache_key(transcript, timing)
+    if cache_key:
+        cached = cache.get('nlp', cache_key)
+        if cached is not None:
+            return cached
+    
+    analysis = _analyze_transcript(transcript, timing)
+    # Keep the measured pause statistics alongside the scores
+    analysis['timing'] = timing
+    
+    if cache_key:
+        cache.set('nlp', cache_key, analysis)
+    return analysis
+
+def analyze_speech_batch(transcripts, timings=None, n_process=None, batch_size=64, use_cache=True):
+    """
+    Analyze many transcripts, parsing them with one nlp.pipe call.
+    
+    Meant for re-scoring and offline jobs. Cached transcripts are not
+    parsed again. With n_process > 1 spaCy parses in worker processes;
+    LanguageTool checks and scoring still run in this process.
+    
+    Args:
+        transcripts: List of transcribed texts
+        timings: Pause statistics per transcript, or None for all
+        n_process: spaCy processes (default SPACY_N_PROCESS)
+        batch_size: Texts sent to a spaCy process at a time
+        use_cache: False to neither read nor fill the analysis cache (bulk
+            re-scoring would otherwise evict every live entry)
+        
+    Returns:
+        List with one analysis dictionary per transcript, in order
+    """
+    timings = timings or [None] * len(transcripts)
+    results = [None] * len(transcripts)
+    pending = []
+    for position, (transcript, timing) in enumerate(zip(transcripts, timings)):
+        cache_key = _nlp_cache_key(transcript, timing) if use_cache else None
+        cached = cache.get('nlp', cache_key) if cache_key else None
+        if cached is not None:
+            results[position] = cached
+        else:
+            pending.append((position, cache_key))
+    
+    if pending:
+        texts = [transcripts[position] or '' for position, _ in pending]
+        docs = get_nlp().pipe(texts, n_process=n_process or Config.SPACY_N_PROCESS, batch_size=batch_size)
+        for (position, cache_key), doc in zip(pending, docs):
+            timing = timings[position]
+            analysis = _analyze_transcript(transcripts[position], timing, doc=doc)
+            analysis['timing'] = timing
+            if cache_key:
+                cache.set('nlp', cache_key, analysis)
+            results[position] = analysis
+    return results
+
+def _analyze_transcript(transcript, timing=None, doc=None):
+    """Run the NLP analysis without consulting the cache, reusing doc if already parsed."""
     # Check for empty or very short transcript
     if not transcript or len(transcript.strip()) < 10:  # Less than 10 characters
         return {
@@ -45,313 +271,154 @@ def analyze_speech(transcript):
             'vocabulary_score': 0.0,
             'grammar_score': 0.0,
             'overall_score': 0.0,
-            'feedback': json.dumps({
+            'feedback': {
                 'strengths': [],
                 'weaknesses': ['No speech detected in the recording'],
                 'suggestions': ['Please speak clearly into the microphone when recording']
-            })
+            }
         }
     
-    # Process text with spaCy
-    doc = nlp(transcript)
+    # Parse the transcript once for all analyses
+    context = AnalysisContext(transcript, timing, doc=doc)
     
     # Check for very short responses
-    word_count = len([token for token in doc if not token.is_punct and not token.is_space])
-    if word_count < 10:  # Less than 10 words
+    if context.word_count < 10:  # Less than 10 words
         return {
             'fluency_score': 0.0,
             'vocabulary_score': 0.0,
             'grammar_score': 0.0,
             'overall_score': 0.0,
-            'feedback': json.dumps({
+            'feedback': {
                 'strengths': [],
                 'weaknesses': ['Response is too short to evaluate'],
                 'suggestions': ['Please provide a more detailed response with at least a few sentences']
-            })
+            }
         }
     
     # Check if the response is just noise or filler words
-    filler_words = ['um', 'uh', 'er', 'ah', 'like', 'you know', 'sort of', 'kind of', 'well', 'basically', 'actually', 
-                   'i mean', 'you see', 'right', 'okay', 'so', 'just', 'really', 'literally', 'honestly', 'frankly',
-                   'actually', 'absolutely', 'definitely', 'certainly', 'obviously', 'clearly', 'apparently',
-                   'supposedly', 'allegedly', 'reportedly', 'presumably', 'evidently', 'seemingly', 'ostensibly']
-    
-    meaningful_words = [word for word in doc if not word.is_punct and not word.is_space and word.text.lower() not in filler_words]
-    if len(meaningful_words) < 5:  # Less than 5 meaningful words
+    meaningful_word_count = context.word_count - context.filler_token_count
+    if meaningful_word_count < 5:  # Less than 5 meaningful words
         return {
             'fluency_score': 0.0,
             'vocabulary_score': 0.0,
             'grammar_score': 0.0,
             'overall_score': 0.0,
-            'feedback': json.dumps({
+            'feedback': {
                 'strengths': [],
                 'weaknesses': ['Response contains only filler words or noise'],
                 'suggestions': ['Please provide a meaningful response with actual content']
-            })
+            }
         }
     
-    fluency_score = analyze_fluency(transcript, doc)
-    vocabulary_score = analyze_vocabulary(doc)
-    grammar_score = analyze_grammar(transcript)
-    
-    # Calculate overall score (weighted average)
-    overall_score = calculate_overall_score(fluency_score, vocabulary_score, grammar_score)
+    # Features are kept with the scores so a new scoring model can be
+    # applied later without parsing the transcript again
+    features = extract_features(context)
+    model = get_scoring_model()
+    scores = model.nlp_scores(features)
     
-    feedback = generate_feedback(transcript, doc, fluency_score, vocabulary_score, grammar_score)
+    feedback = generate_feedback(context, scores['fluency_score'], scores['vocabulary_score'],
+                                 scores['grammar_score'])
     
     return {
-        'fluency_score': round(fluency_score, 1),
-        'vocabulary_score': round(vocabulary_score, 1),
-        'grammar_score': round(grammar_score, 1),
-        'overall_score': round(overall_score, 1),
-        'feedback': feedback
+        **scores,
+        'feedback': feedback,
+        'features': features,
+        'feature_version': Config.NLP_SCORING_VERSION,
+        'scoring_model': model.version
     }
 
-def analyze_fluency(transcript, doc):
+def extract_features(context):
+    """All features the scoring model reads, as a flat dict of numbers."""
+    return {**fluency_features(context), **vocabulary_features(context), **grammar_features(context)}
+
+def fluency_features(context):
     """
-    Analyze speech fluency based on:
+    Features for fluency:
     - Speech rate (words per minute)
     - Sentence length and variation
     - Filler words and hesitations
     - Reading ease
-    
-    Returns a score from 0-9 (IELTS scale)
     """
-    word_count = len([token for token in doc if not token.is_punct and not token.is_space])
-    sentence_count = len(list(doc.sents))
-    
-    # Return 0 for very short responses
-    if word_count < 10 or sentence_count < 1:
-        return 0.0
-    
-    estimated_speech_rate = 150
-    
-    filler_words = ['um', 'uh', 'er', 'ah', 'like', 'you know', 'sort of', 'kind of', 'well', 'basically', 'actually', 
-                   'i mean', 'you see', 'right', 'okay', 'so', 'just', 'really', 'literally', 'honestly', 'frankly',
-                   'actually', 'absolutely', 'definitely', 'certainly', 'obviously', 'clearly', 'apparently',
-                   'supposedly', 'allegedly', 'reportedly', 'presumably', 'evidently', 'seemingly', 'ostensibly']
-    filler_count = sum(transcript.lower().count(filler) for filler in filler_words)
-    
-    # Calculate reading ease
-    fk_grade = flesch_kincaid_grade(transcript)
+    word_count = context.word_count
+    sentence_count = context.sentence_count
+    
+    # Words per minute over the time actually spent answering, measured from
+    # word timestamps or else the VAD speech span; without audio timing
+    # (e.g. re-scoring stored transcripts) assume a typical rate
+    timing = context.timing
+    if timing and timing.get('words_per_minute'):
+        speech_rate = timing['words_per_minute']
+    elif timing and timing['span_seconds'] > 0:
+        speech_rate = word_count / (timing['span_seconds'] / 60)
+    else:
+        speech_rate = 150
     
     if sentence_count > 0:
         avg_sentence_length = word_count / sentence_count
-        sentence_lengths = [len([token for token in sent if not token.is_punct and not token.is_space]) 
-                           for sent in doc.sents]
-        sentence_length_variation = np.std(sentence_lengths) if len(sentence_lengths) > 1 else 0
+        sentence_lengths = context.sentence_word_counts
+        sentence_length_std = np.std(sentence_lengths) if len(sentence_lengths) > 1 else 0
     else:
         avg_sentence_length = 0
-        sentence_length_variation = 0
-    
-    # Extremely strict scoring components (each from 0-9)
-    speech_rate_score = min(9, max(0, 2.0 + (estimated_speech_rate - 120) / 40))  
-    
-    filler_ratio = filler_count / max(1, word_count)
-    filler_score = min(9, max(0, 9 - filler_ratio * 250))  
-    
-    complexity_score = min(9, max(0, 2.0 + (fk_grade - 10) * 0.2))  
-    
-    sentence_variation_score = min(9, max(0, 2.0 + sentence_length_variation * 0.2))  
+        sentence_length_std = 0
     
-    # Additional penalties
-    if word_count < 150:  
-        speech_rate_score *= 0.5
-        complexity_score *= 0.5
-    
-    if avg_sentence_length < 12:  
-        sentence_variation_score *= 0.5
-    
-    # Weighted average for final fluency score with stricter weights
-    fluency_score = (
-        speech_rate_score * 0.15 +
-        filler_score * 0.45 +     
-        complexity_score * 0.2 +
-        sentence_variation_score * 0.2
-    )
-    
-    # Additional overall penalty for poor performance
-    if fluency_score > 3.0: 
-        if filler_ratio > 0.03: 
-            fluency_score *= 0.6
-        if avg_sentence_length < 15:  
-            fluency_score *= 0.7
-        if word_count < 150:  
-            fluency_score *= 0.7
-    
-    return fluency_score
+    return {
+        'word_count': word_count,
+        'sentence_count': sentence_count,
+        'speech_rate': float(speech_rate),
+        'filler_ratio': context.filler_count / max(1, word_count),
+        'fk_grade': float(flesch_kincaid_grade(context.transcript)),
+        'avg_sentence_length': float(avg_sentence_length),
+        'sentence_length_std': float(sentence_length_std)
+    }
 
-def analyze_vocabulary(doc):
-    """
-    Analyze vocabulary based on:
-    - Lexical diversity
-    - Word rarity/complexity
-    - Appropriate collocations
-    - Topic-specific vocabulary
-    
-    Returns a score from 0-9 (IELTS scale)
+def vocabulary_features(context):
     """
-    # Count total and unique words
-    all_words = [token.text.lower() for token in doc if not token.is_punct and not token.is_space]
-    unique_words = set(all_words)
-    
-    # Return 0 for very short responses
-    if len(all_words) < 10:
-        return 0.0
-    
-    # Calculate lexical diversity (type-token ratio)
-    if len(all_words) > 0:
-        lexical_diversity = len(unique_words) / len(all_words)
-    else:
-        lexical_diversity = 0
-    
-    # Calculate average word length and syllable count
-    avg_word_length = np.mean([len(word) for word in all_words]) if all_words else 0
-    avg_syllables = np.mean([syllable_count(word) for word in all_words]) if all_words else 0
-    
-    # Calculate word rarity using spaCy's frequency ranks
-    # Lower rank means more common word
-    word_ranks = [token.rank if hasattr(token, 'rank') else 0 for token in doc 
-                 if not token.is_punct and not token.is_space]
-    avg_word_rank = np.mean(word_ranks) if word_ranks else 0
-    
-    # Extremely strict scoring components (each from 0-9)
-    diversity_score = min(9, max(0, lexical_diversity * 6))  
-    
-    length_score = min(9, max(0, 2.0 + (avg_word_length - 7.0) * 0.8))  
-    
-    syllable_score = min(9, max(0, 2.0 + (avg_syllables - 2.5) * 1.5)) 
-    
-    rarity_score = min(9, max(0, 2.0 - avg_word_rank / 20000))  
-    
-    # Additional penalties
-    if len(all_words) < 75:  
-        diversity_score *= 0.5
-        length_score *= 0.5
-    
-    # Check for common word repetition
-    common_words = {'the', 'be', 'to', 'of', 'and', 'a', 'in', 'that', 'have', 'i', 'it', 'for', 'not', 'on', 'with', 
-                   'he', 'as', 'you', 'do', 'at', 'this', 'but', 'his', 'by', 'from', 'they', 'we', 'say', 'her', 'she',
-                   'or', 'an', 'will', 'my', 'one', 'all', 'would', 'there', 'their', 'what', 'so', 'up', 'out', 'if',
-                   'about', 'who', 'get', 'which', 'go', 'me', 'when', 'make', 'can', 'like', 'time', 'no', 'just',
-                   'him', 'know', 'take', 'people', 'into', 'year', 'your', 'good', 'some', 'could', 'them', 'see',
-                   'other', 'than', 'then', 'now', 'look', 'only', 'come', 'its', 'over', 'think', 'also', 'back',
-                   'after', 'use', 'two', 'how', 'our', 'work', 'first', 'well', 'way', 'even', 'new', 'want', 'because',
-                   'any', 'these', 'give', 'day', 'most', 'us', 'very', 'many', 'much', 'more', 'most', 'such', 'only',
-                   'little', 'then', 'now', 'other', 'some', 'such', 'no', 'nor', 'not', 'too', 'very', 'can', 'will',
-                   'just', 'should', 'now', 'much', 'more', 'most', 'such', 'only', 'little', 'then', 'now', 'other',
-                   'some', 'such', 'no', 'nor', 'not', 'too', 'very', 'can', 'will', 'just', 'should', 'now'}
-    common_word_count = sum(1 for word in all_words if word in common_words)
-    common_word_ratio = common_word_count / len(all_words) if all_words else 0
-    
-    if common_word_ratio > 0.25:  
-        rarity_score *= 0.5
-    
-    # Weighted average for final vocabulary score with stricter weights
-    vocabulary_score = (
-        diversity_score * 0.25 +
-        length_score * 0.35 +
-        syllable_score * 0.35 +
-        rarity_score * 0.05
-    )
-    
-    # Additional overall penalty for poor performance
-    if vocabulary_score > 3.0: 
-        if common_word_ratio > 0.2:  
-            vocabulary_score *= 0.6
-        if lexical_diversity < 0.6:  
-            vocabulary_score *= 0.6
-        if len(all_words) < 150:  
-            vocabulary_score *= 0.7
-    
-    return vocabulary_score
-
-def analyze_grammar(transcript):
+    Features for vocabulary:
+    - Lexical diversity (type-token ratio)
+    - Word length and syllables
+    - Word rarity from spaCy's frequency ranks (lower rank means more common)
+    - Share of very common words
     """
-    Analyze grammar based on:
-    - Grammatical errors
-    - Sentence structure complexity
-    - Tense usage
-    - Agreement errors
+    all_words = context.word_texts
+    if not all_words:
+        return {'lexical_diversity': 0.0, 'avg_word_length': 0.0, 'avg_syllables': 0.0,
+                'avg_word_rank': 0.0, 'common_word_ratio': 0.0}
     
-    Returns a score from 0-9 (IELTS scale)
-    """
-    # Check for empty or very short transcript
-    if not transcript or len(transcript.strip()) < 5:  
-        return 0.0
-    
-    # Check for grammar errors using LanguageTool
-    matches = language_tool.check(transcript)
-    error_count = len(matches)
-    
-    # Calculate error density (errors per 100 words)
-    word_count = len(transcript.split())
-    
-    # Return 0 for very short responses
-    if word_count < 5:
-        return 0.0
-    
-    error_density = (error_count / max(1, word_count)) * 100
-    
-    # Extremely strict scoring based on error density
-    grammar_score = min(9, max(0, 6 - error_density * 2.5))  
-    
-    # Additional penalties
-    if word_count < 75:  
-        grammar_score *= 0.5
-    
-    # Check for basic grammar patterns
-    basic_patterns = ['i am', 'i like', 'i want', 'i have', 'i can', 'i will', 'i think', 'i know', 'i feel',
-                     'i need', 'i should', 'i would', 'i could', 'i must', 'i should', 'i would like',
-                     'i want to', 'i have to', 'i need to', 'i like to', 'i want to be', 'i am going to',
-                     'i believe', 'i understand', 'i agree', 'i disagree', 'i hope', 'i wish', 'i prefer',
-                     'i enjoy', 'i love', 'i hate', 'i like', 'i dislike', 'i want', 'i need', 'i should',
-                     'i would', 'i could', 'i might', 'i may', 'i must', 'i have to', 'i got to', 'i gotta']
-    basic_pattern_count = sum(1 for pattern in basic_patterns if pattern in transcript.lower())
-    if basic_pattern_count > 0:  
-        grammar_score *= 0.6
-    
-    # Maximum score reduction for poor performance
-    if grammar_score > 3.0: 
-        if error_density > 2: 
-            grammar_score *= 0.6
-        if basic_pattern_count > 1:  
-            grammar_score *= 0.6
-        if word_count < 150:  
-            grammar_score *= 0.7
-    
-    return grammar_score
+    word_ranks = [token.rank if hasattr(token, 'rank') else 0 for token in context.words]
+    common_word_count = sum(1 for word in all_words if word in COMMON_WORDS)
+    return {
+        'lexical_diversity': len(set(all_words)) / len(all_words),
+        'avg_word_length': float(np.mean([len(word) for word in all_words])),
+        'avg_syllables': float(np.mean([syllable_count(word) for word in all_words])),
+        'avg_word_rank': float(np.mean(word_ranks)),
+        'common_word_ratio': common_word_count / len(all_words)
+    }
 
-def calculate_overall_score(fluency_score, vocabulary_score, grammar_score):
+def grammar_features(context):
     """
-    Calculate overall IELTS speaking score based on component scores.
-    
-    IELTS speaking is scored on a 9-band scale.
+    Features for grammar:
+    - Grammatical errors found by LanguageTool, per 100 words
+    - Use of basic first-person patterns
     """
-    # Extremely strict weighted average of component scores
-    overall_score = (
-        fluency_score * 0.1 +       
-        vocabulary_score * 0.5 +    
-        grammar_score * 0.4         
-    )
-    
-    # Additional penalties for poor performance in any area
-    if any(score < 4.0 for score in [fluency_score, vocabulary_score, grammar_score]):
-        overall_score *= 0.5  
-    
-    if any(score < 3.0 for score in [fluency_score, vocabulary_score, grammar_score]):
-        overall_score *= 0.3  
-    
-    if any(score < 2.0 for score in [fluency_score, vocabulary_score, grammar_score]):
-        overall_score *= 0.2  
-    
-    return overall_score
+    char_count = len(context.transcript.strip()) if context.transcript else 0
+    word_count = context.whitespace_word_count
+    # Too little text to score; skip the LanguageTool check
+    if char_count < 5:
+        error_density = 0.0
+    else:
+        error_density = (len(context.grammar_matches) / max(1, word_count)) * 100
+    return {
+        'char_count': char_count,
+        'whitespace_word_count': word_count,
+        'error_density': error_density,
+        'basic_pattern_count': context.basic_pattern_count
+    }
 
-def generate_feedback(transcript, doc, fluency_score, vocabulary_score, grammar_score):
+def score_feedback(fluency_score, vocabulary_score, grammar_score):
     """
-    Generate detailed feedback based on analysis.
+    Feedback that depends only on the scores.
     
-    Returns a JSON string with structured feedback.
+    Returns a dict with lists of strengths, weaknesses and suggestions.
     """
     feedback = {
         'strengths': [],
@@ -387,17 +454,43 @@ def generate_feedback(transcript, doc, fluency_score, vocabulary_score, grammar_
         feedback['weaknesses'].append("Extremely frequent basic grammatical errors")
         feedback['suggestions'].append("Review basic grammar rules and practice with simple sentences first")
     
+    return feedback
+
+# Feedback lines quoting the transcript; they do not depend on the scores
+RARE_WORDS_FEEDBACK = "Good use of advanced vocabulary such as: "
+GRAMMAR_ERRORS_FEEDBACK = "Grammar errors in phrases like: "
+
+def generate_feedback(context, fluency_score, vocabulary_score, grammar_score):
+    """
+    Generate detailed feedback based on analysis.
+    
+    Returns a dict with lists of strengths, weaknesses and suggestions.
+    """
+    feedback = score_feedback(fluency_score, vocabulary_score, grammar_score)
+    
     # Add specific vocabulary suggestions
-    rare_words = [token.text for token in doc if token.rank and token.rank < 30000 
+    rare_words = [token.text for token in context.doc if token.rank and token.rank < 30000 
                  and not token.is_stop and not token.is_punct]
     if rare_words:
-        feedback['strengths'].append(f"Good use of advanced vocabulary such as: {', '.join(rare_words[:3])}")
+        feedback['strengths'].append(f"{RARE_WORDS_FEEDBACK}{', '.join(rare_words[:3])}")
     
-    # Add specific grammar error examples
-    matches = language_tool.check(transcript)
+    # Add specific grammar error examples (reuses the matches from grammar_features)
+    matches = context.grammar_matches
     if matches:
         error_examples = [match.context for match in matches[:2]]
-        feedback['weaknesses'].append(f"Grammar errors in phrases like: {'; '.join(error_examples)}")
+        feedback['weaknesses'].append(f"{GRAMMAR_ERRORS_FEEDBACK}{'; '.join(error_examples)}")
     
-    return json.dumps(feedback)
+    return feedback
+
+def rescore_feedback(feedback, fluency_score, vocabulary_score, grammar_score):
+    """
+    Feedback for new scores of an analysis whose transcript is not parsed again.
+    
+    The score-dependent lines are regenerated; the lines quoting the
+    transcript are kept from the stored feedback.
+    """
+    rescored = score_feedback(fluency_score, vocabulary_score, grammar_score)
+    for category, prefix in (('strengths', RARE_WORDS_FEEDBACK), ('weaknesses', GRAMMAR_ERRORS_FEEDBACK)):
+        rescored[category].extend(line for line in (feedback or {}).get(category, []) if line.startswith(prefix))
+    return rescored
 
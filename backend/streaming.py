@@ -0,0 +1,207 @@
+import os
+import uuid
+from datetime import datetime, timedelta
+from config import Config
+from models import db, Job, StreamSession
+from audio_io import SAMPLE_RATE, load_audio
+from pipeline import analyze_and_store, remove_upload
+from speech_analyzer import transcribe_samples
+from vad import detect_speech, speech_timing
+
+def create_stream(upload_dir, extension, question_id, question_text, user_id=None):
+    """
+    Start a chunked upload for a recording in progress.
+
+    Returns:
+        The created StreamSession
+    """
+    stream_id = str(uuid.uuid4())
+    audio_path = os.path.abspath(os.path.join(upload_dir, f"{stream_id}.{extension}"))
+    # Create the file now so chunks can always be appended
+    open(audio_path, 'wb').close()
+
+    stream = StreamSession(
+        id=stream_id,
+        question_id=question_id,
+        question_text=question_text,
+        user_id=user_id,
+        audio_path=audio_path
+    )
+    db.session.add(stream)
+    db.session.commit()
+    return stream
+
+def append_chunk(stream, data, elapsed_seconds):
+    """
+    Append a recorded segment and queue transcription of completed windows.
+
+    MediaRecorder segments are not independently decodable, so they are
+    appended to one file and windows are cut from the decoded whole.
+
+    Args:
+        stream: StreamSession receiving the chunk
+        data: Raw bytes of the segment
+        elapsed_seconds: Recording time covered by all chunks so far
+    """
+    with open(stream.audio_path, 'ab') as f:
+        f.write(data)
+    stream.chunk_count += 1
+
+    window = Config.STREAM_WINDOW_SECONDS
+    if elapsed_seconds >= stream.transcribed_seconds + window and not _has_active_window_job(stream):
+        db.session.add(Job(
+            kind=Job.STREAM_WINDOW,
+            stream_id=stream.id,
+            question_id=stream.question_id,
+            question_text=stream.question_text,
+            audio_path=stream.audio_path
+        ))
+    db.session.commit()
+
+def finish_stream(stream):
+    """
+    Mark the recording as complete and queue its final analysis.
+
+    Returns:
+        The analysis Job to poll
+    """
+    stream.status = StreamSession.FINISHED
+    job = Job(
+        kind=Job.ANALYZE,
+        stream_id=stream.id,
+        question_id=stream.question_id,
+        question_text=stream.question_text,
+        user_id=stream.user_id,
+        audio_path=stream.audio_path
+    )
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+def _has_active_window_job(stream):
+    return db.session.query(Job.id).filter(
+        Job.stream_id == stream.id,
+        Job.kind == Job.STREAM_WINDOW,
+        Job.status.in_([Job.PENDING, Job.RUNNING])
+    ).first() is not None
+
+def _window_end(audio, start, end):
+    """
+    Where to end the window [start, end): the middle of its last pause.
+
+    Cutting at a fixed offset splits the word spoken across it, so the
+    window ends in the latest silence found by VAD in its second half.
+    Without one (continuous speech), it ends at the fixed offset.
+
+    Returns:
+        End offset in seconds
+    """
+    segment = audio[int(start * SAMPLE_RATE):int(end * SAMPLE_RATE)]
+    starts, ends = detect_speech(segment)
+    if len(starts) == 0:
+        return end
+    # Silences between speech regions, plus any after the last one
+    silence_starts = list(ends[:-1]) + ([ends[-1]] if ends[-1] < len(segment) else [])
+    silence_ends = list(starts[1:]) + ([len(segment)] if ends[-1] < len(segment) else [])
+    earliest = len(segment) // 2
+    for silence_start, silence_end in reversed(list(zip(silence_starts, silence_ends))):
+        middle = (silence_start + silence_end) // 2
+        if middle >= earliest:
+            return start + middle / SAMPLE_RATE
+    return end
+
+def transcribe_stream_windows(stream_id, final=False):
+    """
+    Transcribe every completed window of a stream that is not yet transcribed.
+
+    Windows are STREAM_WINDOW_SECONDS long at most and end in a pause
+    where there is one (see _window_end), so that no word is split
+    between two partial transcripts. Progress is saved after each window
+    with a compare-and-set on transcribed_seconds, so a window job and
+    the final job can run concurrently without duplicating text.
+
+    Args:
+        stream_id: ID of the StreamSession
+        final: Also transcribe the trailing partial window
+
+    Returns:
+        The stream transcript so far
+    """
+    stream = db.session.get(StreamSession, stream_id)
+    audio = load_audio(stream.audio_path)
+    total_seconds = len(audio) / SAMPLE_RATE
+    window = Config.STREAM_WINDOW_SECONDS
+
+    while True:
+        db.session.refresh(stream)
+        start = stream.transcribed_seconds
+        end = start + window
+        if end > total_seconds:
+            if not final or start >= total_seconds:
+                break
+            end = total_seconds
+        else:
+            end = _window_end(audio, start, end)
+
+        text = transcribe_samples(audio[int(start * SAMPLE_RATE):int(end * SAMPLE_RATE)])['text']
+        transcript = ' '.join(part for part in (stream.transcript, text) if part)
+        updated = (StreamSession.query
+                   .filter(StreamSession.id == stream_id,
+                           StreamSession.transcribed_seconds == start)
+                   .update({'transcribed_seconds': end, 'transcript': transcript},
+                           synchronize_session=False))
+        db.session.commit()
+        if updated:
+            print(f"Stream {stream_id}: transcribed {start:.0f}s-{end:.0f}s")
+
+    db.session.refresh(stream)
+    return stream.transcript
+
+def process_stream(job):
+    """Finish transcribing a streamed recording, then score and store it."""
+    transcript = transcribe_stream_windows(job.stream_id, final=True)
+    # Pauses are measured over the whole recording, not per window
+    timing = speech_timing(load_audio(job.audio_path)) if Config.VAD_ENABLED else None
+    return analyze_and_store(transcript, job.audio_path, job.question_id, job.question_text,
+                             timing=timing, user_id=job.user_id)
+
+def expire_abandoned_streams(ttl_seconds):
+    """
+    Delete streams that stopped receiving chunks without being finished.
+
+    A stream still recording after ttl_seconds without an update was
+    abandoned by its client (closed tab, lost connection). Its audio file,
+    its finished window jobs and the stream itself are removed. Each
+    stream is deleted by a single conditional DELETE that re-checks, at
+    delete time, that no window job for it is queued or running, so a
+    worker claiming one concurrently keeps the stream for the next sweep.
+
+    Returns:
+        Number of streams removed
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=ttl_seconds)
+    active = db.session.query(Job.id).filter(Job.stream_id == StreamSession.id,
+                                             Job.status.in_([Job.PENDING, Job.RUNNING])).exists()
+    abandoned = [StreamSession.status == StreamSession.RECORDING,
+                 StreamSession.updated_at < cutoff,
+                 ~active]
+    candidates = db.session.query(StreamSession.id, StreamSession.audio_path).filter(*abandoned).all()
+
+    removed = 0
+    for stream_id, audio_path in candidates:
+        Job.query.filter(Job.stream_id == stream_id,
+                         Job.status.notin_([Job.PENDING, Job.RUNNING])).delete(synchronize_session=False)
+        deleted = (StreamSession.query
+                   .filter(StreamSession.id == stream_id, *abandoned)
+                   .delete(synchronize_session=False))
+        if not deleted:
+            # A job was queued or claimed since the candidates were read
+            db.session.rollback()
+            continue
+        db.session.commit()
+        remove_upload(audio_path)
+        removed += 1
+    db.session.commit()
+    if removed:
+        print(f"Removed {removed} abandoned stream(s)")
+    return removed
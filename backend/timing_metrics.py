@@ -0,0 +1,72 @@
+import numpy as np
+from config import Config
+
+def to_original_time(times, segments, side='right'):
+    """
+    Map times in VAD-trimmed audio back to the original recording.
+    
+    The trimmed audio is the concatenation of the speech segments, so a
+    time t falls into the segment whose cumulative offset precedes it.
+    
+    Args:
+        times: Array of times in seconds within the trimmed audio
+        segments: List of [start, end] speech segments in original seconds
+        side: 'left' maps a time on a segment boundary to the end of the
+            earlier segment (use for word end times)
+        
+    Returns:
+        Array of times in seconds within the original recording
+    """
+    times = np.asarray(times, dtype=np.float64)
+    if not segments:
+        return times
+    bounds = np.asarray(segments, dtype=np.float64)
+    lengths = bounds[:, 1] - bounds[:, 0]
+    offsets = np.concatenate(([0.0], np.cumsum(lengths)[:-1]))
+    index = np.clip(np.searchsorted(offsets, times, side=side) - 1, 0, len(offsets) - 1)
+    return bounds[index, 0] + (times - offsets[index])
+
+def word_timing_metrics(starts, ends):
+    """
+    Speech-rate and pause metrics from word timestamps.
+    
+    Gaps between consecutive words of at least TIMING_PAUSE_SECONDS count
+    as pauses; those of at least VAD_LONG_PAUSE_SECONDS as long pauses.
+    
+    Args:
+        starts: Array of word start times in seconds
+        ends: Array of word end times in seconds
+        
+    Returns:
+        Dictionary of timing metrics (rates are in words per minute)
+    """
+    starts = np.asarray(starts, dtype=np.float64)
+    ends = np.asarray(ends, dtype=np.float64)
+    word_count = len(starts)
+    if word_count == 0:
+        return {
+            'span_seconds': 0.0,
+            'words_per_minute': 0.0,
+            'articulation_rate': 0.0,
+            'pause_count': 0,
+            'total_pause_seconds': 0.0,
+            'mean_pause_seconds': 0.0,
+            'long_pause_count': 0
+        }
+    
+    gaps = np.maximum(starts[1:] - ends[:-1], 0.0)
+    pauses = gaps[gaps >= Config.TIMING_PAUSE_SECONDS]
+    span = float(ends[-1] - starts[0])
+    total_pause = float(pauses.sum())
+    # Articulation rate excludes pauses, so it reflects how fast the words are spoken
+    phonation = span - total_pause
+    
+    return {
+        'span_seconds': span,
+        'words_per_minute': word_count / span * 60 if span > 0 else 0.0,
+        'articulation_rate': word_count / phonation * 60 if phonation > 0 else 0.0,
+        'pause_count': int(len(pauses)),
+        'total_pause_seconds': total_pause,
+        'mean_pause_seconds': float(pauses.mean()) if len(pauses) else 0.0,
+        'long_pause_count': int(np.count_nonzero(gaps >= Config.VAD_LONG_PAUSE_SECONDS))
+    }
@@ -0,0 +1,112 @@
+import numpy as np
+from audio_io import SAMPLE_RATE
+from config import Config
+
+FRAME_MS = 30
+
+def detect_speech(audio, sample_rate=SAMPLE_RATE):
+    """
+    Find speech regions with an adaptive energy threshold.
+
+    Frames louder than the recording's noise floor plus VAD_MARGIN_DB are
+    voiced. Gaps shorter than VAD_MIN_SILENCE_MS are bridged, regions
+    shorter than VAD_MIN_SPEECH_MS are dropped, and the remaining regions
+    are padded by VAD_PAD_MS on both sides.
+
+    Args:
+        audio: float32 mono array
+        sample_rate: Sample rate of the audio in Hz
+
+    Returns:
+        (starts, ends) arrays of sample offsets, one pair per speech region
+    """
+    frame = sample_rate * FRAME_MS // 1000
+    n_frames = len(audio) // frame
+    if n_frames == 0:
+        return np.array([], dtype=np.int64), np.array([], dtype=np.int64)
+
+    frames = audio[:n_frames * frame].reshape(n_frames, frame)
+    energy_db = 10 * np.log10(np.mean(frames ** 2, axis=1) + 1e-10)
+
+    # Threshold sits above the noise floor but never above loud speech
+    noise_floor = np.percentile(energy_db, 10)
+    loud = np.percentile(energy_db, 95)
+    threshold = max(Config.VAD_MIN_DB, min(noise_floor + Config.VAD_MARGIN_DB, loud - 10))
+    voiced = (energy_db > threshold).astype(np.int8)
+
+    edges = np.diff(np.concatenate(([0], voiced, [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    if len(starts) == 0:
+        return starts, ends
+
+    # Bridge short gaps so natural pauses between words do not split regions
+    min_silence = Config.VAD_MIN_SILENCE_MS // FRAME_MS
+    keep_gap = (starts[1:] - ends[:-1]) >= min_silence
+    starts = np.concatenate((starts[:1], starts[1:][keep_gap]))
+    ends = np.concatenate((ends[:-1][keep_gap], ends[-1:]))
+
+    # Drop clicks and other blips too short to be speech
+    long_enough = (ends - starts) >= Config.VAD_MIN_SPEECH_MS // FRAME_MS
+    starts, ends = starts[long_enough], ends[long_enough]
+
+    pad = sample_rate * Config.VAD_PAD_MS // 1000
+    starts = np.maximum(starts * frame - pad, 0)
+    ends = np.minimum(ends * frame + pad, len(audio))
+    return starts, ends
+
+def pause_statistics(starts, ends, total_samples, sample_rate=SAMPLE_RATE):
+    """
+    Summarise speech regions as timing statistics.
+
+    Returns:
+        Dictionary with durations in seconds and pause counts
+    """
+    duration = total_samples / sample_rate
+    if len(starts) == 0:
+        return {
+            'duration': duration,
+            'speech_seconds': 0.0,
+            'span_seconds': 0.0,
+            'pause_count': 0,
+            'total_pause_seconds': 0.0,
+            'mean_pause_seconds': 0.0,
+            'long_pause_count': 0,
+            'segments': []
+        }
+
+    pauses = (starts[1:] - ends[:-1]) / sample_rate
+    return {
+        'duration': duration,
+        'speech_seconds': float(np.sum(ends - starts)) / sample_rate,
+        # From the start of the first region to the end of the last one
+        'span_seconds': float(ends[-1] - starts[0]) / sample_rate,
+        'pause_count': int(len(pauses)),
+        'total_pause_seconds': float(np.sum(pauses)),
+        'mean_pause_seconds': float(np.mean(pauses)) if len(pauses) else 0.0,
+        'long_pause_count': int(np.sum(pauses >= Config.VAD_LONG_PAUSE_SECONDS)),
+        'segments': [[float(start) / sample_rate, float(end) / sample_rate]
+                     for start, end in zip(starts, ends)]
+    }
+
+def trim_silence(audio, sample_rate=SAMPLE_RATE):
+    """
+    Keep only the speech regions of a recording.
+
+    Args:
+        audio: float32 mono array
+
+    Returns:
+        Tuple of (speech-only audio, pause statistics)
+    """
+    starts, ends = detect_speech(audio, sample_rate)
+    stats = pause_statistics(starts, ends, len(audio), sample_rate)
+    if len(starts) == 0:
+        return audio[:0], stats
+    speech = np.concatenate([audio[start:end] for start, end in zip(starts, ends)])
+    return speech, stats
+
+def speech_timing(audio, sample_rate=SAMPLE_RATE):
+    """Pause statistics of a recording without trimming it."""
+    starts, ends = detect_speech(audio, sample_rate)
+    return pause_statistics(starts, ends, len(audio), sample_rate)
@@ -0,0 +1,65 @@
+import argparse
+import signal
+import time
+from multiprocessing import Process
+from app import app
+from models import db
+from job_queue import start_worker_pool, requeue_stale_jobs, worker_name, _worker_main
+from streaming import expire_abandoned_streams
+
+# Seconds between sweeps for abandoned streaming uploads
+STREAM_SWEEP_INTERVAL = 60
+
+def main():
+    """
+    Run the analysis worker pool in the foreground.
+
+    Crashed workers are restarted and their jobs returned to the queue.
+    Abandoned streaming uploads are removed every STREAM_SWEEP_INTERVAL
+    seconds.
+    Usage: python worker.py [--workers N]
+    """
+    parser = argparse.ArgumentParser(description='Run the IELTS analysis worker pool.')
+    parser.add_argument('--workers', type=int, default=app.config['WORKER_COUNT'],
+                        help='number of worker processes')
+    args = parser.parse_args()
+
+    processes = start_worker_pool(app, args.workers)
+    print(f"Started {len(processes)} analysis workers")
+
+    stopping = False
+
+    def request_stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+
+    last_sweep = time.monotonic()
+    while not stopping:
+        time.sleep(1)
+        if time.monotonic() - last_sweep >= STREAM_SWEEP_INTERVAL:
+            last_sweep = time.monotonic()
+            with app.app_context():
+                try:
+                    expire_abandoned_streams(app.config['STREAM_TTL'])
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"Warning: stream sweep failed: {str(e)}")
+        for index, process in enumerate(processes):
+            if not process.is_alive() and not stopping:
+                print(f"Worker {process.name} exited with code {process.exitcode}, restarting")
+                with app.app_context():
+                    requeue_stale_jobs(0, app.config['JOB_MAX_ATTEMPTS'],
+                                       worker_id=worker_name(process.pid, index))
+                processes[index] = Process(target=_worker_main, args=(index,), name=process.name)
+                processes[index].start()
+
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        process.join()
+
+if __name__ == '__main__':
+    main()
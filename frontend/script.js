@@ -1,5 +1,7 @@
 // API Configuration
 const API_BASE_URL = 'http://127.0.0.1:4000/api';  // Make sure this matches your Flask server port
+const JOB_POLL_INTERVAL_MS = 1500;  // How often to check on a queued analysis
+const USER_ID = getUserId();  // Anonymous ID so recently answered questions are not repeated
 
 // Audio Recording Variables
 let mediaRecorder = null;
@@ -9,6 +11,12 @@ let timerInterval = null;
 let startTime = null;
 let currentQuestionData = null;
 
+// Streaming upload state (chunks are sent while recording)
+let streamId = null;
+let streamSeq = 0;
+let streamUploads = Promise.resolve();
+let streamFailed = false;
+
 // Initialize the application
 document.addEventListener('DOMContentLoaded', () => {
     console.log('Application initialized');
@@ -48,7 +56,7 @@ document.addEventListener('DOMContentLoaded', () => {
                 console.log('Fetching questions...');
                 if (recordingStatus) recordingStatus.textContent = 'Fetching questions...';
                 
-                const response = await fetch(`${API_BASE_URL}/questions`);
+                const response = await fetch(`${API_BASE_URL}/questions?user_id=${encodeURIComponent(USER_ID)}`);
                 if (!response.ok) {
                     throw new Error(`HTTP error! status: ${response.status}`);
                 }
@@ -92,6 +100,16 @@ document.addEventListener('DOMContentLoaded', () => {
     }
 });
 
+// Anonymous per-browser user ID, created on first visit
+function getUserId() {
+    let userId = localStorage.getItem('ieltsUserId');
+    if (!userId) {
+        userId = crypto.randomUUID();
+        localStorage.setItem('ieltsUserId', userId);
+    }
+    return userId;
+}
+
 // Test API connection
 async function testApiConnection(recordingStatusElement) {
     try {
@@ -131,20 +149,31 @@ async function startRecording(recordButton, recordingStatus, timerDisplay) {
             mimeType: 'audio/webm;codecs=opus'
         });
         audioChunks = [];
+        await startStream();
 
         // Handle data available event
         mediaRecorder.ondataavailable = (event) => {
             if (event.data.size > 0) {
                 audioChunks.push(event.data);
+                queueStreamChunk(event.data);
             }
         };
 
         // Handle recording stop
         mediaRecorder.onstop = async () => {
             try {
-                const audioBlob = new Blob(audioChunks, { type: 'audio/webm' });
                 const recordingStatusElement = document.getElementById('recording-status');
-                await submitRecording(audioBlob, recordingStatusElement);
+                if (recordingStatusElement) {
+                    recordingStatusElement.textContent = 'Uploading recording...';
+                }
+                await streamUploads;
+                if (streamId && !streamFailed) {
+                    await finishStream(recordingStatusElement);
+                } else {
+                    // Fall back to uploading the whole recording at once
+                    const audioBlob = new Blob(audioChunks, { type: 'audio/webm' });
+                    await submitRecording(audioBlob, recordingStatusElement);
+                }
             } catch (error) {
                 console.error('Error processing recording:', error);
                 const recordingStatusElement = document.getElementById('recording-status');
@@ -208,6 +237,7 @@ async function submitRecording(audioBlob, recordingStatusElement) {
         formData.append('audio', audioBlob, 'recording.webm');
         formData.append('question_id', currentQuestionData.id);
         formData.append('question_text', currentQuestionData.text);
+        formData.append('user_id', USER_ID);
 
         if (recordingStatusElement) {
             recordingStatusElement.textContent = 'Uploading recording...';
@@ -223,7 +253,11 @@ async function submitRecording(audioBlob, recordingStatusElement) {
             throw new Error(errorData.error || 'Failed to submit recording');
         }
 
-        const result = await response.json();
+        const job = await response.json();
+        if (recordingStatusElement) {
+            recordingStatusElement.textContent = 'Analyzing recording...';
+        }
+        const result = await waitForJob(job.job_id);
         displayResults(result);
     } catch (error) {
         console.error('Error submitting recording:', error);
@@ -233,6 +267,112 @@ async function submitRecording(audioBlob, recordingStatusElement) {
     }
 }
 
+// Open a streaming upload so completed windows are transcribed while recording
+async function startStream() {
+    streamId = null;
+    streamSeq = 0;
+    streamUploads = Promise.resolve();
+    streamFailed = false;
+
+    if (!currentQuestionData) return;
+
+    try {
+        const formData = new FormData();
+        formData.append('question_id', currentQuestionData.id);
+        formData.append('question_text', currentQuestionData.text);
+        formData.append('user_id', USER_ID);
+        formData.append('format', 'webm');
+
+        const response = await fetch(`${API_BASE_URL}/streams`, {
+            method: 'POST',
+            body: formData
+        });
+        if (!response.ok) {
+            throw new Error(`HTTP error! status: ${response.status}`);
+        }
+
+        const stream = await response.json();
+        streamId = stream.stream_id;
+    } catch (error) {
+        console.warn('Streaming upload unavailable, will upload after recording:', error);
+        streamFailed = true;
+    }
+}
+
+// Send recorded segments one after another so they arrive in order
+function queueStreamChunk(chunk) {
+    if (!streamId || streamFailed) return;
+
+    const seq = streamSeq++;
+    const elapsed = (Date.now() - startTime) / 1000;
+    streamUploads = streamUploads.then(async () => {
+        if (streamFailed) return;
+
+        const formData = new FormData();
+        formData.append('chunk', chunk, `chunk-${seq}.webm`);
+        formData.append('seq', seq);
+        formData.append('elapsed', elapsed);
+
+        try {
+            const response = await fetch(`${API_BASE_URL}/streams/${streamId}/chunks`, {
+                method: 'POST',
+                body: formData
+            });
+            if (!response.ok) {
+                throw new Error(`HTTP error! status: ${response.status}`);
+            }
+        } catch (error) {
+            console.warn('Chunk upload failed, will upload after recording:', error);
+            streamFailed = true;
+        }
+    });
+}
+
+// Finish the streaming upload and wait for the analysis
+async function finishStream(recordingStatusElement) {
+    try {
+        const response = await fetch(`${API_BASE_URL}/streams/${streamId}/finish`, {
+            method: 'POST'
+        });
+        if (!response.ok) {
+            const errorData = await response.json();
+            throw new Error(errorData.error || 'Failed to finish recording');
+        }
+
+        const job = await response.json();
+        if (recordingStatusElement) {
+            recordingStatusElement.textContent = 'Analyzing recording...';
+        }
+        const result = await waitForJob(job.job_id);
+        displayResults(result);
+    } catch (error) {
+        console.error('Error finishing streamed recording:', error);
+        if (recordingStatusElement) {
+            recordingStatusElement.textContent = `Error: ${error.message}`;
+        }
+    }
+}
+
+// Poll the analysis job until a worker has finished it
+async function waitForJob(jobId) {
+    while (true) {
+        await new Promise(resolve => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
+
+        const response = await fetch(`${API_BASE_URL}/jobs/${jobId}`);
+        if (!response.ok) {
+            throw new Error(`HTTP error! status: ${response.status}`);
+        }
+
+        const job = await response.json();
+        if (job.status === 'completed') {
+            return job.result;
+        }
+        if (job.status === 'failed') {
+            throw new Error(job.error || 'Analysis failed');
+        }
+    }
+}
+
 // Display results
 function displayResults(data) {
     try {